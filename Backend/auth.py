@@ -1,22 +1,141 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from database import get_db, User
+from database import get_db, User, AsyncSessionLocal
 from pydantic import BaseModel
-import bcrypt
+from collections import OrderedDict
+import threading
+import secrets
+import time
 import jwt
 import os
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import traceback
 from fastapi.responses import JSONResponse
+from utils.passwords import hash_password, verify_password, needs_rehash
 
 # Load .env variables
 load_dotenv()
 SECRET_KEY = os.getenv("JWT_SECRET", "your_secret_key")
 ALGORITHM = "HS256"
 
+# Validated tokens kept in memory, so authenticated requests skip decoding and the user query
+AUTH_CACHE_ENTRIES = int(os.getenv("AUTH_CACHE_ENTRIES", "10000"))
+# Seconds a token's user stays cached (never past the token's exp); a deleted user keeps access this long
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+# Rejected tokens are remembered separately, so a flood of bad tokens cannot evict good ones
+AUTH_NEGATIVE_ENTRIES = int(os.getenv("AUTH_NEGATIVE_ENTRIES", "1000"))
+AUTH_NEGATIVE_TTL = float(os.getenv("AUTH_NEGATIVE_TTL", "60"))
+# Shared token for the operator endpoints (stats, profiles); they refuse every request while it is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
 auth_router = APIRouter()
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+class TokenCache:
+    """
+    LRU map of token -> value with a per-entry expiry time.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # token -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, token, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            if entry[0] <= now:
+                del self._entries[token]
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(token)
+            self.counters["hits"] += 1
+            return entry[1]
+
+    def set(self, token, value, expires_at):
+        with self._lock:
+            self._entries[token] = (expires_at, value)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries), "max_entries": self.max_entries}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+valid_tokens = TokenCache(AUTH_CACHE_ENTRIES)
+rejected_tokens = TokenCache(AUTH_NEGATIVE_ENTRIES)
+
+
+def _unauthorized(detail):
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
+    """
+    Dependency that resolves the Bearer token to {"id", "name", "email"} or raises 401.
+
+    Valid tokens are cached until AUTH_CACHE_TTL or their exp, whichever comes
+    first, so repeat requests neither decode the JWT nor query the database.
+    Tokens that fail (bad signature, expired, unknown user) are cached as
+    rejected for AUTH_NEGATIVE_TTL.
+    """
+    if credentials is None:
+        raise _unauthorized("Not authenticated")
+
+    token = credentials.credentials
+    now = time.time()
+    user = valid_tokens.get(token, now)
+    if user is not None:
+        return user
+    if rejected_tokens.get(token, now) is not None:
+        raise _unauthorized("Invalid or expired token")
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.InvalidTokenError:
+        rejected_tokens.set(token, True, now + AUTH_NEGATIVE_TTL)
+        raise _unauthorized("Invalid or expired token")
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User).where(User.email == payload.get("sub")))
+        db_user = result.scalars().first()
+
+    if db_user is None:
+        rejected_tokens.set(token, True, now + AUTH_NEGATIVE_TTL)
+        raise _unauthorized("Invalid or expired token")
+
+    user = {"id": db_user.id, "name": db_user.name, "email": db_user.email}
+    valid_tokens.set(token, user, min(payload.get("exp", float("inf")), now + AUTH_CACHE_TTL))
+    return user
+
+
+def require_admin(x_admin_token: str = Header("")):
+    """
+    Dependency accepting only requests whose X-Admin-Token header matches ADMIN_TOKEN (403 otherwise).
+    """
+    if not ADMIN_TOKEN or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required.")
+
+
+def auth_cache_stats():
+    return {"valid_tokens": valid_tokens.stats(), "rejected_tokens": rejected_tokens.stats()}
 
 class UserRegister(BaseModel):
     name: str
@@ -40,8 +159,8 @@ async def register(user: UserRegister, db: AsyncSession = Depends(get_db)):
             print("❌ User already exists!")
             raise HTTPException(status_code=400, detail="User already exists")
 
-        # 🔹 Hash password securely
-        hashed_pw = bcrypt.hashpw(user.password.encode(), bcrypt.gensalt()).decode()
+        # 🔹 Hash password securely (off the event loop, bcrypt takes ~100-300 ms)
+        hashed_pw = await hash_password(user.password)
 
         # 🔹 Create new user instance
         new_user = User(name=user.name, email=user.email, password=hashed_pw)
@@ -72,13 +191,26 @@ async def login(user: UserLogin, db: AsyncSession = Depends(get_db)):
     # print(f"🔥 Database Error: {e}")
     # raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
-        if not db_user or not bcrypt.checkpw(user.password.encode(), db_user.password.encode()):
+        if not db_user or not await verify_password(user.password, db_user.password):
             raise HTTPException(status_code=400, detail="Invalid email or password")
 
+        email, name = db_user.email, db_user.name
+
+        # 🔹 Upgrade the stored hash when BCRYPT_ROUNDS changed since it was made
+        if needs_rehash(db_user.password):
+            try:
+                db_user.password = await hash_password(user.password)
+                await db.commit()
+                print(f"🔐 Rehashed password for {email}")
+            except Exception as e:
+                # The login itself succeeded; the next one tries again
+                await db.rollback()
+                print(f"❌ Could not rehash password: {e}")
+
         # 🔹 Generate JWT token
-        token = jwt.encode({"sub": db_user.email, "exp": datetime.utcnow() + timedelta(hours=1)}, SECRET_KEY, algorithm=ALGORITHM)
+        token = jwt.encode({"sub": email, "exp": datetime.utcnow() + timedelta(hours=1)}, SECRET_KEY, algorithm=ALGORITHM)
 
-        return {"token": token, "name": db_user.name, "message": "Login successful"}
+        return {"token": token, "name": name, "message": "Login successful"}
 
     except Exception as e:
         print("🔥 ERROR DURING LOGIN 🔥")
@@ -90,5 +222,5 @@ async def login(user: UserLogin, db: AsyncSession = Depends(get_db)):
         )
 
 @auth_router.get("/protected")
-async def protected_route():
-    return {"message": "You have access to this protected route!"}
+async def protected_route(current_user: dict = Depends(get_current_user)):
+    return {"message": "You have access to this protected route!", "name": current_user["name"]}
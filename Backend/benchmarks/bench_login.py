@@ -0,0 +1,100 @@
+"""
+Login throughput under concurrency, and how long the event loop stalls meanwhile.
+
+Compares checking passwords inline on the event loop (the old auth.py) with
+the bcrypt thread pool from utils/passwords.py. Run from the Backend directory:
+    python -m benchmarks.bench_login
+
+With --url it instead fires real logins at a running server, e.g.
+    python -m benchmarks.bench_login --url http://localhost:8000 --email a@b.c --password secret
+"""
+import sys
+import time
+import asyncio
+import argparse
+from utils.passwords import (
+    BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, hash_password_sync, verify_password_sync, verify_password,
+    shutdown_password_executor
+)
+
+PASSWORD = "correct horse battery staple"
+
+
+async def measure_loop_lag(stop, interval=0.005):
+    """
+    Longest delay of a 5 ms timer tick, i.e. how long other requests would have been stuck.
+    """
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run_logins(login, concurrency, total):
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            await login()
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return total / elapsed, await lag_task
+
+
+async def bench_local(levels, total):
+    hashed = hash_password_sync(PASSWORD)
+
+    async def inline_login():
+        # Yield first, as a real request would between reading its body and checking the password
+        await asyncio.sleep(0)
+        assert verify_password_sync(PASSWORD, hashed)
+
+    async def executor_login():
+        assert await verify_password(PASSWORD, hashed)
+
+    print(f"bcrypt rounds {BCRYPT_ROUNDS}, {PASSWORD_HASH_WORKERS} hash workers, {total} logins per run")
+    for concurrency in levels:
+        for name, login in (("inline", inline_login), ("executor", executor_login)):
+            rate, lag = await run_logins(login, concurrency, total)
+            print(f"concurrency {concurrency:>3}  {name:<8}  {rate:7.1f} logins/s   worst loop stall {lag * 1e3:8.1f} ms")
+
+
+async def bench_server(url, email, password, levels, total):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        async def login():
+            response = await client.post("/auth/login", json={"email": email, "password": password})
+            response.raise_for_status()
+
+        for concurrency in levels:
+            rate, _ = await run_logins(login, concurrency, total)
+            print(f"concurrency {concurrency:>3}  {rate:7.1f} logins/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    if args.url:
+        if not (args.email and args.password):
+            sys.exit("--url needs --email and --password of an existing user")
+        asyncio.run(bench_server(args.url, args.email, args.password, args.concurrency, args.logins))
+    else:
+        asyncio.run(bench_local(args.concurrency, args.logins))
+        shutdown_password_executor()
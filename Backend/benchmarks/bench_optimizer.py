@@ -0,0 +1,82 @@
+"""
+Per-solve timing of the portfolio optimizer backends.
+
+Run from the Backend directory:
+    python -m benchmarks.bench_optimizer
+"""
+import time
+import warnings
+import numpy as np
+import scipy.optimize as sco
+from utils.asset_stats import covariance_stats
+from models.optimizer_backends import mean_volatility_objective, sharpe_objective
+from models.portfolio_optimizer import optimize_portfolio, optimize_stock_allocation
+from services.suggestions_services import build_suggestion_frontiers, get_optimized_portfolio
+
+STOCKS = ["AAPL", "GOOGL", "MSFT", "TSLA", "NVDA"]
+ASSETS = ["stocks", "bonds", "real_estate", "commodities"]
+
+
+def best_of(func, repeat=5, number=20):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return min(timings)
+
+
+def bench_single_solve():
+    stats = covariance_stats(STOCKS)
+    mean_returns, cov_matrix = stats.mean_returns, stats.cov_matrix
+    bounds = tuple((0.05, 1) for _ in STOCKS)
+    constraints = {'type': 'eq', 'fun': lambda x: np.sum(x) - 1}
+    start = np.random.default_rng(0).dirichlet(np.ones(len(STOCKS)))
+    objective = mean_volatility_objective(mean_returns, cov_matrix, 0.05)
+
+    def legacy():
+        sco.minimize(lambda w: objective(w)[0], start, method='SLSQP', bounds=bounds, constraints=constraints)
+
+    def analytic():
+        sco.minimize(objective, start, method='SLSQP', jac=True, bounds=bounds, constraints=constraints)
+
+    legacy_time, analytic_time = best_of(legacy), best_of(analytic)
+    print(f"single SLSQP solve   legacy {legacy_time * 1e3:8.3f} ms   analytic {analytic_time * 1e3:8.3f} ms"
+          f"   speedup {legacy_time / analytic_time:5.1f}x")
+
+
+def bench_optimizers():
+    stock_stats = covariance_stats(STOCKS)
+    portfolio_stats = covariance_stats(ASSETS)
+    stock_data = {ticker: None for ticker in STOCKS}
+
+    for backend in ("legacy", "analytic", "qp"):
+        stock_time = best_of(lambda: optimize_stock_allocation(
+            stock_data, 0.5, 10, stock_stats.mean_returns, stock_stats.cov_matrix,
+            backend=backend, patience=0, time_budget=0, max_starts=100
+        ), repeat=3, number=1)
+        portfolio_time = best_of(lambda: optimize_portfolio(
+            None, [0.4, 0.3, 0.2, 0.1], 0.5, portfolio_stats.mean_returns, portfolio_stats.cov_matrix, backend=backend
+        ))
+        starts = "100 starts" if backend != "qp" else "frontier  "
+        print(f"{backend:<9} optimize_stock_allocation ({starts}) {stock_time * 1e3:9.2f} ms"
+              f"   optimize_portfolio {portfolio_time * 1e3:7.2f} ms")
+
+
+def bench_frontier_index():
+    start = time.perf_counter()
+    build_suggestion_frontiers()
+    build_time = time.perf_counter() - start
+
+    lookup = best_of(lambda: get_optimized_portfolio(10000, 10, [0.4, 0.3, 0.2, 0.1], 0.5), number=200)
+    refined = best_of(lambda: get_optimized_portfolio(10000, 10, [0.4, 0.3, 0.2, 0.1], 0.5, refine=True))
+    print(f"frontier index build {build_time:6.2f} s   get_optimized_portfolio lookup {lookup * 1e3:7.3f} ms"
+          f"   refined {refined * 1e3:7.3f} ms")
+
+
+if __name__ == "__main__":
+    warnings.simplefilter("ignore", RuntimeWarning)
+    bench_single_solve()
+    bench_optimizers()
+    bench_frontier_index()
@@ -0,0 +1,66 @@
+"""
+Speed and accuracy of the float32 simulation engines against float64.
+
+Run from the Backend directory:
+    python -m benchmarks.bench_precision
+"""
+import time
+import numpy as np
+from models.monte_carlo import monte_carlo_simulation
+from models.gbm_model import simulate_gbm_paths
+from models.portfolio_simulator import simulate_portfolio
+from services.simulation_ import portfolio_inputs
+
+ALLOCATION = {"stocks": 40, "bonds": 30, "real_estate": 20, "commodities": 10}
+INVESTMENT = 10000
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def bench_rounding_error(duration):
+    # The legacy RNG draws float64 in both precisions, so the difference is pure float32 arithmetic
+    stats = portfolio_inputs({"stocks": 100, "bonds": 0, "real_estate": 0, "commodities": 0}, "neutral", 0.5)
+    mean_return, volatility = stats[1][0], np.sqrt(stats[2][0, 0])
+
+    (final64, yearly64), time64 = timed(lambda: monte_carlo_simulation(INVESTMENT, mean_return, volatility, duration))
+    (final32, yearly32), time32 = timed(lambda: monte_carlo_simulation(INVESTMENT, mean_return, volatility, duration,
+                                                                     precision="float32"))
+    gbm64 = simulate_gbm_paths(INVESTMENT, mean_return, volatility, duration, n_paths=1000)
+    gbm32 = simulate_gbm_paths(INVESTMENT, mean_return, volatility, duration, n_paths=1000, precision="float32")
+
+    print(f"{duration:>2}y monte_carlo_simulation  final rel. error {abs(final32 / final64 - 1):.1e}"
+          f"  max yearly abs. error {np.abs(yearly32 - yearly64).max():8.4f}"
+          f"  time {time64:6.2f}s -> {time32:6.2f}s")
+    print(f"{duration:>2}y simulate_gbm_paths      max path rel. error {np.abs(gbm32.final_values / gbm64.final_values - 1).max():.1e}")
+
+
+def bench_portfolio(duration, seeds=5):
+    weights, mean_returns, cov_matrix = portfolio_inputs(ALLOCATION, "bull", 0.5)
+    results = {}
+    for precision in ("float64", "float32"):
+        runs, elapsed = timed(lambda: [
+            simulate_portfolio(INVESTMENT, weights, mean_returns, cov_matrix, duration, iterations=10000,
+                               ito_correction=False, seed=seed, precision=precision)
+            for seed in range(seeds)
+        ])
+        results[precision] = (runs, elapsed / seeds)
+
+    (runs64, time64), (runs32, time32) = results["float64"], results["float32"]
+    # float32 draws differ from float64 draws, so compare the gap with the Monte Carlo standard error
+    gaps = [abs(a.mean_final_value - b.mean_final_value) / np.hypot(a.std_error, b.std_error)
+            for a, b in zip(runs64, runs32)]
+    drawdown_gap = max(abs(a.mean_max_drawdown - b.mean_max_drawdown) for a, b in zip(runs64, runs32))
+    print(f"{duration:>2}y simulate_portfolio      mean |gap| / std error {np.mean(gaps):4.2f}"
+          f"  max drawdown gap {drawdown_gap * 100:.2f} pts"
+          f"  time {time64:6.2f}s -> {time32:6.2f}s")
+
+
+if __name__ == "__main__":
+    for duration in (1, 10, 30):
+        bench_rounding_error(duration)
+    for duration in (1, 10):
+        bench_portfolio(duration)
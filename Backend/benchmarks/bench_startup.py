@@ -0,0 +1,73 @@
+"""
+Import time of the app and time until a fresh server answers its first request.
+
+Each run starts a new interpreter, so module and data caches start cold. The
+server is launched with uvicorn and polled on /health; the warm-up steps it
+reports are printed as well. Run from the Backend directory:
+    python -m benchmarks.bench_startup
+    STARTUP_WAKE_DATABASE=0 STARTUP_DB_CONNECTIONS=0 python -m benchmarks.bench_startup   # without a database
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_time():
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, capture_output=True,
+                            text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def time_to_first_response(timeout=120):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)], cwd=BACKEND_DIR,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+                if response.status_code == 200:
+                    return time.perf_counter() - start, response.json()
+            except httpx.TransportError:
+                pass
+            if server.poll() is not None:
+                raise RuntimeError("The server exited during startup")
+            time.sleep(0.1)
+        raise TimeoutError(f"No response within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    imports = [import_time() for _ in range(args.runs)]
+    print(f"import main            median {statistics.median(imports):6.2f}s   (runs: {', '.join(f'{t:.2f}' for t in imports)})")
+
+    firsts, reports = [], []
+    for _ in range(args.runs):
+        elapsed, report = time_to_first_response()
+        firsts.append(elapsed)
+        reports.append(report)
+    print(f"time to first response median {statistics.median(firsts):6.2f}s   (runs: {', '.join(f'{t:.2f}' for t in firsts)})")
+
+    for name, step in reports[-1]["steps"].items():
+        print(f"  {name:<22} {step['seconds']:6.2f}s  {step['status']}")
@@ -4,8 +4,11 @@ import asyncio
 import httpx
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, JSON, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from dotenv import load_dotenv
+from utils.db_telemetry import PoolTelemetry
 
 # ✅ Load environment variables
 load_dotenv()
@@ -22,16 +25,37 @@ ssl_context = ssl.create_default_context()
 ssl_context.check_hostname = False
 ssl_context.verify_mode = ssl.CERT_OPTIONAL
 
+# ✅ Engine profile (defaults suit production; DB_ECHO=1 logs every statement for debugging)
+DB_ECHO = os.getenv("DB_ECHO", "0") == "1"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "60"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before a connection is replaced
+# Test connections on checkout, so ones Neon closed while suspended are replaced instead of failing a query
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# Prepared statements asyncpg keeps per connection; set 0 behind a transaction-mode pooler (PgBouncer)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+connect_args = {"ssl": ssl_context}
+if make_url(DATABASE_URL).get_driver_name() == "asyncpg":
+    connect_args["statement_cache_size"] = DB_STATEMENT_CACHE_SIZE
+
+# ✅ Pool and query statistics (served at /db/stats)
+db_telemetry = PoolTelemetry()
+
 # ✅ Create async engine
 engine = create_async_engine(
     DATABASE_URL,
-    echo=True,
-    connect_args={"ssl": ssl_context},
-    pool_size=10,
-    max_overflow=5,
-    pool_timeout=60,
-    pool_recycle=1800
+    echo=DB_ECHO,
+    connect_args=connect_args,
+    poolclass=db_telemetry.pool_class(AsyncAdaptedQueuePool),
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING
 )
+db_telemetry.instrument(engine.sync_engine)
 
 # ✅ Create async session
 AsyncSessionLocal = sessionmaker(
@@ -52,6 +76,22 @@ class User(Base):
     email = Column(String(100), unique=True, nullable=False)
     password = Column(String(255), nullable=False)  # Ensure password is hashed in auth.py
 
+# ✅ Stored simulation and risk assessment results (written in bulk by services/history.py)
+class SimulationResult(Base):
+    __tablename__ = "simulation_results"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("login_credentials.id"), nullable=False)
+    kind = Column(String(20), nullable=False)  # "simulation" or "risk"
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    inputs = Column(JSON, nullable=False)  # the request parameters
+    seed = Column(Integer)
+    summary = Column(JSON, nullable=False)  # scalar metrics
+    yearly_values = Column(JSON, nullable=False)  # {"Yearly ... Values": [...]}
+
+    # History pages walk one user's rows newest first
+    __table_args__ = (Index("ix_simulation_results_user_id_id", "user_id", "id"),)
+
 # ✅ Wake Up Neon Database
 async def activate_neon():
     if not NEON_API_KEY:
@@ -81,6 +121,16 @@ async def init_db():
         await conn.run_sync(Base.metadata.create_all)
     print("✅ Database Initialized Successfully!")
 
+# ✅ Open pooled connections ahead of the first request
+async def warm_pool(connections=1):
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    # Held at the same time, so each ping gets its own connection
+    await asyncio.gather(*(ping() for _ in range(connections)))
+    print(f"✅ Opened {connections} database connection(s)")
+
 # ✅ Dependency to get a database session
 async def get_db():
     async with AsyncSessionLocal() as session:
@@ -1,14 +1,156 @@
-
-from fastapi import FastAPI, Depends
+import os
+import time
+import asyncio
+from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from database import get_db
+from database import get_db, db_telemetry, init_db, warm_pool
 from fastapi.middleware.cors import CORSMiddleware
-from auth import auth_router
+from auth import auth_router, get_current_user, auth_cache_stats, require_admin, ADMIN_TOKEN
 from routes.simulate import router as simulate_router
 from routes.suggestions import router as suggestions_router  
 from routes.risk_assessment import router as risk_router  
+from routes.history import router as history_router
+from routes.profiles import router as profiles_router
+from utils.market_data import get_store
+from utils.executor import get_executor, shutdown_executor, run_in_executor, EXECUTOR_WORKERS
+from utils.passwords import get_password_executor, shutdown_password_executor
+from utils.result_cache import cache_stats
+from utils.asset_stats import stats_cache_info
+from utils import metrics
+from utils.profiling import ProfilingMiddleware, PROFILING_ENABLED
+from services.history import history_queue
+from services.simulation_core import warm_kernels
+from contextlib import asynccontextmanager
+
+# Startup warm-up, run by the lifespan before the first request is accepted
+STARTUP_WAKE_DATABASE = os.getenv("STARTUP_WAKE_DATABASE", "1") == "1"  # wake Neon and create missing tables
+STARTUP_DB_CONNECTIONS = int(os.getenv("STARTUP_DB_CONNECTIONS", "1"))  # pooled connections to open (0 = none)
+STARTUP_DB_TIMEOUT = float(os.getenv("STARTUP_DB_TIMEOUT", "15"))  # seconds; a slow database does not block startup
+STARTUP_WARM_KERNELS = os.getenv("STARTUP_WARM_KERNELS", "1") == "1"  # tiny simulation in-process and per worker
+# "background" builds the suggestion frontiers after the server is ready (suggestions are solved
+# per request until then); "block" finishes them before the first request is accepted
+STARTUP_FRONTIERS = os.getenv("STARTUP_FRONTIERS", "background")
+
+# Seconds and outcome of every warm-up step, served at /health
+startup_report = {"ready": False, "steps": {}}
+
+
+async def timed_step(name, step, timeout=None, required=False):
+    """
+    Awaits step() and records how long it took. Optional steps that fail or time out are logged and skipped.
+    """
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        await asyncio.wait_for(step(), timeout)
+    except Exception as e:
+        if required:
+            raise
+        status = f"failed: {type(e).__name__}: {e}"
+        print(f"❌ Startup step {name} {status}")
+    startup_report["steps"][name] = {"seconds": round(time.perf_counter() - start, 3), "status": status}
+
+
+async def warm_database():
+    # Neon suspends idle computes: wake it first, then open the pool the first requests will use
+    if STARTUP_WAKE_DATABASE:
+        await timed_step("database", init_db, timeout=STARTUP_DB_TIMEOUT)
+    if STARTUP_DB_CONNECTIONS > 0:
+        await timed_step("pool", lambda: warm_pool(STARTUP_DB_CONNECTIONS), timeout=STARTUP_DB_TIMEOUT)
+
+
+async def warm_compute():
+    async def kernels():
+        await asyncio.to_thread(warm_kernels)
+        # One task per worker, so every worker process has started and run a simulation
+        await asyncio.gather(*(run_in_executor(warm_kernels) for _ in range(EXECUTOR_WORKERS)))
+
+    async def frontiers():
+        # Imported here: SciPy is only needed by the suggestions route and this step
+        from services.suggestions_services import build_suggestion_frontiers, refresh_suggestion_frontiers
+        if STARTUP_FRONTIERS == "block":
+            await asyncio.to_thread(build_suggestion_frontiers)
+        else:
+            refresh_suggestion_frontiers()
+
+    # Parse the historical datasets once, before the first request arrives
+    await timed_step("market_data", lambda: asyncio.to_thread(get_store().preload), required=True)
+    # Start the compute workers for simulations and optimizations
+    get_executor()
+    if STARTUP_WARM_KERNELS:
+        await timed_step("kernels", kernels)
+    # Solve the suggestion optimizers over their parameter grids once per data version
+    await timed_step("suggestion_frontiers", frontiers)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    # The database steps wait on the network, the compute steps on the CPU (in threads), so they overlap
+    await asyncio.gather(warm_database(), warm_compute())
+    # Threads for bcrypt, kept apart from the compute workers
+    get_password_executor()
+    # Background writer that batches history rows into bulk inserts
+    history_queue.start()
+    startup_report["ready"] = True
+    startup_report["seconds"] = round(time.perf_counter() - start, 3)
+    print(f"✅ Startup finished in {startup_report['seconds']}s")
+    yield
+    await history_queue.stop()
+    shutdown_password_executor()
+    shutdown_executor()
+
+
+class TimedJSONResponse(JSONResponse):
+    # Times the JSON encoding of every response body as the "serialize" stage
+    def render(self, content):
+        with metrics.stage("serialize"):
+            return super().render(content)
+
+
+def app_metrics():
+    """
+    Cache, auth, database pool and history queue counters for /metrics, read from the stats they already keep.
+    """
+    events, entries = [], []
+    caches = {**cache_stats(), **{f"auth_{name}": stats for name, stats in auth_cache_stats().items()}}
+    for name, stats in caches.items():
+        for event in ("hits", "disk_hits", "misses", "evictions", "expired"):
+            if event in stats:
+                events.append(("app_cache_events_total", {"cache": name, "event": event}, stats[event]))
+        entries.append(("app_cache_entries", {"cache": name}, stats["entries"]))
+    for name, info in stats_cache_info().items():
+        events.append(("app_cache_events_total", {"cache": name, "event": "hits"}, info.hits))
+        events.append(("app_cache_events_total", {"cache": name, "event": "misses"}, info.misses))
+        entries.append(("app_cache_entries", {"cache": name}, info.currsize))
+
+    db = db_telemetry.stats()
+    history = history_queue.stats()
+    return [
+        ("app_cache_events_total", "counter", "Cache lookups by outcome, and evictions.", events),
+        ("app_cache_entries", "gauge", "Entries held per cache.", entries),
+        ("app_db_pool_events_total", "counter", "Connection pool events.",
+         [("app_db_pool_events_total", {"event": name}, db[name])
+          for name in ("connects", "checkouts", "checkins", "invalidations", "timeouts")]),
+        ("app_db_pool_connections", "gauge", "Connections per pool state.",
+         [("app_db_pool_connections", {"state": state}, db["pool"][state])
+          for state in ("checked_out", "idle", "overflow") if state in db["pool"]]),
+        ("app_db_connection_wait_seconds", "histogram", "Time to get a connection from the pool.",
+         db_telemetry.connection_wait.prometheus_samples("app_db_connection_wait_seconds")),
+        ("app_db_query_duration_seconds", "histogram", "Query execution time.",
+         db_telemetry.query_latency.prometheus_samples("app_db_query_duration_seconds")),
+        ("app_history_rows_total", "counter", "History rows by outcome.",
+         [("app_history_rows_total", {"outcome": name}, history[name]) for name in ("queued", "written", "dropped")]),
+        ("app_history_pending_rows", "gauge", "History rows waiting to be written.",
+         [("app_history_pending_rows", {}, history["pending"])]),
+    ]
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan, default_response_class=TimedJSONResponse)
+
+if metrics.METRICS_ENABLED:
+    metrics.register_collector(app_metrics)
 
 
 
@@ -17,15 +159,21 @@ app.include_router(auth_router, prefix="/auth")
 
 
 print("✅ Simulate Router Loaded Successfully!")
-app.include_router(simulate_router, prefix="/simulate")
+app.include_router(simulate_router, prefix="/simulate", dependencies=[Depends(get_current_user)])
 
 
 print("✅ Suggestions Router Loaded Successfully!")
-app.include_router(suggestions_router, prefix="/suggestions")  
+app.include_router(suggestions_router, prefix="/suggestions", dependencies=[Depends(get_current_user)])  
 
 
 print("✅ Risk Assessment Router Loaded Successfully!")
-app.include_router(risk_router, prefix="/risk-assessment")
+app.include_router(risk_router, prefix="/risk-assessment", dependencies=[Depends(get_current_user)])
+
+print("✅ History Router Loaded Successfully!")
+app.include_router(history_router, prefix="/history")
+
+print("✅ Profiles Router Loaded Successfully!")
+app.include_router(profiles_router, prefix="/admin/profiles")
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,7 +183,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if PROFILING_ENABLED:
+    # Profiles requests sent with the X-Profile header or picked by PROFILING_SAMPLE_RATE (see utils/profiling.py)
+    app.add_middleware(ProfilingMiddleware, token=ADMIN_TOKEN)
+
+if metrics.METRICS_ENABLED:
+    # Outermost, so the time includes CORS handling and failed requests
+    app.add_middleware(metrics.RequestMetricsMiddleware)
+
 
 @app.get("/")
 async def test_db(db: AsyncSession = Depends(get_db)):
     return {"message": "Database connected successfully!"}
+
+
+@app.get("/cache/stats", dependencies=[Depends(require_admin)])
+async def get_cache_stats():
+    """
+    Hit/miss counters and sizes of the result caches, the auth token caches, the suggestion
+    frontier indexes and the history write queue. Needs the X-Admin-Token header.
+    """
+    from services.suggestions_services import frontier_stats
+    return {**cache_stats(), "auth": auth_cache_stats(), "suggestion_frontiers": frontier_stats(),
+            "history_queue": history_queue.stats()}
+
+
+
+@app.get("/db/stats", dependencies=[Depends(require_admin)])
+async def get_db_stats():
+    """
+    Connection pool usage, connection wait times and query latency histograms. Needs the X-Admin-Token header.
+    """
+    return db_telemetry.stats()
+
+
+
+@app.get("/health")
+async def health():
+    """
+    Readiness probe: ready once the warm-up finished, with the time each step took.
+    """
+    return startup_report
+
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Request, stage, optimizer, cache and process metrics in the Prometheus text format.
+
+    Only served when METRICS_ENABLED=1; otherwise nothing is recorded and this returns 404.
+    """
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (set METRICS_ENABLED=1).")
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
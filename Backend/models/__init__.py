@@ -1,2 +1,2 @@
-from .gbm_model import geometric_brownian_motion
+from .gbm_model import geometric_brownian_motion, simulate_gbm_paths
 
@@ -0,0 +1,90 @@
+import os
+import time
+import numpy as np
+
+# Starting grid size for build_frontier_index; intervals are then split where interpolation is off
+FRONTIER_GRID_POINTS = int(os.getenv("FRONTIER_GRID_POINTS", "33"))
+# Largest allowed interpolation error of a weight (as a fraction, 1e-4 = 0.01 percentage points)
+FRONTIER_TOLERANCE = float(os.getenv("FRONTIER_TOLERANCE", "1e-4"))
+# Intervals narrower than this are never split further
+FRONTIER_MIN_STEP = float(os.getenv("FRONTIER_MIN_STEP", "1e-5"))
+
+
+class FrontierIndex:
+    """
+    Optimal weights sampled along one scalar parameter (e.g. risk tolerance).
+
+    Weights between grid points are interpolated linearly. Every sample is a
+    feasible portfolio, and the constraints are linear, so an interpolated
+    portfolio is feasible too. refine(x, weights), when given, turns an
+    interpolated portfolio into the exact optimum for x.
+    """
+
+    def __init__(self, grid, weights, refine=None, solves=0, build_time=0.0):
+        self.grid = np.asarray(grid, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.refine = refine
+        self.solves = solves
+        self.build_time = build_time
+
+    def covers(self, x):
+        return self.grid[0] <= x <= self.grid[-1]
+
+    def lookup(self, x, refine=False):
+        """
+        Weights for parameter value x; refine=True polishes them into the exact optimum.
+        """
+        if not self.covers(x):
+            raise ValueError(f"❌ {x} is outside the frontier index range [{self.grid[0]}, {self.grid[-1]}]")
+
+        right = min(int(np.searchsorted(self.grid, x)), len(self.grid) - 1)
+        left = max(right - 1, 0)
+        span = self.grid[right] - self.grid[left]
+        share = (x - self.grid[left]) / span if span > 0 else 0.0
+        weights = (1 - share) * self.weights[left] + share * self.weights[right]
+
+        if refine and self.refine is not None:
+            weights = self.refine(x, weights)
+        return weights
+
+    def stats(self):
+        return {
+            "points": len(self.grid),
+            "range": [float(self.grid[0]), float(self.grid[-1])],
+            "solves": self.solves,
+            "build_time_s": round(self.build_time, 4),
+        }
+
+
+def build_frontier_index(solve, lower, upper, points=None, tolerance=None, min_step=None, refine=None):
+    """
+    Samples solve(x) -> weights on [lower, upper] and returns a FrontierIndex.
+
+    Starts from an even grid of `points` values. Each interval is checked at its
+    midpoint: if interpolating the ends misses the solved weights by more than
+    tolerance, both halves are checked again. The optimal weights only bend
+    where a bound becomes active or inactive, so the extra points end up around
+    those kinks and the flat stretches stay coarse.
+    """
+    points = points or FRONTIER_GRID_POINTS
+    tolerance = FRONTIER_TOLERANCE if tolerance is None else tolerance
+    min_step = FRONTIER_MIN_STEP if min_step is None else min_step
+
+    start_time = time.perf_counter()
+    samples = {float(x): np.asarray(solve(float(x)), dtype=np.float64) for x in np.linspace(lower, upper, points)}
+    pending = sorted(samples)
+    pending = list(zip(pending[:-1], pending[1:]))
+
+    while pending:
+        left, right = pending.pop()
+        middle = (left + right) / 2
+        if right - left <= min_step:
+            continue
+        samples[middle] = np.asarray(solve(middle), dtype=np.float64)
+        error = np.max(np.abs(samples[middle] - (samples[left] + samples[right]) / 2))
+        if error > tolerance:
+            pending.extend([(left, middle), (middle, right)])
+
+    grid = sorted(samples)
+    return FrontierIndex(grid, [samples[x] for x in grid], refine=refine, solves=len(samples),
+                         build_time=time.perf_counter() - start_time)
@@ -1,27 +1,92 @@
 
+import os
 import numpy as np
+from utils.metrics import staged
+from models.monte_carlo import resolve_dtype, legacy_rng
 
-def geometric_brownian_motion(initial_value, mean_return, volatility, time_horizon, steps_per_year=252):
+# Number of GBM paths the services simulate per asset
+GBM_PATHS = int(os.getenv("GBM_PATHS", "100"))
+
+
+class GBMResult:
     """
-    Simulates asset price using Geometric Brownian Motion and returns yearly values.
+    Per-path output of a batched GBM run plus summary statistics.
+
+    final_values has shape (n_paths,), yearly_values has shape (n_paths, time_horizon).
+    """
+
+    def __init__(self, final_values, yearly_values):
+        self.final_values = final_values
+        self.yearly_values = yearly_values
+
+    @property
+    def n_paths(self):
+        return len(self.final_values)
+
+    @property
+    def mean_final_value(self):
+        return float(self.final_values.mean())
+
+    @property
+    def mean_yearly_values(self):
+        return self.yearly_values.mean(axis=0)
+
+    def summary(self, percentiles=(5, 50, 95)):
+        summary = {
+            "paths": self.n_paths,
+            "mean": self.mean_final_value,
+            "std": float(self.final_values.std(ddof=1)) if self.n_paths > 1 else 0.0,
+        }
+        for p, value in zip(percentiles, np.percentile(self.final_values, percentiles)):
+            summary[f"p{p}"] = float(value)
+        return summary
+
+
+def simulate_gbm_paths(initial_value, mean_return, volatility, time_horizon, n_paths=1, steps_per_year=252, seed=42,
+                       precision=None):
+    """
+    Simulates n_paths GBM price paths in one batched call.
+
+    Log-prices are built with a single cumulative sum over a (steps, n_paths)
+    array of increments; only the yearly checkpoints and final values are
+    exponentiated. precision selects the dtype of the increments (see
+    resolve_dtype); the returned values are float64. seed is an int or a
+    Generator/RandomState (see legacy_rng); the global RNG is never touched.
 
     Returns:
-        price_path (np.array): Full simulated price path.
-        yearly_values (np.array): Extracted yearly values.
+        GBMResult: final and yearly values for every path.
     """
     dt = 1 / steps_per_year
     time_steps = int(time_horizon * steps_per_year)
-    np.random.seed(42)
-    shocks = np.random.normal(0, np.sqrt(dt), size=time_steps)
-    price_path = np.zeros(time_steps + 1)
-    price_path[0] = initial_value
-
-    for t in range(1, time_steps+1 ):
-        price_path[t] = price_path[t - 1] * np.exp((mean_return - 0.5 * volatility**2) * dt + volatility * shocks[t - 1])
-    
-    # Extract yearly values
-    yearly_values = np.array([price_path[min(year * steps_per_year, time_steps )] for year in range(time_horizon)])
-  # Ensure correct yearly intervals
-    # print("Shape of Yearly Portfolio Values:", yearly_values.shape)
-    # print("Final Portfolio Value:", price_path[-1] )
-    return price_path[-1], yearly_values  # Return full price path & yearly values
+    increments = legacy_rng(seed).normal(0, np.sqrt(dt), size=(time_steps, n_paths)).astype(resolve_dtype(precision), copy=False)
+    increments *= volatility
+    increments += (mean_return - 0.5 * volatility**2) * dt
+    log_paths = np.cumsum(increments, axis=0, out=increments)
+
+    # Yearly values start with the initial value (year 0)
+    checkpoints = [min(year * steps_per_year, time_steps) for year in range(time_horizon)]
+    log_yearly = np.zeros((time_horizon, n_paths), dtype=increments.dtype)
+    for row, step in enumerate(checkpoints):
+        if step > 0:
+            log_yearly[row] = log_paths[step - 1]
+
+    final_log = log_paths[-1] if time_steps > 0 else np.zeros(n_paths, dtype=increments.dtype)
+    return GBMResult(initial_value * np.exp(final_log).astype(np.float64),
+                     initial_value * np.exp(log_yearly.T).astype(np.float64))
+
+
+@staged("gbm")
+def geometric_brownian_motion(initial_value, mean_return, volatility, time_horizon, steps_per_year=252, n_paths=1,
+                              precision=None, seed=42):
+    """
+    Simulates asset price using Geometric Brownian Motion and returns yearly values.
+
+    With n_paths > 1 the values are averaged over the simulated paths.
+
+    Returns:
+        final_value (float): Simulated (mean) final price.
+        yearly_values (np.array): Extracted (mean) yearly values.
+    """
+    result = simulate_gbm_paths(initial_value, mean_return, volatility, time_horizon, n_paths, steps_per_year,
+                                seed=seed, precision=precision)
+    return result.mean_final_value, result.mean_yearly_values
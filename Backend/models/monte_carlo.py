@@ -1,22 +1,109 @@
 
+import os
 import numpy as np
+from utils.metrics import staged
 
-def monte_carlo_simulation(initial_value, mean_return, volatility, time_horizon, iterations=10000):
+TRADING_DAYS = 252
+
+# Upper bound on the working memory of one simulation (draws + temporaries), in bytes
+MC_MEMORY_BUDGET = int(os.getenv("MC_MEMORY_BUDGET_MB", "64")) * 1024 * 1024
+
+# float64 draws plus one same-sized temporary from np.exp
+_BYTES_PER_CELL = 2 * 8
+
+# Floating point type of the simulation arrays: "float64" (default) or "float32".
+# float32 halves memory and bandwidth; summary statistics are always accumulated in float64.
+SIMULATION_PRECISION = os.getenv("SIMULATION_PRECISION", "float64")
+PRECISIONS = ("float64", "float32")
+
+
+def resolve_dtype(precision=None):
+    precision = precision or SIMULATION_PRECISION
+    if precision not in PRECISIONS:
+        raise ValueError(f"❌ Invalid simulation precision: {precision}")
+    return np.dtype(precision)
+
+
+# Seed of the simulations when a request does not pass its own
+SIMULATION_SEED = int(os.getenv("SIMULATION_SEED", "42"))
+
+
+def child_seed(seed, index):
+    """
+    The index-th independent child stream of an integer seed (SeedSequence spawn key).
+    """
+    return np.random.SeedSequence(seed, spawn_key=(index,))
+
+
+def legacy_rng(seed):
+    """
+    A private random source for seed, so simulations never touch NumPy's global state.
+
+    Integers give a RandomState, which draws exactly the numbers np.random.seed(seed)
+    would; Generators and RandomStates are used as they are.
+    """
+    if isinstance(seed, (np.random.Generator, np.random.RandomState)):
+        return seed
+    return np.random.RandomState(seed)
+
+
+@staged("monte_carlo")
+def monte_carlo_simulation(initial_value, mean_return, volatility, time_horizon, iterations=10000, memory_budget=None,
+                           precision=None, seed=42):
     """
     Monte Carlo simulation to estimate future investment performance with yearly values.
 
+    Paths are generated in blocks of days and the log-price is carried forward
+    between blocks, so only the yearly checkpoints and final values are kept.
+    Working memory stays within memory_budget bytes (MC_MEMORY_BUDGET by default)
+    whatever the horizon. When all paths fit into one block row the random stream
+    is consumed in the same order as a dense (days, iterations) draw, so the
+    results equal the dense computation exactly. If iterations alone exceed the
+    budget, paths are processed in chunks, one after another.
+
+    precision selects the dtype of the path arrays (SIMULATION_PRECISION by
+    default). The legacy global RNG only draws float64, so in float32 the draws
+    are converted block by block before the cumulative sum and exponential.
+
+    seed is an int (drawn with a private RandomState, so the numbers equal
+    those after np.random.seed(seed)) or a Generator/RandomState.
+
     Returns:
-        final_values (np.array): Simulated final portfolio values.
+        final_values (float): Average simulated final portfolio value.
         yearly_values (np.array): Average portfolio values at each year.
     """
-    np.random.seed(42)
-    daily_returns = np.random.normal(mean_return / 252, volatility / np.sqrt(252), (time_horizon * 252, iterations))
-    growth_factors = np.exp(daily_returns.cumsum(axis=0))
-    portfolio_values = initial_value * growth_factors  # Shape: (days, iterations)
+    dtype = resolve_dtype(precision)
+    rng = legacy_rng(seed)
+    budget = memory_budget or MC_MEMORY_BUDGET
+    days = time_horizon * TRADING_DAYS
+    daily_mean = mean_return / TRADING_DAYS
+    daily_volatility = volatility / np.sqrt(TRADING_DAYS)
+
+    path_chunk = int(max(1, min(iterations, budget // _BYTES_PER_CELL)))
+    yearly_sums = np.zeros(time_horizon)
+    final_sum = 0.0
+
+    for path_start in range(0, iterations, path_chunk):
+        n_paths = min(path_chunk, iterations - path_start)
+        block_days = int(max(1, min(TRADING_DAYS, budget // (_BYTES_PER_CELL * n_paths))))
+        log_level = np.zeros(n_paths)
+
+        for year in range(time_horizon):
+            year_start = year * TRADING_DAYS
+            for day in range(year_start, year_start + TRADING_DAYS, block_days):
+                rows = min(block_days, year_start + TRADING_DAYS - day)
+                block = rng.normal(daily_mean, daily_volatility, (rows, n_paths)).astype(dtype, copy=False)
+                block[0] += log_level
+                np.cumsum(block, axis=0, out=block)
 
-    yearly_values = portfolio_values[::252, :].mean(axis=1)[:time_horizon]
+                if day == year_start:
+                    yearly_sums[year] += (initial_value * np.exp(block[0])).sum(dtype=np.float64)
+                if day + rows == days:
+                    final_sum += (initial_value * np.exp(block[-1])).sum(dtype=np.float64)
 
-    
+                log_level = block[-1].copy()
+                del block
 
+    yearly_values = yearly_sums / iterations
 
-    return portfolio_values[-1, :].mean(), yearly_values  
+    return final_sum / iterations, yearly_values
@@ -0,0 +1,192 @@
+import os
+import numpy as np
+import scipy.optimize as sco
+from utils.metrics import OPTIMIZER_ITERATIONS
+
+# "legacy": closure objectives with finite-difference gradients (the original behaviour)
+# "analytic": NumPy objectives with closed-form gradients passed to SLSQP
+# "qp": exact search along the efficient frontier with an active-set QP solver, then one analytic polish
+OPTIMIZER_BACKEND = os.getenv("OPTIMIZER_BACKEND", "qp")
+BACKENDS = ("legacy", "analytic", "qp")
+
+
+def resolve_backend(backend=None):
+    backend = backend or OPTIMIZER_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"❌ Invalid optimizer backend: {backend}")
+    return backend
+
+
+def mean_volatility_objective(mean_returns, cov_matrix, risk_aversion):
+    """
+    f(w) = -(w'mu - risk_aversion * sqrt(w' Sigma w)) and its gradient, for jac=True.
+    """
+    mean_returns = np.asarray(mean_returns, dtype=np.float64)
+    cov_matrix = np.asarray(cov_matrix, dtype=np.float64)
+
+    def objective(weights):
+        cov_weights = cov_matrix @ weights
+        volatility = np.sqrt(weights @ cov_weights)
+        value = -(weights @ mean_returns - risk_aversion * volatility)
+        gradient = -mean_returns + risk_aversion * cov_weights / volatility
+        return value, gradient
+
+    return objective
+
+
+def sharpe_objective(mean_returns, cov_matrix, risk_tolerance):
+    """
+    f(w) = -(w'mu) ** risk_tolerance / sqrt(w' Sigma w) and its gradient, for jac=True.
+    """
+    mean_returns = np.asarray(mean_returns, dtype=np.float64)
+    cov_matrix = np.asarray(cov_matrix, dtype=np.float64)
+
+    def objective(weights):
+        cov_weights = cov_matrix @ weights
+        volatility = np.sqrt(weights @ cov_weights)
+        portfolio_return = weights @ mean_returns
+        scaled_return = portfolio_return ** risk_tolerance
+        value = -scaled_return / volatility
+        gradient = (-risk_tolerance * portfolio_return ** (risk_tolerance - 1) * mean_returns / volatility
+                    + scaled_return * cov_weights / volatility**3)
+        return value, gradient
+
+    return objective
+
+
+def solve_box_budget_qp(Q, c, lower, upper, budget=1.0, max_iter=100, tol=1e-12):
+    """
+    Active-set solver for  min 1/2 w'Qw + c'w  s.t.  sum(w) = budget, lower <= w <= upper.
+
+    Q must be positive semi-definite. Meant for the handful of assets we
+    optimize, where each iteration is one tiny dense KKT solve.
+    """
+    Q = np.asarray(Q, dtype=np.float64)
+    c = np.asarray(c, dtype=np.float64)
+    lower = np.asarray(lower, dtype=np.float64)
+    upper = np.asarray(upper, dtype=np.float64)
+    n = len(c)
+
+    if lower.sum() > budget + tol or upper.sum() < budget - tol:
+        raise ValueError("QP is infeasible: bounds cannot meet the budget.")
+
+    # Feasible start: spread the budget left over by the lower bounds in proportion to the room
+    room = upper - lower
+    weights = lower + (budget - lower.sum()) * room / room.sum()
+    at_lower = np.zeros(n, dtype=bool)
+    at_upper = np.zeros(n, dtype=bool)
+
+    for iteration in range(1, max_iter + 1):
+        free = ~(at_lower | at_upper)
+        gradient = Q @ weights + c
+
+        if free.any():
+            idx = np.flatnonzero(free)
+            k = len(idx)
+            kkt = np.zeros((k + 1, k + 1))
+            kkt[:k, :k] = Q[np.ix_(idx, idx)]
+            kkt[:k, k] = 1.0
+            kkt[k, :k] = 1.0
+            # Solve for the step p on the free variables (sum(p) = 0 keeps the budget)
+            rhs = np.concatenate((-gradient[idx], [0.0]))
+            try:
+                solution = np.linalg.solve(kkt, rhs)
+            except np.linalg.LinAlgError:
+                solution = np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+            step = solution[:k]
+            multiplier = solution[k]
+        else:
+            step = np.zeros(0)
+            idx = np.zeros(0, dtype=int)
+            multiplier = -gradient.mean()
+
+        if np.max(np.abs(step), initial=0.0) <= 1e-14:
+            # Stationary on the working set: check the signs of the bound multipliers
+            bound_multipliers = gradient + multiplier
+            bound_multipliers = np.where(at_lower, bound_multipliers, np.where(at_upper, -bound_multipliers, np.inf))
+            worst = int(np.argmin(bound_multipliers))
+            if bound_multipliers[worst] >= -1e-12:
+                OPTIMIZER_ITERATIONS.inc(iteration, solver="box_qp")
+                return weights
+            at_lower[worst] = at_upper[worst] = False
+            continue
+
+        # Largest step along p that keeps every free variable inside its bounds
+        alpha = 1.0
+        blocking = None
+        for position, i in enumerate(idx):
+            if step[position] < 0:
+                ratio = (lower[i] - weights[i]) / step[position]
+            elif step[position] > 0:
+                ratio = (upper[i] - weights[i]) / step[position]
+            else:
+                continue
+            if ratio < alpha:
+                alpha, blocking = max(ratio, 0.0), (i, step[position] < 0)
+
+        weights[idx] += alpha * step
+        if blocking is not None:
+            i, hits_lower = blocking
+            weights[i] = lower[i] if hits_lower else upper[i]
+            at_lower[i], at_upper[i] = hits_lower, not hits_lower
+
+    OPTIMIZER_ITERATIONS.inc(max_iter, solver="box_qp")
+    return weights
+
+
+def frontier_search(mean_returns, cov_matrix, bounds, score, iterations=40):
+    """
+    Maximizes score(w) over the efficient frontier of the box/budget-constrained set.
+
+    Frontier portfolios are exact QP solutions of  min 1/2 w'Sigma w - t w'mu
+    for a trade-off t >= 0; score is maximized over log(t) by golden-section
+    search (40 steps narrow log(t) to ~1e-7; polish() does the rest). Any
+    objective that increases with return and decreases with volatility
+    (mean-volatility, Sharpe-style) has its optimum on this curve.
+
+    :return: (weights, score) of the best frontier portfolio found
+    """
+    mean_returns = np.asarray(mean_returns, dtype=np.float64)
+    cov_matrix = np.asarray(cov_matrix, dtype=np.float64)
+    lower = np.array([b[0] for b in bounds], dtype=np.float64)
+    upper = np.array([b[1] for b in bounds], dtype=np.float64)
+
+    scale = np.trace(cov_matrix) / len(mean_returns) / max(np.max(np.abs(mean_returns)), 1e-300)
+    cache = {}
+
+    def evaluate(log_t):
+        if log_t not in cache:
+            weights = solve_box_budget_qp(cov_matrix, -np.exp(log_t) * scale * mean_returns, lower, upper)
+            value = score(weights)
+            cache[log_t] = (weights, value if np.isfinite(value) else -np.inf)
+        return cache[log_t]
+
+    ratio = (np.sqrt(5) - 1) / 2
+    a, b = np.log(1e-6), np.log(1e6)
+    x1, x2 = b - ratio * (b - a), a + ratio * (b - a)
+    for _ in range(iterations):
+        if evaluate(x1)[1] >= evaluate(x2)[1]:
+            b, x2 = x2, x1
+            x1 = b - ratio * (b - a)
+        else:
+            a, x1 = x1, x2
+            x2 = a + ratio * (b - a)
+
+    # Golden section assumes one peak; also look at both ends of the frontier
+    candidates = [evaluate(x) for x in (x1, x2, np.log(1e-6), np.log(1e6))]
+    return max(candidates, key=lambda candidate: candidate[1])
+
+
+def polish(objective, initial_weights, bounds, constraints, ftol=None):
+    """
+    One SLSQP solve with an analytic gradient, starting from initial_weights.
+
+    ftol overrides SLSQP's stopping tolerance (1e-6). Objectives built from daily
+    returns are around 1e-3, so weights that differ by a few tenths of a percent
+    can sit within the default tolerance of each other.
+    """
+    options = {"ftol": ftol} if ftol else None
+    result = sco.minimize(objective, initial_weights, method='SLSQP', jac=True, bounds=bounds, constraints=constraints,
+                          options=options)
+    OPTIMIZER_ITERATIONS.inc(result.nit, solver="slsqp")
+    return result
@@ -1,29 +1,148 @@
-import pandas as pd
+import os
+import time
+import functools
 import numpy as np
 import scipy.optimize as sco  
 from scipy.optimize import minimize
+from concurrent.futures import ThreadPoolExecutor
+from models.optimizer_backends import (
+    resolve_backend, mean_volatility_objective, sharpe_objective, frontier_search, polish
+)
+from models.frontier_index import build_frontier_index
+from utils.metrics import staged, OPTIMIZER_STARTS, OPTIMIZER_ITERATIONS
 
+# Multi-start search settings for optimize_stock_allocation
+OPTIMIZER_MAX_STARTS = int(os.getenv("OPTIMIZER_MAX_STARTS", "1000"))
+OPTIMIZER_PATIENCE = int(os.getenv("OPTIMIZER_PATIENCE", "50"))  # starts without improvement before stopping
+OPTIMIZER_TIME_BUDGET = float(os.getenv("OPTIMIZER_TIME_BUDGET", "5"))  # seconds
+OPTIMIZER_BATCH_SIZE = int(os.getenv("OPTIMIZER_BATCH_SIZE", "10"))
+OPTIMIZER_WORKERS = int(os.getenv("OPTIMIZER_WORKERS", "1"))
+OPTIMIZER_SEED = int(os.getenv("OPTIMIZER_SEED", "42"))
+# SLSQP tolerance for the precomputed frontier indexes, which are solved once per data load
+FRONTIER_FTOL = float(os.getenv("FRONTIER_FTOL", "1e-12"))
 
 
-def optimize_stock_allocation(stock_data, risk_tolerance, duration):
+def multi_start_minimize(objective, num_assets, bounds, constraints, max_starts=None, patience=None,
+                         time_budget=None, seed=None, batch_size=None, workers=None, tol=1e-10, **minimize_kwargs):
+    """
+    Runs SLSQP from random Dirichlet starting points and keeps the best solution.
+
+    Starts are drawn from a seeded generator and solved in batches (on a thread
+    pool when workers > 1). Results are always examined in start order, so a
+    given seed and batch size reproduce the same answer. The search stops after
+    max_starts, once `patience` consecutive starts failed to improve the best
+    objective by more than tol, or when time_budget seconds have passed.
+
+    :return: (best scipy OptimizeResult or None, info dict with starts, wall_time_s and stop_reason)
+    """
+    max_starts = OPTIMIZER_MAX_STARTS if max_starts is None else max_starts
+    patience = OPTIMIZER_PATIENCE if patience is None else patience
+    time_budget = OPTIMIZER_TIME_BUDGET if time_budget is None else time_budget
+    seed = OPTIMIZER_SEED if seed is None else seed
+    batch_size = batch_size or OPTIMIZER_BATCH_SIZE
+    workers = workers or OPTIMIZER_WORKERS
+
+    def solve(initial_weights):
+        result = sco.minimize(objective, initial_weights, method='SLSQP', bounds=bounds,
+                              constraints=constraints, **minimize_kwargs)
+        OPTIMIZER_ITERATIONS.inc(result.nit, solver="slsqp")
+        return result
+
+    rng = np.random.default_rng(seed)
+    start_time = time.perf_counter()
+    best_result = None
+    best_value = float("inf")
+    starts = 0
+    since_improvement = 0
+    stop_reason = "max_starts"
+
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while starts < max_starts and stop_reason == "max_starts":
+            initial_weights = rng.dirichlet(np.ones(num_assets), size=min(batch_size, max_starts - starts))
+            results = list(pool.map(solve, initial_weights)) if pool else [solve(x0) for x0 in initial_weights]
+
+            for result in results:
+                starts += 1
+                if result.success and result.fun < best_value - tol:
+                    best_result = result
+                    best_value = result.fun
+                    since_improvement = 0
+                else:
+                    since_improvement += 1
+                if patience and since_improvement >= patience:
+                    stop_reason = "no_improvement"
+                    break
+
+            if stop_reason == "max_starts" and time_budget and time.perf_counter() - start_time >= time_budget:
+                stop_reason = "time_budget"
+    finally:
+        if pool:
+            pool.shutdown()
+
+    info = {
+        "starts": starts,
+        "wall_time_s": round(time.perf_counter() - start_time, 4),
+        "stop_reason": stop_reason,
+    }
+    return best_result, info
+
+
+
+def _frontier_optimum(objective, mean_returns, cov_matrix, bounds, constraints, ftol=None):
+    """
+    Best efficient-frontier portfolio for a jac=True objective, refined by one SLSQP polish.
+
+    Returns an OptimizeResult, or None when no frontier portfolio has a finite objective.
+    """
+    weights, score = frontier_search(mean_returns, cov_matrix, bounds, lambda w: -objective(w)[0])
+    if not np.isfinite(score):
+        return None
+
+    result = polish(objective, weights, bounds, constraints, ftol=ftol)
+    if result.success and result.fun <= -score:
+        return result
+    return sco.OptimizeResult(x=weights, fun=-score, success=True, message="Efficient frontier optimum")
+
+
+@staged("optimize_stock_allocation")
+def optimize_stock_allocation(stock_data, risk_tolerance, duration, mean_returns=None, cov_matrix=None,
+                              return_info=False, backend=None, **search_options):
     """
     Optimizes stock allocation within the 'Stocks' category using Modern Portfolio Theory (MPT),
     factoring in risk tolerance and investment duration.
+
+    mean_returns and cov_matrix can be passed in precomputed (e.g. from utils.asset_stats),
+    in which case the prices in stock_data are not used. search_options are passed to
+    multi_start_minimize; with return_info=True the search report is returned as well.
+    backend selects the solver (see models/optimizer_backends.py, OPTIMIZER_BACKEND by default).
     """
+    allocation, info = _optimize_stock_allocation(stock_data, risk_tolerance, duration, mean_returns, cov_matrix,
+                                                  resolve_backend(backend), search_options)
+    return (allocation, info) if return_info else allocation
+
+
+def _optimize_stock_allocation(stock_data, risk_tolerance, duration, mean_returns, cov_matrix, backend, search_options):
+    info = {"starts": 0, "wall_time_s": 0.0, "stop_reason": "error"}
     try:
        
-        prices = pd.DataFrame({ticker: data['Close'] for ticker, data in stock_data.items()})
-        returns = prices.pct_change().dropna()
+        if mean_returns is None or cov_matrix is None:
+            import pandas as pd
+            prices = pd.DataFrame({ticker: data['Close'] for ticker, data in stock_data.items()})
+            returns = prices.pct_change().dropna()
 
-       
-        if prices.isnull().values.any():
+            if prices.isnull().values.any():
+                raise ValueError("Stock price data contains NaN values, please clean it.")
+
+            mean_returns = returns.mean()
+            cov_matrix = returns.cov()
+
+        if np.isnan(np.asarray(cov_matrix)).any():
             raise ValueError("Stock price data contains NaN values, please clean it.")
 
-        if (returns.std() == 0).any():
+        if (np.diag(cov_matrix) == 0).any():
             raise ValueError("Some stocks have zero volatility, check data.")
 
-        mean_returns = returns.mean()
-        cov_matrix = returns.cov()
         num_stocks = len(stock_data)
 
         
@@ -41,45 +160,52 @@ def optimize_stock_allocation(stock_data, risk_tolerance, duration):
         bounds = tuple((0.05, 1) for _ in range(num_stocks))
 
         
-        best_result = None
-        best_weights = None
-        best_value = float("inf")
-
-        for _ in range(1000):  
-            initial_weights = np.random.dirichlet(np.ones(num_stocks), size=1)[0]  
-            result = sco.minimize(objective_function, initial_weights, method='SLSQP', bounds=bounds, constraints=constraints)
-
-            if result.success and result.fun < best_value:
-                best_result = result
-                best_weights = result.x
-                best_value = result.fun
+        if backend == "legacy":
+            best_result, info = multi_start_minimize(objective_function, num_stocks, bounds, constraints, **search_options)
+        elif backend == "analytic":
+            objective = mean_volatility_objective(mean_returns, cov_matrix, risk_aversion)
+            best_result, info = multi_start_minimize(objective, num_stocks, bounds, constraints, jac=True, **search_options)
+        else:
+            # Concave in the weights, so the frontier optimum is global and one polish is enough
+            start_time = time.perf_counter()
+            objective = mean_volatility_objective(mean_returns, cov_matrix, risk_aversion)
+            best_result = _frontier_optimum(objective, mean_returns, cov_matrix, bounds, constraints)
+            info = {"starts": 1, "wall_time_s": round(time.perf_counter() - start_time, 4), "stop_reason": "qp"}
+        info["backend"] = backend
+        OPTIMIZER_STARTS.inc(info["starts"], optimizer="stock_allocation")
 
         if best_result is None:
-            return {"error": "Stock optimization failed."}
+            return {"error": "Stock optimization failed."}, info
 
       
+        best_weights = best_result.x
         optimized_weights = best_weights / np.sum(best_weights)
-        return {stock: round(weight * 100, 2) for stock, weight in zip(stock_data.keys(), optimized_weights)}
+        return {stock: round(weight * 100, 2) for stock, weight in zip(stock_data.keys(), optimized_weights)}, info
 
     except Exception as e:
         print(f"Error optimizing stock allocation: {e}")
-        return {"error": "Stock allocation optimization failed."}
+        return {"error": "Stock allocation optimization failed."}, info
 
 
 
 
-def optimize_portfolio(price_data, user_allocation, risk_tolerance):
+@staged("optimize_portfolio")
+def optimize_portfolio(price_data, user_allocation, risk_tolerance, mean_returns=None, cov_matrix=None, backend=None):
     """
     Performs Mean-Variance Portfolio Optimization (MPT) with user preferences.
 
     :param price_data: DataFrame with historical closing prices.
     :param user_allocation: User-defined initial allocation (list of weights).
     :param risk_tolerance: User's risk preference (0 = low, 1 = high).
+    :param mean_returns: Optional precomputed daily mean returns (skips price_data).
+    :param cov_matrix: Optional precomputed covariance of daily returns.
+    :param backend: Solver backend ("legacy", "analytic" or "qp"; OPTIMIZER_BACKEND by default).
     :return: Optimized asset allocation weights in percentage.
     """
-    returns = price_data.pct_change().dropna()
-    mean_returns = returns.mean()
-    cov_matrix = returns.cov()
+    if mean_returns is None or cov_matrix is None:
+        returns = price_data.pct_change().dropna()
+        mean_returns = returns.mean()
+        cov_matrix = returns.cov()
     num_assets = len(mean_returns)
 
     # Objective function: Adjust Sharpe Ratio for user risk preference
@@ -100,11 +226,75 @@ def optimize_portfolio(price_data, user_allocation, risk_tolerance):
     initial_weights = np.array(user_allocation)
 
   
-    result = sco.minimize(neg_sharpe, initial_weights, bounds=bounds, constraints=constraints)
-    if not result.success:
+    backend = resolve_backend(backend)
+    if backend == "legacy":
+        result = sco.minimize(neg_sharpe, initial_weights, bounds=bounds, constraints=constraints)
+        OPTIMIZER_ITERATIONS.inc(result.nit, solver="slsqp")
+    elif backend == "analytic":
+        result = polish(sharpe_objective(mean_returns, cov_matrix, risk_tolerance), initial_weights, bounds, constraints)
+    else:
+        result = _frontier_optimum(sharpe_objective(mean_returns, cov_matrix, risk_tolerance),
+                                   mean_returns, cov_matrix, bounds, constraints)
+
+    if result is None or not result.success:
         return {"error": "Portfolio optimization failed."}
 
 
     optimized_weights = result.x / np.sum(result.x)  
     
-    return optimized_weights * 100 
\ No newline at end of file
+    return optimized_weights * 100 
+
+
+def _refined(objective, weights, bounds, constraints):
+    result = polish(objective, weights, bounds, constraints, ftol=FRONTIER_FTOL)
+    if result.success and result.fun <= objective(weights)[0]:
+        return result.x / np.sum(result.x)
+    return weights
+
+
+def _fully_invested(x):
+    return np.sum(x) - 1
+
+
+def _refine_frontier_point(make_objective, mean_returns, cov_matrix, parameter, weights):
+    # Module level (not a closure), so a FrontierIndex can be pickled to an executor worker
+    bounds = tuple((0.05, 1) for _ in range(len(mean_returns)))
+    constraints = {'type': 'eq', 'fun': _fully_invested}
+    return _refined(make_objective(mean_returns, cov_matrix, parameter), weights, bounds, constraints)
+
+
+def _frontier_index(make_objective, mean_returns, cov_matrix, lower, upper, options):
+    bounds = tuple((0.05, 1) for _ in range(len(mean_returns)))
+    constraints = {'type': 'eq', 'fun': _fully_invested}
+
+    def solve(parameter):
+        result = _frontier_optimum(make_objective(mean_returns, cov_matrix, parameter),
+                                   mean_returns, cov_matrix, bounds, constraints, ftol=FRONTIER_FTOL)
+        if result is None or not result.success:
+            raise ValueError("Portfolio optimization failed.")
+        return result.x / np.sum(result.x)
+
+    refine = functools.partial(_refine_frontier_point, make_objective, mean_returns, cov_matrix)
+    return build_frontier_index(solve, lower, upper, refine=refine, **options)
+
+
+def portfolio_frontier_index(mean_returns, cov_matrix, lower=0.01, upper=1.0, **options):
+    """
+    FrontierIndex of the optimize_portfolio weights (as fractions) over risk_tolerance in [lower, upper].
+
+    Uses the "qp" backend's frontier search, whose answer does not depend on
+    the user's starting allocation. options are passed to build_frontier_index.
+    """
+    return _frontier_index(sharpe_objective, mean_returns, cov_matrix, lower, upper, options)
+
+
+def stock_frontier_index(mean_returns, cov_matrix, lower=0.0, upper=0.99, **options):
+    """
+    FrontierIndex of the optimize_stock_allocation weights (as fractions) over the risk aversion.
+
+    The stock objective only sees risk_tolerance and duration through
+    risk_aversion = (1 - risk_tolerance) / duration, so one axis covers every
+    (risk_tolerance, duration) pair. The default range fits risk_tolerance in
+    [0.01, 1] with any duration of a year or more.
+    """
+    return _frontier_index(mean_volatility_objective, mean_returns, cov_matrix, lower, upper, options)
@@ -0,0 +1,483 @@
+
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from utils.metrics import staged
+from models.monte_carlo import MC_MEMORY_BUDGET, TRADING_DAYS, resolve_dtype, child_seed
+
+# "pseudo": plain pseudo-random paths (the default)
+# "antithetic": paths come in pairs driven by Z and -Z
+# "control": pseudo-random paths, estimates corrected with the analytic expectation of the asset values
+# "sobol": scrambled Sobol points drive the yearly moves, daily paths are Brownian bridges between them
+SAMPLING_METHODS = ("pseudo", "antithetic", "control", "sobol")
+# Paths per batch and upper bound on the total paths when sampling until a tolerance is met
+TOLERANCE_BATCH_PATHS = int(os.getenv("TOLERANCE_BATCH_PATHS", "1024"))
+TOLERANCE_MAX_PATHS = int(os.getenv("TOLERANCE_MAX_PATHS", "100000"))
+# Sobol errors come from the spread between scrambles, which needs a few of them to be trusted
+SOBOL_MIN_REPLICATES = 4
+# Threads filling path ranges in parallel; results depend on the seed and this count only
+SIMULATION_THREADS = int(os.getenv("SIMULATION_THREADS", "1"))
+
+
+def resolve_sampling(sampling):
+    sampling = sampling or "pseudo"
+    if sampling not in SAMPLING_METHODS:
+        raise ValueError(f"❌ Invalid sampling method: {sampling}")
+    return sampling
+
+
+class PortfolioSimulation:
+    """
+    Portfolio-level output of a joint multi-asset simulation.
+
+    final_values and max_drawdowns have shape (n_paths,), yearly_values has
+    shape (n_paths, time_horizon) and holds the value at the end of each year,
+    so its last column equals final_values. yearly_drawdowns holds the max
+    drawdown reached by the end of each year (last column equals max_drawdowns).
+
+    The means and std_error take the sampling method into account: antithetic
+    paths are paired, control variates regress on the yearly asset values
+    (yearly_asset_values, shape (n_paths, time_horizon, n_assets)) whose
+    expectation is known, and Sobol runs use the spread between independently
+    scrambled replicates (replicate_sizes) once there are SOBOL_MIN_REPLICATES.
+    """
+
+    def __init__(self, initial_value, weights, cov_matrix, final_values, yearly_values, max_drawdowns,
+                 yearly_drawdowns=None, sampling="pseudo", yearly_asset_values=None, expected_asset_values=None,
+                 replicate_sizes=None):
+        self.initial_value = initial_value
+        self.weights = weights
+        self.cov_matrix = cov_matrix
+        self.final_values = final_values
+        self.yearly_values = yearly_values
+        self.max_drawdowns = max_drawdowns
+        self.yearly_drawdowns = yearly_drawdowns
+        self.sampling = sampling
+        self.yearly_asset_values = yearly_asset_values
+        self.expected_asset_values = expected_asset_values
+        self.replicate_sizes = replicate_sizes or [len(final_values)]
+
+    @property
+    def n_paths(self):
+        return len(self.final_values)
+
+    def _estimate(self, values, year_index=-1):
+        """
+        (mean, standard error) of the per-path values under the sampling method.
+        """
+        n = len(values)
+        if self.sampling == "control" and n > self.yearly_asset_values.shape[2] + 1:
+            controls = self.yearly_asset_values[:, year_index, :]
+            centered = controls - controls.mean(axis=0)
+            beta = np.linalg.lstsq(centered, values - values.mean(), rcond=None)[0]
+            mean = values.mean() - (controls.mean(axis=0) - self.expected_asset_values[year_index]) @ beta
+            residuals = values - values.mean() - centered @ beta
+            return float(mean), float(np.sqrt(residuals @ residuals / (n - len(beta) - 1) / n))
+
+        mean = float(values.mean())
+        if n < 2:
+            return mean, float("inf")
+        if self.sampling == "antithetic":
+            pairs = values.reshape(-1, 2).mean(axis=1)
+            return mean, float(pairs.std(ddof=1) / np.sqrt(len(pairs))) if len(pairs) > 1 else float("inf")
+        if self.sampling == "sobol" and len(self.replicate_sizes) >= SOBOL_MIN_REPLICATES:
+            sizes = np.array(self.replicate_sizes)
+            replicate_means = np.array([chunk.mean() for chunk in np.split(values, np.cumsum(sizes)[:-1])])
+            weights = sizes / n
+            variance = (weights**2 * (replicate_means - mean) ** 2).sum() * len(sizes) / (len(sizes) - 1)
+            return mean, float(np.sqrt(variance))
+        # Too few Sobol replicates for an error estimate of their own; the plain one is an upper bound
+        return mean, float(values.std(ddof=1) / np.sqrt(n))
+
+    @property
+    def mean_final_value(self):
+        return self._estimate(self.final_values)[0]
+
+    @property
+    def std_error(self):
+        """Standard error of mean_final_value."""
+        return self._estimate(self.final_values)[1]
+
+    @property
+    def mean_yearly_values(self):
+        if self.sampling == "control":
+            return np.array([self._estimate(self.yearly_values[:, year], year)[0]
+                             for year in range(self.yearly_values.shape[1])])
+        return self.yearly_values.mean(axis=0)
+
+    @property
+    def mean_max_drawdown(self):
+        return self._estimate(self.max_drawdowns)[0]
+
+    @property
+    def volatility(self):
+        """Portfolio volatility sqrt(w' Σ w) in the units of the input covariance."""
+        return float(np.sqrt(self.weights @ self.cov_matrix @ self.weights))
+
+    def truncate(self, years):
+        """
+        The same paths cut off after the given number of years.
+
+        A path's first years do not depend on how long it runs afterwards, so
+        one long simulation answers every shorter horizon.
+        """
+        if self.yearly_drawdowns is None:
+            raise ValueError("Truncating needs the yearly drawdowns of the simulation.")
+        return PortfolioSimulation(
+            self.initial_value, self.weights, self.cov_matrix, self.yearly_values[:, years - 1],
+            self.yearly_values[:, :years], self.yearly_drawdowns[:, years - 1], self.yearly_drawdowns[:, :years],
+            self.sampling,
+            None if self.yearly_asset_values is None else self.yearly_asset_values[:, :years],
+            None if self.expected_asset_values is None else self.expected_asset_values[:years],
+            self.replicate_sizes
+        )
+
+    def summary(self, percentiles=(5, 50, 95)):
+        summary = {
+            "paths": self.n_paths,
+            "sampling": self.sampling,
+            "mean": self.mean_final_value,
+            "std_error": self.std_error,
+            "mean_max_drawdown": self.mean_max_drawdown,
+            "volatility": self.volatility,
+        }
+        for p, value in zip(percentiles, np.percentile(self.final_values, percentiles)):
+            summary[f"p{p}"] = float(value)
+        return summary
+
+
+def combine_simulations(simulations):
+    """
+    Pools independent runs of the same portfolio (same inputs, different seeds) into one.
+    """
+    first = simulations[0]
+
+    def join(name):
+        arrays = [getattr(simulation, name) for simulation in simulations]
+        return None if arrays[0] is None else np.concatenate(arrays)
+
+    return PortfolioSimulation(
+        first.initial_value, first.weights, first.cov_matrix, join("final_values"), join("yearly_values"),
+        join("max_drawdowns"), join("yearly_drawdowns"), first.sampling, join("yearly_asset_values"),
+        first.expected_asset_values,
+        [size for simulation in simulations for size in simulation.replicate_sizes]
+    )
+
+
+class SimulationPool:
+    """
+    Pools batches of the same portfolio as they arrive, like combine_simulations.
+
+    The path arrays live in buffers that double in size when full, so adding a
+    batch copies only that batch instead of everything pooled so far.
+    """
+
+    POOLED = ("final_values", "yearly_values", "max_drawdowns", "yearly_drawdowns", "yearly_asset_values")
+
+    def __init__(self):
+        self.first = None
+        self.n_paths = 0
+        self.replicate_sizes = []
+        self._buffers = {}
+
+    def add(self, simulation):
+        if self.first is None:
+            self.first = simulation
+        size = simulation.n_paths
+        for name in self.POOLED:
+            array = getattr(simulation, name)
+            if array is None:
+                continue
+            buffer = self._buffers.get(name)
+            if buffer is None or len(buffer) < self.n_paths + size:
+                grown = np.empty((max(2 * self.n_paths, self.n_paths + size),) + array.shape[1:], dtype=array.dtype)
+                if buffer is not None:
+                    grown[:self.n_paths] = buffer[:self.n_paths]
+                self._buffers[name] = buffer = grown
+            buffer[self.n_paths:self.n_paths + size] = array
+        self.n_paths += size
+        self.replicate_sizes.extend(simulation.replicate_sizes)
+
+    def simulation(self):
+        """
+        PortfolioSimulation over every path added so far (views of the buffers, no copy).
+        """
+        first = self.first
+
+        def pooled(name):
+            buffer = self._buffers.get(name)
+            return None if buffer is None else buffer[:self.n_paths]
+
+        return PortfolioSimulation(
+            first.initial_value, first.weights, first.cov_matrix, pooled("final_values"), pooled("yearly_values"),
+            pooled("max_drawdowns"), pooled("yearly_drawdowns"), first.sampling, pooled("yearly_asset_values"),
+            first.expected_asset_values, list(self.replicate_sizes)
+        )
+
+
+def cholesky_factor(cov_matrix):
+    """
+    Lower-triangular L with L @ L.T == cov_matrix.
+
+    Falls back to an eigen-decomposition (negative eigenvalues clipped to 0)
+    when the matrix is only positive semi-definite.
+    """
+    cov_matrix = np.asarray(cov_matrix, dtype=np.float64)
+    try:
+        return np.linalg.cholesky(cov_matrix)
+    except np.linalg.LinAlgError:
+        eigenvalues, eigenvectors = np.linalg.eigh(cov_matrix)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+
+def simulate_portfolio(initial_value, weights, mean_returns, cov_matrix, time_horizon, iterations=10000,
+                       steps_per_year=TRADING_DAYS, ito_correction=True, seed=42, memory_budget=None,
+                       sampling="pseudo", precision=None, threads=None):
+    """
+    Simulates a buy-and-hold portfolio of correlated assets in one batched pass.
+
+    Each step draws standard normals for all assets and paths at once and
+    correlates them with the Cholesky factor of the covariance. Asset
+    log-prices are advanced block by block (like monte_carlo_simulation), and
+    only the portfolio value is kept: yearly checkpoints, final value and
+    the running peak used for the max drawdown of every path.
+
+    :param weights: Share of initial_value invested in each asset. Not normalised: if the
+        shares sum to less than 1, the rest is not invested (as in the per-asset simulation).
+    :param mean_returns: Expected return per asset and year of simulated time.
+    :param cov_matrix: Covariance of returns per year of simulated time.
+    :param ito_correction: Use the GBM drift mu - sigma^2 / 2 (True) or mu as the log drift (False).
+    :param sampling: One of SAMPLING_METHODS.
+    :param precision: "float64" or "float32" path arrays (SIMULATION_PRECISION by default).
+    :return: PortfolioSimulation
+    """
+    return simulate_portfolio_scenarios(
+        [initial_value], [weights], [mean_returns], [cov_matrix], time_horizon, iterations,
+        steps_per_year, ito_correction, seed, memory_budget, sampling, precision, threads
+    )[0]
+
+
+def simulate_to_tolerance(initial_value, weights, mean_returns, cov_matrix, time_horizon, tolerance,
+                          max_paths=None, batch_paths=None, steps_per_year=TRADING_DAYS, ito_correction=True,
+                          seed=42, memory_budget=None, sampling="pseudo", precision=None, threads=None):
+    """
+    Adds batches of paths until the standard error of the mean final value is at most tolerance.
+
+    Batch i uses child_seed(seed, i), so every batch (for Sobol: every scramble)
+    is independent and the run is reproducible. Sobol runs report the plain
+    error bound until SOBOL_MIN_REPLICATES scrambles are pooled. Stops at max_paths
+    (TOLERANCE_MAX_PATHS) even if the tolerance was not reached.
+
+    :return: PortfolioSimulation pooling all batches
+    """
+    batch_paths = batch_paths or TOLERANCE_BATCH_PATHS
+    max_paths = max_paths or TOLERANCE_MAX_PATHS
+    pool = SimulationPool()
+    batch = 0
+    while pool.n_paths < max_paths:
+        pool.add(simulate_portfolio(initial_value, weights, mean_returns, cov_matrix, time_horizon,
+                                    min(batch_paths, max_paths - pool.n_paths), steps_per_year, ito_correction,
+                                    child_seed(seed, batch), memory_budget, sampling, precision, threads))
+        batch += 1
+        combined = pool.simulation()
+        if combined.std_error <= tolerance:
+            break
+    return combined
+
+
+def scenario_chunk_size(iterations, time_horizon, n_assets, sampling="pseudo", memory_budget=None):
+    """
+    Scenarios per simulate_portfolio_scenarios call whose outputs fit in the memory budget (at least 1).
+    """
+    # final value and max drawdown, yearly values and drawdowns, plus yearly asset values for control variates
+    values_per_path = 2 + 2 * time_horizon + (time_horizon * n_assets if sampling == "control" else 0)
+    bytes_per_scenario = (iterations + 1) * values_per_path * 8
+    return int(max(1, (memory_budget or MC_MEMORY_BUDGET) // bytes_per_scenario))
+
+
+@staged("simulate_paths")
+def simulate_portfolio_scenarios(initial_values, weights, mean_returns, cov_matrices, time_horizon, iterations=10000,
+                                 steps_per_year=TRADING_DAYS, ito_correction=True, seed=42, memory_budget=None,
+                                 sampling="pseudo", precision=None, threads=None):
+    """
+    Simulates several portfolio scenarios over the same assets with shared random draws.
+
+    Scenarios differ in initial value, weights, drift and covariance but use the
+    same standard normal draws (common random numbers), so each draw is
+    generated once for the whole batch. The correlated shocks of one scenario
+    are formed at a time, so the working memory of a block stays within
+    memory_budget. The outputs do grow with the scenarios: every scenario keeps
+    its (iterations, time_horizon) yearly values and drawdowns, so callers with
+    many scenarios split them with scenario_chunk_size. Every scenario gets
+    exactly the result simulate_portfolio would give it on its own, whichever
+    other scenarios share its call.
+
+    With antithetic sampling the path count is rounded up to an even number.
+
+    In float32 precision the draws, correlated shocks, log-levels, cumulative
+    sums and exponentials are float32; the portfolio peaks, drawdowns, yearly
+    checkpoints and all outputs stay float64. NumPy draws float32 normals with
+    its own ziggurat tables, so float32 runs use different (equally valid)
+    random numbers than float64 runs with the same seed.
+
+    seed may be anything np.random.default_rng accepts, including a Generator.
+    With threads > 1 (SIMULATION_THREADS by default) the paths are split into
+    that many contiguous ranges, each simulated on a thread pool with its own
+    child stream spawned from the seed; NumPy releases the GIL in the heavy
+    kernels. The same seed and thread count always reproduce the same paths.
+
+    :param initial_values: Shape (S,).
+    :param weights: Shape (S, n_assets).
+    :param mean_returns: Shape (S, n_assets).
+    :param cov_matrices: Shape (S, n_assets, n_assets).
+    :return: list of S PortfolioSimulation
+    """
+    sampling = resolve_sampling(sampling)
+    dtype = resolve_dtype(precision)
+    initial_values = np.asarray(initial_values, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    mean_returns = np.asarray(mean_returns, dtype=np.float64)
+    cov_matrices = np.asarray(cov_matrices, dtype=np.float64)
+    n_scenarios, n_assets = weights.shape
+
+    dt = 1 / steps_per_year
+    variances = np.diagonal(cov_matrices, axis1=1, axis2=2)
+    drift = mean_returns - 0.5 * variances if ito_correction else mean_returns
+    step_drift = drift * dt
+    step_factors = [cholesky_factor(cov_matrix * dt).astype(dtype) for cov_matrix in cov_matrices]
+    step_drift = step_drift.astype(dtype)
+    asset_values = initial_values[:, None] * weights
+    invested = asset_values.sum(axis=1)
+    block_asset_values = asset_values.astype(dtype)
+    days = int(time_horizon * steps_per_year)
+
+    # A Generator's ziggurat sampler is several times faster than the legacy global RNG
+    rng = np.random.default_rng(seed)
+    threads = int(max(1, min(threads or SIMULATION_THREADS, iterations)))
+    budget = (memory_budget or MC_MEMORY_BUDGET) / threads
+    # draws and correlated shocks per asset, plus portfolio value, running peak and drawdown
+    bytes_per_path_step = (2 * n_assets + 3) * dtype.itemsize
+    if sampling == "antithetic":
+        iterations += iterations % 2
+    if sampling == "sobol":
+        # scipy.stats takes most of a second to import, so only Sobol runs pay for it
+        from scipy.special import ndtri
+        from scipy.stats import qmc
+        with warnings.catch_warnings():
+            # Balance is best for powers of two, but any count gives a valid estimate
+            warnings.simplefilter("ignore")
+            sobol = qmc.Sobol(d=time_horizon * n_assets, scramble=True, seed=rng)
+            sobol_targets = ndtri(np.clip(sobol.random(iterations), 1e-12, 1 - 1e-12)).astype(dtype)
+
+    final_values = np.empty((n_scenarios, iterations))
+    yearly_values = np.empty((n_scenarios, iterations, time_horizon))
+    max_drawdowns = np.empty((n_scenarios, iterations))
+    yearly_drawdowns = np.empty((n_scenarios, iterations, time_horizon))
+    yearly_asset_values = None
+    expected_asset_values = None
+    if sampling == "control":
+        yearly_asset_values = np.empty((n_scenarios, iterations, time_horizon, n_assets))
+        # E[value of asset i after t years] = a_i * exp((log drift_i + var_i / 2) * t)
+        growth = drift + 0.5 * variances
+        expected_asset_values = asset_values[:, None, :] * np.exp(
+            growth[:, None, :] * np.arange(1, time_horizon + 1)[None, :, None])
+
+    def simulate_range(rng, range_start, range_stop):
+        # Simulates paths [range_start, range_stop) with rng; ranges write disjoint slices of the outputs
+        path_chunk = int(max(1, min(range_stop - range_start, budget // bytes_per_path_step)))
+        if sampling == "antithetic":
+            path_chunk = max(2, path_chunk - path_chunk % 2)
+        if sampling == "sobol":
+            # The Brownian bridge needs a whole year per block
+            path_chunk = int(max(1, min(range_stop - range_start, budget // (bytes_per_path_step * steps_per_year))))
+
+        for path_start in range(range_start, range_stop, path_chunk):
+            paths = slice(path_start, min(path_start + path_chunk, range_stop))
+            n_paths = paths.stop - paths.start
+            block_days = int(max(1, min(steps_per_year, budget // (bytes_per_path_step * n_paths))))
+            if sampling == "sobol":
+                block_days = steps_per_year
+                yearly_targets = sobol_targets[paths]
+
+            log_level = np.zeros((n_scenarios, n_paths, n_assets))
+            peak = np.repeat(invested[:, None], n_paths, axis=1)
+            max_drawdown = np.zeros((n_scenarios, n_paths))
+            portfolio = peak.copy()
+
+            day = 0
+            while day < days:
+                # Blocks never straddle a year boundary so checkpoints fall on block ends
+                rows = min(block_days, days - day, steps_per_year - day % steps_per_year)
+                if sampling == "antithetic":
+                    half = rng.standard_normal((rows, n_paths // 2, n_assets), dtype=dtype)
+                    draws = np.empty((rows, n_paths, n_assets), dtype=dtype)
+                    draws[:, 0::2] = half
+                    np.negative(half, out=draws[:, 1::2])
+                    draws = draws.reshape(-1, n_assets)
+                    del half
+                elif sampling == "sobol":
+                    # Daily draws conditioned on summing to the Sobol-driven yearly draw
+                    draws = rng.standard_normal((rows, n_paths, n_assets), dtype=dtype)
+                    draws -= draws.mean(axis=0)
+                    year = day // steps_per_year
+                    draws += yearly_targets[:, year * n_assets:(year + 1) * n_assets] / np.sqrt(rows)
+                    draws = draws.reshape(-1, n_assets)
+                else:
+                    draws = rng.standard_normal((rows * n_paths, n_assets), dtype=dtype)
+
+                for scenario in range(n_scenarios):
+                    # One (rows * paths, assets) matrix product; batched tiny matmuls are much slower
+                    shocks = (draws @ step_factors[scenario].T).reshape(rows, n_paths, n_assets)
+                    shocks += step_drift[scenario]
+                    shocks[0] += log_level[scenario]
+                    np.cumsum(shocks, axis=0, out=shocks)
+                    log_level[scenario] = shocks[-1]
+
+                    np.exp(shocks, out=shocks)
+                    block_values = (shocks.reshape(-1, n_assets) @ block_asset_values[scenario]).reshape(rows, n_paths)
+                    del shocks
+                    # Peaks and drawdowns are tracked in float64 whatever the path precision
+                    block_values = block_values.astype(np.float64, copy=False)
+
+                    running_peak = np.maximum.accumulate(block_values, axis=0)
+                    np.maximum(running_peak, peak[scenario], out=running_peak)
+                    np.minimum(max_drawdown[scenario], (block_values / running_peak - 1).min(axis=0),
+                               out=max_drawdown[scenario])
+                    peak[scenario] = running_peak[-1]
+                    portfolio[scenario] = block_values[-1]
+                del draws
+
+                day += rows
+                year, offset = divmod(day, steps_per_year)
+                if offset == 0:
+                    yearly_values[:, paths, year - 1] = portfolio
+                    yearly_drawdowns[:, paths, year - 1] = max_drawdown
+                    if yearly_asset_values is not None:
+                        yearly_asset_values[:, paths, year - 1] = np.exp(log_level) * asset_values[:, None, :]
+
+            final_values[:, paths] = portfolio
+            max_drawdowns[:, paths] = max_drawdown
+
+    if threads == 1:
+        simulate_range(rng, 0, iterations)
+    else:
+        # One independent child stream per contiguous range of paths (even-sized for antithetic pairs)
+        bounds = np.linspace(0, iterations, threads + 1).astype(int)
+        if sampling == "antithetic":
+            bounds -= bounds % 2
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            futures = [pool.submit(simulate_range, child, bounds[i], bounds[i + 1])
+                       for i, child in enumerate(rng.spawn(threads)) if bounds[i] < bounds[i + 1]]
+            for future in futures:
+                future.result()
+
+    return [
+        PortfolioSimulation(
+            initial_values[s], weights[s], cov_matrices[s], final_values[s], yearly_values[s], max_drawdowns[s],
+            yearly_drawdowns[s], sampling,
+            None if yearly_asset_values is None else yearly_asset_values[s],
+            None if expected_asset_values is None else expected_asset_values[s]
+        )
+        for s in range(n_scenarios)
+    ]
@@ -0,0 +1,51 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from auth import get_current_user
+from database import get_db, SimulationResult
+
+router = APIRouter()
+
+
+@router.get("/")
+async def get_history(limit: int = Query(20, ge=1, le=100), before_id: Optional[int] = None,
+                      kind: Optional[str] = None, current_user: dict = Depends(get_current_user),
+                      db: AsyncSession = Depends(get_db)):
+    """
+    Pages through the current user's stored simulation and risk assessment results, newest first.
+
+    Query Parameters:
+        - limit (int): Results per page (1-100).
+        - before_id (int, optional): Only results older than this id; pass next_before_id from the previous page.
+        - kind (str, optional): 'simulation' or 'risk'.
+
+    Results are written in batches, so a run can take up to HISTORY_FLUSH_INTERVAL
+    seconds to appear.
+    """
+    if kind is not None and kind not in ("simulation", "risk"):
+        raise HTTPException(status_code=400, detail="Kind must be 'simulation' or 'risk'.")
+
+    query = select(SimulationResult).where(SimulationResult.user_id == current_user["id"])
+    if before_id is not None:
+        query = query.where(SimulationResult.id < before_id)
+    if kind is not None:
+        query = query.where(SimulationResult.kind == kind)
+    # One extra row tells whether another page follows
+    query = query.order_by(SimulationResult.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(query)).scalars().all()
+    items = [
+        {
+            "id": row.id,
+            "kind": row.kind,
+            "created_at": row.created_at.isoformat(),
+            "inputs": row.inputs,
+            "seed": row.seed,
+            "summary": row.summary,
+            "yearly_values": row.yearly_values,
+        }
+        for row in rows[:limit]
+    ]
+    next_before_id = items[-1]["id"] if len(rows) > limit else None
+    return {"status": "success", "items": items, "next_before_id": next_before_id}
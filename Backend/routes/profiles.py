@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from auth import require_admin
+from utils.profiling import list_captures, capture_path
+
+router = APIRouter()
+
+
+@router.get("/", dependencies=[Depends(require_admin)])
+async def get_profiles():
+    """
+    Stored request profiles, newest first: request inputs, status, timing and trigger.
+    """
+    return {"status": "success", "profiles": list_captures()}
+
+
+@router.get("/{name}", dependencies=[Depends(require_admin)])
+async def download_profile(name: str, format: str = "prof"):
+    """
+    Downloads one capture: format=prof for the pstats file (open with pstats or snakeviz),
+    format=json for its metadata and top functions.
+    """
+    path = capture_path(name, f".{format}")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    media_type = "application/json" if format == "json" else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=f"{name}.{format}")
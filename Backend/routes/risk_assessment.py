@@ -1,9 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from services.risk_assessment import run_risk_assessment  # Import your function
+from services.portfolio_views import portfolio_views
+from services.history import record_result
+from auth import get_current_user
+from routes.simulate import validate_portfolio
+from utils.executor import TaskTimeoutError
+from utils.result_cache import ResultCache
 
 # Create a FastAPI router for risk assessment
 router = APIRouter()
+risk_cache = ResultCache("risk_assessment")
 
 # Define what inputs this API expects
 class RiskAssessmentInput(BaseModel):
@@ -17,21 +23,28 @@ class RiskAssessmentInput(BaseModel):
     commodities: float
 
 @router.post("/risk-assessment")
-async def risk_assessment(data: RiskAssessmentInput):
+async def risk_assessment(data: RiskAssessmentInput, current_user: dict = Depends(get_current_user)):
+    # Same input checks as /simulate, before anything is cached or simulated
+    error = validate_portfolio(data)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
     try:
-        # Call the risk assessment function
-        result = run_risk_assessment(
-            investment_amount=data.investment_amount,
-            duration=data.duration,
-            risk_appetite=data.risk_appetite,
-            market_condition=data.market_condition,
-            stocks=data.stocks,
-            bonds=data.bonds,
-            real_estate=data.real_estate,
-            commodities=data.commodities
-        )
+        # Risk metrics are a view over the shared simulation run (cached per input)
+        params = data.dict()
+
+        async def compute():
+            views = await portfolio_views(params)
+            return views["risk"] if "risk" in views else views
+
+        result = await risk_cache.get_or_compute("run_risk_assessment", params, compute)
+        # Saved to the user's history in the background
+        record_result(current_user["id"], "risk", params, result)
         return result  # Return the results to the frontend or API caller
 
+    except TaskTimeoutError as te:
+        raise HTTPException(status_code=504, detail=str(te))
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,8 +1,31 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from services.simulation_ import run_simulation
+import os
+import json
+import math
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from services.portfolio_views import portfolio_views
+from services.history import record_result
+from auth import get_current_user
+from services.simulation_ import (run_simulation_batch, run_sweep, simulate_path_batch,
+                                 stream_batch_sizes, RunningSimulation, MONTE_CARLO_PATHS)
+from models.gbm_model import GBM_PATHS
+from models.portfolio_simulator import SAMPLING_METHODS, TOLERANCE_MAX_PATHS
+from models.monte_carlo import PRECISIONS
+from utils.executor import run_in_executor, TaskTimeoutError
+from utils.result_cache import ResultCache
 
 router = APIRouter()
+simulation_cache = ResultCache("simulate")
+# Largest thread count a request may ask for
+SIMULATION_MAX_THREADS = int(os.getenv("SIMULATION_MAX_THREADS", "0")) or (os.cpu_count() or 1)
+# Maximum number of scenarios accepted by one /simulate/batch or /simulate/sweep request
+SIMULATION_BATCH_LIMIT = int(os.getenv("SIMULATION_BATCH_LIMIT", "32"))
+# Longest investment period a simulation accepts, in years (the path arrays grow with it)
+SIMULATION_MAX_DURATION = int(os.getenv("SIMULATION_MAX_DURATION", "50"))
+# Seeds are stored in the history table's 32-bit integer column
+SIMULATION_MAX_SEED = 2**31 - 1
 class SimulationRequest(BaseModel):
     investment_amount: float
     duration: int
@@ -12,9 +35,63 @@ class SimulationRequest(BaseModel):
     bonds: float
     real_estate: float
     commodities: float
+    sampling: str = "pseudo"
+    tolerance: Optional[float] = None
+    precision: Optional[str] = None
+    seed: Optional[int] = None
+    threads: Optional[int] = None
+
+class SweepRequest(BaseModel):
+    investment_amount: float
+    stocks: float
+    bonds: float
+    real_estate: float
+    commodities: float
+    market_conditions: list[str] = ["bull", "bear", "neutral"]
+    risk_appetites: list[float] = [0.0, 0.5, 1.0]
+    durations: list[int] = [1, 5, 10]
+    seed: Optional[int] = None
+
+def validate_portfolio(request):
+    """
+    Returns the error message for an invalid amount, duration or allocation, or None.
+    Shared by every route that runs the simulation core (/simulate, /risk-assessment).
+    """
+    if not math.isfinite(request.investment_amount):
+        return "Investment amount must be a finite number."
+    if request.investment_amount <= 0 or request.duration <= 0:
+        return "Investment amount and duration must be greater than zero."
+    if request.duration > SIMULATION_MAX_DURATION:
+        return f"Duration can be at most {SIMULATION_MAX_DURATION} years."
+
+    total_allocation = request.stocks + request.bonds + request.real_estate + request.commodities
+    if total_allocation != 100:
+        return f"Total asset allocation must sum to 100%, currently {total_allocation}%."
+    return None
+
+
+def validate_simulation(request: SimulationRequest):
+    """
+    Returns the error message for invalid simulation inputs, or None.
+    """
+    error = validate_portfolio(request)
+    if error:
+        return error
+    if request.sampling not in SAMPLING_METHODS:
+        return f"Sampling must be one of {', '.join(SAMPLING_METHODS)}."
+    if request.tolerance is not None and request.tolerance <= 0:
+        return "Tolerance must be greater than zero."
+    if request.precision is not None and request.precision not in PRECISIONS:
+        return f"Precision must be one of {', '.join(PRECISIONS)}."
+    if request.seed is not None and not 0 <= request.seed <= SIMULATION_MAX_SEED:
+        return f"Seed must be an integer between 0 and {SIMULATION_MAX_SEED}."
+    if request.threads is not None and not 1 <= request.threads <= SIMULATION_MAX_THREADS:
+        return f"Threads must be between 1 and {SIMULATION_MAX_THREADS}."
+    return None
+
 
 @router.post("/")  
-async def simulate(request: SimulationRequest):
+async def simulate(request: SimulationRequest, current_user: dict = Depends(get_current_user)):
     """
     Run investment simulation.
 
@@ -27,38 +104,244 @@ async def simulate(request: SimulationRequest):
         - bonds (float): Percentage allocation to bonds.
         - real_estate (float): Percentage allocation to real estate.
         - commodities (float): Percentage allocation to commodities.
+        - sampling (str, optional): 'pseudo' (default), 'antithetic', 'control' or 'sobol'.
+        - tolerance (float, optional): Add Monte Carlo paths until the standard error
+          of the final value is at most this amount.
+        - precision (str, optional): 'float64' or 'float32' simulation arrays (server default if omitted).
+        - seed (int, optional): Random seed; the seed used is returned with the results.
+        - threads (int, optional): Threads simulating path ranges in parallel (server default if omitted).
+
+    Returns:
+        dict: Aggregated simulation results, including the Monte Carlo paths used, the standard
+        error and the seed and thread count that reproduce them.
+    """
+    try:
+        error = validate_simulation(request)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+
+        params = request.dict()
+
+        async def compute():
+            # The run is shared with /risk-assessment through the simulation memo
+            views = await portfolio_views(params)
+            return views["simulation"] if "simulation" in views else views
+
+        # Identical inputs on the same data always give the same (seeded) result
+        result = await simulation_cache.get_or_compute("run_simulation", params, compute)
+        # Saved to the user's history in the background
+        record_result(current_user["id"], "simulation", params, result)
+
+        return {"status": "success", "data": result}
+
+    except HTTPException:
+        raise
+
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    except TaskTimeoutError as te:
+        raise HTTPException(status_code=504, detail=str(te))
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Internal server error: " + str(e))
+
+@router.post("/batch")
+async def simulate_batch(requests: list[dict]):
+    """
+    Run many investment simulations in one call.
+
+    Request Body:
+        - list of SimulationRequest objects (at most SIMULATION_BATCH_LIMIT).
 
     Returns:
-        dict: Aggregated simulation results.
+        dict: One result per request in input order, each either
+        {"status": "success", "data": ...} or {"status": "error", "detail": ...}.
     """
+    if len(requests) > SIMULATION_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {SIMULATION_BATCH_LIMIT} simulations.")
+
     try:
-       
+        results = [None] * len(requests)
+        pending = []
 
-        if request.investment_amount <= 0 or request.duration <= 0:
+        for index, item in enumerate(requests):
+            try:
+                request = SimulationRequest(**item)
+            except ValidationError as ve:
+                results[index] = {"status": "error", "detail": ve.errors(include_url=False)}
+                continue
 
-            raise HTTPException(status_code=400, detail="Investment amount and duration must be greater than zero.")
+            error = validate_simulation(request)
+            if error:
+                results[index] = {"status": "error", "detail": error}
+                continue
 
-        total_allocation = request.stocks + request.bonds + request.real_estate + request.commodities
-        if total_allocation != 100:
+            params = request.dict()
+            key = simulation_cache.make_key("run_simulation", params)
+            cached = simulation_cache.get(key)
+            if cached is not None:
+                results[index] = {"status": "success", "data": cached}
+            else:
+                pending.append((index, key, params))
 
-            raise HTTPException(status_code=400, detail=f"Total asset allocation must sum to 100%, currently {total_allocation}%.")
+        if pending:
+            # All cache misses are simulated together in one task
+            computed = await run_in_executor(run_simulation_batch, [params for _, _, params in pending])
+            for (index, key, _), result in zip(pending, computed):
+                if "error" in result:
+                    results[index] = {"status": "error", "detail": result["error"]}
+                else:
+                    simulation_cache.set(key, result)
+                    results[index] = {"status": "success", "data": result}
 
-       
-        result = run_simulation(
-            investment_amount=request.investment_amount,
-            duration=request.duration,
-            risk_appetite=request.risk_appetite,
-            market_condition=request.market_condition,
-            stocks=request.stocks,
-            bonds=request.bonds,
-            real_estate=request.real_estate,
-            commodities=request.commodities
+        return {"status": "success", "results": results}
+
+    except TaskTimeoutError as te:
+        raise HTTPException(status_code=504, detail=str(te))
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Internal server error: " + str(e))
+
+
+@router.post("/sweep")
+async def simulate_sweep(request: SweepRequest):
+    """
+    Run a sensitivity grid of simulations for one allocation.
+
+    Request Body:
+        - investment_amount, stocks, bonds, real_estate, commodities: as for /simulate/.
+        - market_conditions (list[str]): Market conditions to compare.
+        - risk_appetites (list[float]): Risk levels to compare.
+        - durations (list[int]): Investment periods in years to compare.
+
+    Returns:
+        dict: The grid axes and one dense [market_condition][risk_appetite][duration] cube per metric.
+    """
+    try:
+        if not request.market_conditions or not request.risk_appetites or not request.durations:
+            raise HTTPException(status_code=400, detail="Every sweep axis needs at least one value.")
+
+        # Every duration is a cell of the result cube too; this also caps the length of each axis
+        if len(request.market_conditions) * len(request.risk_appetites) * len(request.durations) > SIMULATION_BATCH_LIMIT:
+            raise HTTPException(status_code=400, detail=f"A sweep can contain at most {SIMULATION_BATCH_LIMIT} market condition, risk appetite and duration combinations.")
+
+        for duration in request.durations:
+            error = validate_simulation(SimulationRequest(
+                duration=duration, risk_appetite=0, market_condition="neutral",
+                **request.dict(exclude={"market_conditions", "risk_appetites", "durations"})
+            ))
+            if error:
+                raise HTTPException(status_code=400, detail=error)
+
+        params = request.dict()
+        result = await simulation_cache.get_or_compute(
+            "run_sweep", params, lambda: run_in_executor(run_sweep, **params)
         )
 
         return {"status": "success", "data": result}
 
-    except ValueError as ve:
-        raise HTTPException(status_code=400, detail=str(ve))
+    except HTTPException:
+        raise
+
+    except TaskTimeoutError as te:
+        raise HTTPException(status_code=504, detail=str(te))
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Internal server error: " + str(e))
+
+
+@router.post("/stream")
+async def simulate_stream(request: SimulationRequest, http_request: Request, format: str = "ndjson"):
+    """
+    Run investment simulation and stream progressive results.
+
+    Request Body:
+        - same as /simulate/.
+
+    Query Parameters:
+        - format (str): 'ndjson' (one JSON object per line) or 'sse' (Server-Sent Events).
+
+    Returns:
+        One message per completed batch of Monte Carlo paths with the running
+        metrics, path count and a 95% confidence interval; the last one has
+        "done": true. Work stops when the client disconnects.
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="Format must be 'ndjson' or 'sse'.")
+
+    error = validate_simulation(request)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    params = request.dict()
+
+    def encode(message):
+        if format == "sse":
+            return f"data: {json.dumps(message)}\n\n"
+        return json.dumps(message) + "\n"
+
+    async def messages():
+        try:
+            # The GBM leg is small and the same as in /simulate/ (pseudo-random, single-threaded)
+            gbm = await run_in_executor(simulate_path_batch, **{**params, "sampling": "pseudo", "threads": None},
+                                        paths=GBM_PATHS, ito_correction=True)
+            if gbm is None:
+                yield encode({"error": "At least one asset must have an allocation greater than 0."})
+                return
+
+            # With a tolerance, stream until the standard error is small enough (or the path cap)
+            total_paths = TOLERANCE_MAX_PATHS if request.tolerance else MONTE_CARLO_PATHS
+            running = RunningSimulation(request.investment_amount, request.duration, gbm, total_paths,
+                                        request.tolerance, request.seed)
+            for batch, paths in enumerate(stream_batch_sizes(total_paths)):
+                if await http_request.is_disconnected():
+                    print("⚠️ Client disconnected, stopping simulation stream")
+                    return
+                # Every batch has its own child seed, so batches are independent and reproducible
+                running.add(await run_in_executor(simulate_path_batch, **params, paths=paths, batch=batch))
+                yield encode(running.snapshot())
+                if running.done:
+                    return
+
+        except TaskTimeoutError as te:
+            yield encode({"error": str(te)})
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(messages(), media_type=media_type)
+
+
+@router.post("/combined")
+async def simulate_combined(request: SimulationRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Run investment simulation and risk assessment from one simulation.
+
+    Request Body:
+        - same as /simulate/.
+
+    Returns:
+        dict: {"simulation": /simulate/ metrics, "risk": /risk-assessment/ metrics}.
+    """
+    try:
+        error = validate_simulation(request)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+
+        params = request.dict()
+        result = await portfolio_views(params)
+        if "error" in result:
+            raise HTTPException(status_code=400, detail=result["error"])
+
+        record_result(current_user["id"], "simulation", params, result["simulation"])
+        record_result(current_user["id"], "risk", params, result["risk"])
+
+        return {"status": "success", "data": result}
+
+    except HTTPException:
+        raise
+
+    except TaskTimeoutError as te:
+        raise HTTPException(status_code=504, detail=str(te))
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail="Internal server error: " + str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error: " + str(e))
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
-from services.suggestions_services import get_optimized_portfolio
+from utils.executor import run_in_executor, TaskTimeoutError
 
 router = APIRouter()
 
@@ -13,6 +13,7 @@ class PortfolioRequest(BaseModel):
     bonds: float = Field(..., ge=0, le=100, description="Initial allocation to Bonds")
     real_estate: float = Field(..., ge=0, le=100, description="Initial allocation to Real Estate")
     commodities: float = Field(..., ge=0, le=100, description="Initial allocation to Commodities")
+    refine: bool = Field(False, description="Polish the precomputed frontier answer into the exact optimum")
 
 @router.post("/portfolio_suggestions")
 async def get_suggestions(request: PortfolioRequest):
@@ -23,6 +24,9 @@ async def get_suggestions(request: PortfolioRequest):
         request.commodities / 100
     ]
 
+    # The optimizers pull in SciPy, which only this route needs
+    from services.suggestions_services import get_optimized_portfolio, suggestion_frontiers, refresh_suggestion_frontiers
+
     # Ensure allocations sum to 100%
     total_allocation = sum(user_allocation)
     print("📩 Raw Request Data:", request.dict())  # Debugging
@@ -30,10 +34,29 @@ async def get_suggestions(request: PortfolioRequest):
     if not (0.99 <= total_allocation <= 1.01):
         raise HTTPException(status_code=400, detail="Allocations must sum to 100%.")
 
-    # Get optimized allocation
-    optimized_results = get_optimized_portfolio(
-        request.investment, request.duration, user_allocation, request.risk_tolerance
-    )
+    frontiers = suggestion_frontiers()
+    try:
+        if frontiers is not None and not request.refine:
+            # A plain lookup only interpolates the precomputed frontiers (microseconds), so answer right here
+            optimized_results = get_optimized_portfolio(
+                request.investment, request.duration, user_allocation, request.risk_tolerance
+            )
+        elif frontiers is not None:
+            # The SLSQP polish is CPU-bound: run it on the compute executor with this process's frontiers
+            optimized_results = await run_in_executor(
+                get_optimized_portfolio,
+                request.investment, request.duration, user_allocation, request.risk_tolerance,
+                refine=True, frontiers=frontiers
+            )
+        else:
+            # The data changed since the frontiers were built: rebuild them and solve this request, both on the executor
+            refresh_suggestion_frontiers()
+            optimized_results = await run_in_executor(
+                get_optimized_portfolio,
+                request.investment, request.duration, user_allocation, request.risk_tolerance
+            )
+    except TaskTimeoutError as te:
+        raise HTTPException(status_code=504, detail=str(te))
     print(optimized_results)
 
     # Check for errors from optimizer
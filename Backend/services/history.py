@@ -0,0 +1,192 @@
+import os
+import asyncio
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from database import engine, AsyncSessionLocal, Base, SimulationResult
+from models.monte_carlo import SIMULATION_SEED
+
+# Store every /simulate and /risk-assessment result a user receives ("0" turns it off)
+HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "1") == "1"
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "500"))  # rows per INSERT
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "1"))  # seconds a row may wait for its batch
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", "10000"))  # rows held before new ones are dropped
+HISTORY_MAX_ATTEMPTS = int(os.getenv("HISTORY_MAX_ATTEMPTS", "3"))  # tries per batch before it is dropped
+
+# Queued by stop(): the background task writes everything ahead of it, then exits
+_STOP = object()
+
+
+def result_row(user_id, kind, params, result):
+    """
+    simulation_results row for a result dict: list values are yearly series, the rest is the summary.
+    """
+    seed = result.get("Seed", params.get("seed"))
+    return {
+        "user_id": user_id,
+        "kind": kind,
+        "created_at": datetime.now(timezone.utc),
+        "inputs": params,
+        "seed": SIMULATION_SEED if seed is None else seed,
+        "summary": {key: value for key, value in result.items() if not isinstance(value, list)},
+        "yearly_values": {key: value for key, value in result.items() if isinstance(value, list)},
+    }
+
+
+_table_ready = False
+
+
+async def insert_results(rows):
+    """
+    Writes rows to simulation_results in one executemany INSERT, creating the table on first use.
+    """
+    global _table_ready
+    if not _table_ready:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[SimulationResult.__table__])
+        _table_ready = True
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(SimulationResult), rows)
+        await session.commit()
+
+
+class WriteBehindQueue:
+    """
+    Buffers rows in memory and writes them in batches from a background task.
+
+    put() never waits: when the buffer is full, or the queue is not running,
+    the row is dropped and counted. A batch goes out when it reaches
+    batch_size rows or its oldest row has waited flush_interval seconds.
+    Failed batches are retried with a growing pause, then written row by row
+    so only the rows that still fail are dropped.
+    """
+
+    def __init__(self, write_batch, batch_size=None, flush_interval=None, max_size=None, max_attempts=None):
+        self.write_batch = write_batch
+        self.batch_size = batch_size or HISTORY_BATCH_SIZE
+        self.flush_interval = HISTORY_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.max_size = max_size or HISTORY_QUEUE_SIZE
+        self.max_attempts = max_attempts or HISTORY_MAX_ATTEMPTS
+        self._queue = None
+        self._task = None
+        self._stopping = False
+        self._batch = []
+        self.counters = {"queued": 0, "written": 0, "dropped": 0, "batches": 0, "failed_writes": 0}
+
+    def start(self):
+        # The queue belongs to the running event loop, so it is created here rather than in __init__
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout=10):
+        """
+        Lets the background task write whatever is still buffered, then stops it.
+        Rows still unwritten after timeout seconds are dropped.
+        """
+        if self._task is None:
+            return
+        # New rows are refused from here on; the ones already queued are written first
+        self._stopping = True
+
+        async def drain():
+            await self._queue.put(_STOP)
+            await self._task
+
+        try:
+            await asyncio.wait_for(drain(), timeout)
+        except asyncio.TimeoutError:
+            # wait_for cancelled the task, so nothing left here was written
+            unwritten = len(self._batch)
+            while not self._queue.empty():
+                unwritten += self._queue.get_nowait() is not _STOP
+            self.counters["dropped"] += unwritten
+            print(f"❌ Timed out writing the remaining history rows, dropped {unwritten}")
+        self._task = None
+        self._queue = None
+        self._batch = []
+        self._stopping = False
+
+    def put(self, row):
+        if self._queue is None or self._stopping:
+            self.counters["dropped"] += 1
+            return False
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.counters["dropped"] += 1
+            return False
+        self.counters["queued"] += 1
+        return True
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is _STOP:
+                break
+            self._batch = [row]
+            deadline = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if row is _STOP:
+                    stopping = True
+                    break
+                self._batch.append(row)
+            await self._write(self._batch)
+            self._batch = []
+
+    async def _write(self, rows):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self.write_batch(rows)
+                self.counters["written"] += len(rows)
+                self.counters["batches"] += 1
+                return
+            except Exception as e:
+                self.counters["failed_writes"] += 1
+                print(f"❌ Could not write {len(rows)} history rows (attempt {attempt}): {e}")
+                if attempt < self.max_attempts:
+                    await asyncio.sleep(self.flush_interval * attempt)
+        if len(rows) > 1:
+            await self._write_rows(rows)
+        else:
+            self.counters["dropped"] += len(rows)
+
+    async def _write_rows(self, rows):
+        # One bad row fails the whole INSERT, so try each row on its own and drop only the ones that fail
+        dropped = 0
+        for row in rows:
+            try:
+                await self.write_batch([row])
+                self.counters["written"] += 1
+            except Exception:
+                self.counters["failed_writes"] += 1
+                dropped += 1
+        self.counters["dropped"] += dropped
+        if dropped:
+            print(f"❌ Dropped {dropped} of {len(rows)} history rows after writing them one by one")
+
+    def stats(self):
+        return {
+            **self.counters,
+            "pending": self._queue.qsize() + len(self._batch) if self._queue is not None else 0,
+            "running": self._task is not None,
+        }
+
+
+history_queue = WriteBehindQueue(insert_results)
+
+
+def record_result(user_id, kind, params, result):
+    """
+    Queues a completed result for the user's history; returns immediately.
+    """
+    if HISTORY_ENABLED and isinstance(result, dict) and "error" not in result:
+        history_queue.put(result_row(user_id, kind, params, result))
@@ -0,0 +1,38 @@
+import os
+from services.simulation_core import run_core, core_params
+from services.simulation_ import simulation_view
+from services.risk_assessment import risk_view
+from utils.executor import run_in_executor
+from utils.result_cache import ResultCache
+
+# Short-lived memo of the metric views of a run, so /simulate and /risk-assessment
+# for the same portfolio right after each other share one simulation
+SIMULATION_MEMO_TTL = float(os.getenv("SIMULATION_MEMO_TTL", "60"))  # seconds
+SIMULATION_MEMO_ENTRIES = int(os.getenv("SIMULATION_MEMO_ENTRIES", "32"))
+simulation_memo = ResultCache("simulation_memo", max_entries=SIMULATION_MEMO_ENTRIES, ttl=SIMULATION_MEMO_TTL,
+                              disk_dir="")
+
+
+def run_simulation_and_risk(investment_amount, duration, risk_appetite, market_condition, stocks, bonds, real_estate,
+                            commodities, sampling="pseudo", tolerance=None, precision=None, seed=None, threads=None):
+    """
+    Simulation and risk metrics of the same portfolio from a single simulation run.
+    """
+    run = run_core(investment_amount, duration, risk_appetite, market_condition, stocks, bonds, real_estate,
+                   commodities, sampling, tolerance, precision, seed, threads)
+    if run is None:
+        return {"error": "At least one asset must have an allocation greater than 0."}
+    return {"simulation": simulation_view(run), "risk": risk_view(run)}
+
+
+async def portfolio_views(params):
+    """
+    Both metric views for the request params, through the simulation memo.
+
+    The run happens on the compute executor; concurrent and back-to-back calls
+    for the same portfolio within SIMULATION_MEMO_TTL seconds share it.
+    """
+    params = core_params(params)
+    return await simulation_memo.get_or_compute(
+        "run_simulation_and_risk", params, lambda: run_in_executor(run_simulation_and_risk, **params)
+    )
@@ -1,15 +1,151 @@
+import os
 import numpy as np 
-import pandas as pd
-from models.monte_carlo import monte_carlo_simulation
-from models.gbm_model import geometric_brownian_motion
-from utils.data_loader import load_data
+from models.portfolio_simulator import (simulate_portfolio, simulate_portfolio_scenarios, SimulationPool,
+                                        scenario_chunk_size, SIMULATION_THREADS)
+from models.gbm_model import GBM_PATHS
+from models.monte_carlo import SIMULATION_SEED, child_seed
+from services.simulation_core import portfolio_inputs, run_core, MONTE_CARLO_PATHS
+from utils.metrics import staged
+# Streaming: the first batch is small so a chart appears quickly, later batches double up to the cap
+STREAM_FIRST_BATCH = int(os.getenv("STREAM_FIRST_BATCH", "100"))
+STREAM_MAX_BATCH = int(os.getenv("STREAM_MAX_BATCH", "2000"))
+
+
+def run_simulation(investment_amount, duration, risk_appetite, market_condition, stocks, bonds, real_estate, commodities,
+                   sampling="pseudo", tolerance=None, precision=None, seed=None, threads=None):
+    """
+    Runs investment simulation and returns key portfolio metrics including yearly values.
+
+    The paths come from the shared simulation core (see run_core); this
+    function is the simulation metrics view over them.
+    """
+    run = run_core(investment_amount, duration, risk_appetite, market_condition, stocks, bonds, real_estate,
+                   commodities, sampling, tolerance, precision, seed, threads)
+    if run is None:
+        return {"error": "At least one asset must have an allocation greater than 0."}
+    return simulation_view(run)
 
 
+@staged("simulation_view")
+def simulation_view(run):
+    """
+    Simulation metrics of a SimulationRun, with the seed and threads that reproduce it.
+    """
+    metrics = simulation_metrics(run.investment_amount, run.duration, run.monte_carlo, run.gbm)
+    metrics["Seed"] = run.seed
+    metrics["Threads"] = run.threads
+    return metrics
 
 
-def run_simulation(investment_amount, duration, risk_appetite, market_condition, stocks, bonds, real_estate, commodities):
+def simulation_metrics(investment_amount, duration, monte_carlo, gbm):
     """
-    Runs investment simulation and returns key portfolio metrics including yearly values.
+    Turns the Monte Carlo and GBM portfolio simulations into the response metrics.
+    """
+    # Compute final yearly values for the graph
+    yearly_avg_values = (monte_carlo.mean_yearly_values + gbm.mean_yearly_values) / 2
+    metrics = portfolio_metrics(investment_amount, duration, yearly_avg_values, monte_carlo.volatility,
+                                monte_carlo.mean_max_drawdown)
+    metrics["Monte Carlo Paths"] = monte_carlo.n_paths
+    metrics["Standard Error"] = round(monte_carlo.std_error, 2)
+    return metrics
+
+
+def portfolio_metrics(investment_amount, duration, yearly_avg_values, portfolio_volatility, max_drawdown):
+    """
+    Builds the response metrics from the averaged yearly values and the portfolio risk.
+    """
+    final_total_value = yearly_avg_values[-1]
+    cagr = ((final_total_value / investment_amount) ** (1 / duration)) - 1
+    sharpe_ratio = (cagr ) / portfolio_volatility if portfolio_volatility > 0 else 0
+
+    return {
+        "Final Total Portfolio Value": round(final_total_value, 2),
+        "Final Expected Return (%)": round(cagr * 100, 2),
+        "Yearly Portfolio Values": [round(value, 2) for value in yearly_avg_values.tolist()],  
+        "Volatility (%)": round(portfolio_volatility * 100, 2),
+        "Sharpe Ratio": round(sharpe_ratio, 2),
+        "Max Drawdown (%)": round(max_drawdown * 100, 2)
+    }
+
+
+def run_simulation_batch(requests):
+    """
+    Runs many simulations at once and returns their results in input order.
+
+    Requests that allocate to the same assets over the same duration form one
+    group and are simulated together (scenario axis, shared random draws), so
+    a group costs about one random generation instead of one per request.
+    Large groups are simulated a chunk at a time (see scenario_chunk_size) and
+    each chunk is reduced to its metrics before the next one starts, so memory
+    stays within MC_MEMORY_BUDGET. Each result equals what run_simulation
+    returns for that request alone.
+
+    Args:
+        requests (list[dict]): Keyword arguments of run_simulation, one dict per scenario.
+    """
+    results = [None] * len(requests)
+    groups = {}
+
+    for index, params in enumerate(requests):
+        asset_classes = {
+            "stocks": params["stocks"],
+            "bonds": params["bonds"],
+            "real_estate": params["real_estate"],
+            "commodities": params["commodities"]
+        }
+        if params.get("tolerance"):
+            # Sampling until a tolerance is met stops at a different path count per scenario
+            results[index] = run_simulation(**params)
+            continue
+        inputs = portfolio_inputs(asset_classes, params["market_condition"], params["risk_appetite"])
+        if inputs is None:
+            results[index] = {"error": "At least one asset must have an allocation greater than 0."}
+            continue
+        assets = tuple(asset for asset, allocation in asset_classes.items() if allocation > 0)
+        seed = SIMULATION_SEED if params.get("seed") is None else params["seed"]
+        threads = params.get("threads") or SIMULATION_THREADS
+        key = (assets, params["duration"], params.get("sampling") or "pseudo", params.get("precision"), seed, threads)
+        groups.setdefault(key, []).append((index, inputs))
+
+    for (_, duration, sampling, precision, seed, threads), members in groups.items():
+        indices = [index for index, _ in members]
+        initial_values = [requests[index]["investment_amount"] for index in indices]
+        weights, mean_returns, cov_matrices = (np.array(column) for column in zip(*(inputs for _, inputs in members)))
+        chunk = scenario_chunk_size(MONTE_CARLO_PATHS, duration, weights.shape[1], sampling)
+
+        for start in range(0, len(indices), chunk):
+            part = slice(start, start + chunk)
+            monte_carlo = simulate_portfolio_scenarios(initial_values[part], weights[part], mean_returns[part],
+                                                       cov_matrices[part], duration, iterations=MONTE_CARLO_PATHS,
+                                                       ito_correction=False, seed=seed, sampling=sampling,
+                                                       precision=precision, threads=threads)
+            gbm = simulate_portfolio_scenarios(initial_values[part], weights[part], mean_returns[part],
+                                               cov_matrices[part], duration, iterations=GBM_PATHS,
+                                               ito_correction=True, seed=seed, precision=precision)
+
+            for index, initial_value, mc, g in zip(indices[part], initial_values[part], monte_carlo, gbm):
+                results[index] = {**simulation_metrics(initial_value, duration, mc, g), "Seed": seed,
+                                  "Threads": threads}
+
+    return results
+
+
+def run_sweep(investment_amount, stocks, bonds, real_estate, commodities, market_conditions, risk_appetites, durations,
+              seed=None):
+    """
+    Runs a sensitivity grid over market conditions, risk appetites and durations.
+
+    Every grid cell uses the same standard normal draws (common random numbers):
+    the (market condition, risk appetite) pairs only change the drift and the
+    scale of the correlated shocks, and the durations are read off one run over
+    the longest horizon. Cell-to-cell differences are therefore caused by the
+    parameters, not by sampling noise. Cells are simulated a chunk at a time
+    (see scenario_chunk_size) and reduced to their metrics before the next
+    chunk, so memory stays within MC_MEMORY_BUDGET.
+
+    Returns:
+        dict: The grid axes and, for every metric of run_simulation, a dense
+        cube indexed [market_condition][risk_appetite][duration].
     """
     asset_classes = {
         "stocks": stocks,
@@ -18,102 +154,140 @@ def run_simulation(investment_amount, duration, risk_appetite, market_condition,
         "commodities": commodities
     }
 
-    total_final_monte_carlo = 0
-    total_final_gbm = 0
-    yearly_monte_carlo_values = np.zeros(duration + 1)  
-    yearly_gbm_values = np.zeros(duration + 1)  
+    cells = [(condition, appetite) for condition in market_conditions for appetite in risk_appetites]
+    inputs = [portfolio_inputs(asset_classes, condition, appetite) for condition, appetite in cells]
+    if not cells or not durations or inputs[0] is None:
+        return {"error": "At least one asset must have an allocation greater than 0."}
+
+    weights, mean_returns, cov_matrices = (np.array(column) for column in zip(*inputs))
+    initial_values = [investment_amount] * len(cells)
+    horizon = max(durations)
+    seed = SIMULATION_SEED if seed is None else seed
+
+    chunk = scenario_chunk_size(MONTE_CARLO_PATHS, horizon, weights.shape[1])
+
+    metrics = {}
+    for start in range(0, len(cells), chunk):
+        part = slice(start, start + chunk)
+        monte_carlo = simulate_portfolio_scenarios(initial_values[part], weights[part], mean_returns[part],
+                                                   cov_matrices[part], horizon, iterations=MONTE_CARLO_PATHS,
+                                                   ito_correction=False, seed=seed)
+        gbm = simulate_portfolio_scenarios(initial_values[part], weights[part], mean_returns[part],
+                                           cov_matrices[part], horizon, iterations=GBM_PATHS, ito_correction=True,
+                                           seed=seed)
+
+        for position, (mc, g) in enumerate(zip(monte_carlo, gbm), start):
+            condition_index, appetite_index = divmod(position, len(risk_appetites))
+            for duration_index, duration in enumerate(durations):
+                cell = simulation_metrics(investment_amount, duration, mc.truncate(duration), g.truncate(duration))
+                for name, value in cell.items():
+                    cube = metrics.setdefault(name, [[[None] * len(durations) for _ in risk_appetites]
+                                                     for _ in market_conditions])
+                    cube[condition_index][appetite_index][duration_index] = value
 
-    avg_monte_carlo_return = 0
-    avg_gbm_return = 0
-    avg_volatility = 0
-    avg_max_drawdown = 0
-
-    num_assets = sum(1 for allocation in asset_classes.values() if allocation > 0)
+    return {
+        "axes": {
+            "market_condition": list(market_conditions),
+            "risk_appetite": list(risk_appetites),
+            "duration": list(durations)
+        },
+        "metrics": metrics,
+        "seed": seed
+    }
 
-    for asset, allocation in asset_classes.items():
-        if allocation == 0:
-            continue
 
-        data = load_data(asset)
-        returns = data['Close'].pct_change().dropna()
-        mean_return = returns.mean()
-        volatility = returns.std()
-
-        # Market condition adjustments
-        if market_condition == "bull":
-            mean_return *= 1.2
-        elif market_condition == "bear":
-            mean_return *= 0.8
-
-        volatility *= (1 + risk_appetite)
-        asset_investment = investment_amount * (allocation / 100)
-        # annualized_return = (1 + mean_return) ** 252 - 1
-
-        # Run Monte Carlo and GBM simulations
-        final_monte_carlo, yearly_monte_carlo = monte_carlo_simulation(asset_investment, mean_return, volatility, duration)
-        final_gbm, yearly_gbm = geometric_brownian_motion(asset_investment, mean_return, volatility, duration)
-    
-        # Aggregate final values
-        total_final_monte_carlo += np.mean(final_monte_carlo)
-        total_final_gbm += np.mean(final_gbm)
-
-        # Aggregate yearly values
-        # Ensure yearly values are of the same length
-        min_length = min(len(yearly_monte_carlo_values), len(yearly_gbm_values), len(yearly_monte_carlo), len(yearly_gbm))
-
-# Trim arrays to the minimum length
-        yearly_monte_carlo_values = yearly_monte_carlo_values[:min_length]
-        yearly_gbm_values = yearly_gbm_values[:min_length]
-        yearly_monte_carlo = yearly_monte_carlo[:min_length]
-        yearly_gbm = yearly_gbm[:min_length]
-
-        # Now add safely
-      
-        yearly_monte_carlo_values += yearly_monte_carlo
-        yearly_gbm_values += yearly_gbm
-        
-        # Compute risk metrics
-        # avg_monte_carlo_return += mean_return
-        # avg_gbm_return += mean_return
-        avg_volatility += volatility
-        avg_max_drawdown += (returns.cummin() - returns).min()  # Max drawdown formula
-
-    # Compute final values
-    # final_total_value = (total_final_monte_carlo + total_final_gbm) / 2
-    # print( final_total_value)
-    monte_carlo_return = (total_final_monte_carlo / investment_amount) - 1
-    gbm_return = (total_final_gbm / investment_amount) - 1
-    print(monte_carlo_return)
-    print(gbm_return)
-    # final_avg_return = (monte_carlo_return+gbm_return)/2
-
-
-    
-    avg_volatility /= num_assets
-    avg_max_drawdown /= num_assets
-    avg_max_drawdown = avg_max_drawdown
-
-    # Compute Sharpe Ratio (Risk-Adjusted Return)
-    # risk_free_rate = 0.04  # Assuming 4% annual risk-free rate
-    
-    # sharpe_ratio = (cagr - risk_free_rate) / avg_volatility if avg_volatility > 0 else 0
+def simulate_path_batch(investment_amount, duration, risk_appetite, market_condition, stocks, bonds, real_estate,
+                        commodities, paths, batch=None, ito_correction=False, sampling="pseudo", tolerance=None,
+                        precision=None, seed=None, threads=None):
+    """
+    Simulates one batch of portfolio paths for the streaming endpoint (tolerance is handled by the caller).
 
-    # Compute final yearly values for the graph
-    # print(yearly_gbm_values)
-    yearly_avg_values = (yearly_monte_carlo_values + yearly_gbm_values) / (2  )
-    final_total_value = yearly_avg_values[-1]
-    cagr = ((final_total_value / investment_amount) ** (1 / duration)) - 1
-    sharpe_ratio = (cagr ) / avg_volatility if avg_volatility > 0 else 0
-    # print(yearly_avg_values[-1])
+    Batch i draws from child_seed(seed, i); without a batch index the seed itself is used.
 
-    return {
-        "Final Total Portfolio Value": round(final_total_value, 2),
-        "Final Expected Return (%)": round(cagr * 100, 2),
-        "Yearly Portfolio Values": [round(value, 2) for value in yearly_avg_values.tolist()],  
-        "Volatility (%)": round(avg_volatility * 100, 2),
-        "Sharpe Ratio": round(sharpe_ratio, 2),
-        "Max Drawdown (%)": round(avg_max_drawdown , 2)
+    Returns:
+        PortfolioSimulation, or None if nothing is allocated.
+    """
+    asset_classes = {
+        "stocks": stocks,
+        "bonds": bonds,
+        "real_estate": real_estate,
+        "commodities": commodities
     }
+    inputs = portfolio_inputs(asset_classes, market_condition, risk_appetite)
+    if inputs is None:
+        return None
+    weights, mean_returns, cov_matrix = inputs
+    seed = SIMULATION_SEED if seed is None else seed
+    batch_seed = seed if batch is None else child_seed(seed, batch)
+    return simulate_portfolio(investment_amount, weights, mean_returns, cov_matrix, duration,
+                              iterations=paths, ito_correction=ito_correction, seed=batch_seed, sampling=sampling,
+                              precision=precision, threads=threads)
+
+
+def stream_batch_sizes(total_paths=MONTE_CARLO_PATHS, first=None, cap=None):
+    """
+    Path counts of the streamed batches: first, 2 * first, ... up to cap, summing to total_paths.
+    """
+    size = first or STREAM_FIRST_BATCH
+    cap = cap or STREAM_MAX_BATCH
+    sizes = []
+    while total_paths > 0:
+        sizes.append(min(size, total_paths))
+        total_paths -= sizes[-1]
+        size = min(size * 2, cap)
+    return sizes
+
+
+class RunningSimulation:
+    """
+    Pooled streamed Monte Carlo batches, blended with a fixed GBM leg.
+
+    snapshot() gives the same metrics as run_simulation for the paths so far,
+    plus a 95% confidence interval for the final portfolio value.
+    """
+
+    def __init__(self, investment_amount, duration, gbm, total_paths=MONTE_CARLO_PATHS, tolerance=None, seed=None):
+        self.investment_amount = investment_amount
+        self.seed = SIMULATION_SEED if seed is None else seed
+        self.duration = duration
+        self.gbm = gbm
+        self.total_paths = total_paths
+        self.tolerance = tolerance
+        self.pool = SimulationPool()
+        self.monte_carlo = None
+
+    @property
+    def paths(self):
+        return self.monte_carlo.n_paths if self.monte_carlo else 0
+
+    @property
+    def done(self):
+        if self.tolerance and self.monte_carlo and self.monte_carlo.std_error <= self.tolerance:
+            return True
+        return self.paths >= self.total_paths
+
+    def add(self, monte_carlo):
+        self.pool.add(monte_carlo)
+        self.monte_carlo = self.pool.simulation()
+
+    def snapshot(self):
+        metrics = simulation_metrics(self.investment_amount, self.duration, self.monte_carlo, self.gbm)
+
+        # The blended final value is (MC mean + GBM mean) / 2, so both standard errors count
+        std_error = np.sqrt(self.monte_carlo.std_error**2 + self.gbm.std_error**2) / 2
+        final_value = metrics["Final Total Portfolio Value"]
+
+        return {
+            "paths": self.paths,
+            "total_paths": self.total_paths,
+            "done": self.done,
+            "Seed": self.seed,
+            "Confidence Interval (95%)": [round(final_value - 1.96 * std_error, 2),
+                                          round(final_value + 1.96 * std_error, 2)],
+            **metrics
+        }
+
+
 # import numpy as np 
 # import pandas as pd
 # from models.monte_carlo import monte_carlo_simulation
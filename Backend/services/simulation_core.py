@@ -0,0 +1,131 @@
+import numpy as np
+from models.portfolio_simulator import simulate_portfolio, simulate_to_tolerance, SIMULATION_THREADS
+from models.gbm_model import GBM_PATHS
+from models.monte_carlo import SIMULATION_SEED
+from utils.asset_stats import asset_stats, covariance_stats
+
+MONTE_CARLO_PATHS = 10000
+
+# Inputs of run_core; requests that leave the optional ones out share a run
+CORE_INPUTS = ("investment_amount", "duration", "risk_appetite", "market_condition",
+               "stocks", "bonds", "real_estate", "commodities")
+CORE_DEFAULTS = {"sampling": "pseudo", "tolerance": None, "precision": None, "seed": None, "threads": None}
+
+
+def portfolio_inputs(asset_classes, market_condition, risk_appetite):
+    """
+    Builds the joint simulation inputs for the assets with a non-zero allocation.
+
+    Each asset keeps its own historical mean and volatility (adjusted for the
+    market condition and risk appetite); the correlation between assets comes
+    from their aligned return history.
+
+    Returns:
+        (weights, mean_returns, cov_matrix) as NumPy arrays, or None if nothing is allocated.
+    """
+    assets = [asset for asset, allocation in asset_classes.items() if allocation > 0]
+    if not assets:
+        return None
+
+    weights = np.array([asset_classes[asset] for asset in assets], dtype=float) / 100
+    mean_returns = np.array([asset_stats(asset).mean_return for asset in assets])
+    volatility = np.array([asset_stats(asset).volatility for asset in assets])
+
+    # Market condition adjustments
+    if market_condition == "bull":
+        mean_returns *= 1.2
+    elif market_condition == "bear":
+        mean_returns *= 0.8
+
+    volatility *= (1 + risk_appetite)
+    corr_matrix = covariance_stats(assets).corr_matrix if len(assets) > 1 else np.ones((1, 1))
+    cov_matrix = corr_matrix * np.outer(volatility, volatility)
+
+    return weights, mean_returns, cov_matrix
+
+
+class SimulationRun:
+    """
+    One joint simulation of a portfolio: the Monte Carlo and GBM legs plus the inputs.
+
+    The simulation and risk services derive their metrics from this object
+    instead of simulating on their own.
+    """
+
+    def __init__(self, investment_amount, duration, market_condition, monte_carlo, gbm, seed, threads):
+        self.investment_amount = investment_amount
+        self.duration = duration
+        self.market_condition = market_condition
+        self.monte_carlo = monte_carlo
+        self.gbm = gbm
+        self.seed = seed
+        self.threads = threads
+
+
+def run_core(investment_amount, duration, risk_appetite, market_condition, stocks, bonds, real_estate, commodities,
+             sampling="pseudo", tolerance=None, precision=None, seed=None, threads=None):
+    """
+    Simulates all allocated assets jointly with correlated shocks, once with the
+    Monte Carlo log drift and once with the GBM drift.
+
+    sampling selects how the Monte Carlo paths are drawn (see SAMPLING_METHODS);
+    with a tolerance, Monte Carlo paths are added until the standard error of the
+    final value is at most tolerance instead of always using MONTE_CARLO_PATHS.
+    precision ("float64" or "float32") sets the dtype of the path arrays.
+    seed (SIMULATION_SEED by default) and threads reproduce the run.
+
+    Returns:
+        SimulationRun, or None if nothing is allocated.
+    """
+    seed = SIMULATION_SEED if seed is None else seed
+    threads = threads or SIMULATION_THREADS
+    asset_classes = {
+        "stocks": stocks,
+        "bonds": bonds,
+        "real_estate": real_estate,
+        "commodities": commodities
+    }
+
+    inputs = portfolio_inputs(asset_classes, market_condition, risk_appetite)
+    if inputs is None:
+        return None
+    weights, mean_returns, cov_matrix = inputs
+
+    if tolerance:
+        monte_carlo = simulate_to_tolerance(investment_amount, weights, mean_returns, cov_matrix, duration, tolerance,
+                                            ito_correction=False, seed=seed, sampling=sampling, precision=precision,
+                                            threads=threads)
+    else:
+        monte_carlo = simulate_portfolio(investment_amount, weights, mean_returns, cov_matrix, duration,
+                                         iterations=MONTE_CARLO_PATHS, ito_correction=False, seed=seed,
+                                         sampling=sampling, precision=precision, threads=threads)
+    gbm = simulate_portfolio(investment_amount, weights, mean_returns, cov_matrix, duration,
+                             iterations=GBM_PATHS, ito_correction=True, seed=seed, precision=precision)
+
+    return SimulationRun(investment_amount, duration, market_condition, monte_carlo, gbm, seed, threads)
+
+
+def core_params(params):
+    """
+    The run_core inputs of a request, with unset options filled in from CORE_DEFAULTS.
+    """
+    core = {key: params[key] for key in CORE_INPUTS}
+    for key, default in CORE_DEFAULTS.items():
+        value = params.get(key)
+        core[key] = default if value is None else value
+    return core
+
+
+def warm_kernels():
+    """
+    Runs a tiny simulation so the first request does not pay for one-off setup.
+
+    Fills the return statistics caches for every asset class and touches the
+    random generator and simulation code paths a real run uses.
+    """
+    weights, mean_returns, cov_matrix = portfolio_inputs(
+        {"stocks": 25, "bonds": 25, "real_estate": 25, "commodities": 25}, "neutral", 0.5
+    )
+    for ito_correction in (False, True):
+        simulate_portfolio(1000, weights, mean_returns, cov_matrix, 1, iterations=64,
+                           ito_correction=ito_correction, seed=SIMULATION_SEED)
@@ -1,61 +1,172 @@
-import pandas as pd
+import os
+import time
+import asyncio
+import threading
 import numpy as np
 from utils.data_loader import load_data
-from models.portfolio_optimizer import optimize_stock_allocation, optimize_portfolio
+from models.portfolio_optimizer import (
+    optimize_stock_allocation, optimize_portfolio, portfolio_frontier_index, stock_frontier_index
+)
 from models.monte_carlo import monte_carlo_simulation
 from models.gbm_model import geometric_brownian_motion
-from utils.data_loader import load_data
-def get_optimized_portfolio(investment, duration, user_allocation, risk_tolerance):
+from utils.asset_stats import covariance_stats
+from utils.market_data import get_store
+from utils.metrics import stage
+from utils.executor import run_in_executor
+
+ASSET_NAMES = ['Stocks', 'Bonds', 'Real_Estate', 'Commodities']
+ASSET_TYPES = ["stocks", "bonds", "real_estate", "commodities"]
+STOCK_LIST = ["AAPL", "GOOGL", "MSFT", "TSLA", "NVDA"]
+
+# Answer suggestions from efficient frontiers precomputed per data version ("0" solves every request)
+SUGGESTIONS_FRONTIER_INDEX = os.getenv("SUGGESTIONS_FRONTIER_INDEX", "1") == "1"
+
+_frontiers = {}  # data version -> (portfolio index over risk_tolerance, stock index over risk aversion)
+_frontiers_lock = threading.Lock()
+_refresh_task = None
+
+
+def compute_suggestion_frontiers():
+    """
+    Solves the frontier indexes for the market data this process sees (a few seconds of SciPy work).
+
+    Runs on the compute executor when the data changes; the indexes pickle back to the web process.
+    """
+    portfolio_stats = covariance_stats(ASSET_TYPES)
+    stock_stats = covariance_stats(STOCK_LIST)
+    with stage("frontier_build"):
+        portfolio_index = portfolio_frontier_index(portfolio_stats.mean_returns, portfolio_stats.cov_matrix)
+        stock_index = stock_frontier_index(stock_stats.mean_returns, stock_stats.cov_matrix)
+    return portfolio_index, stock_index
+
+
+def _install_frontiers(version, frontiers):
+    portfolio_index, stock_index = frontiers
+    _frontiers.clear()
+    _frontiers[version] = frontiers
+    print(f"📈 Built suggestion frontiers: {portfolio_index.stats()['points']} allocation points, "
+          f"{stock_index.stats()['points']} stock points "
+          f"in {portfolio_index.build_time + stock_index.build_time:.2f}s")
+
+
+def build_suggestion_frontiers():
+    """
+    Returns the frontier indexes for the current market data, building them if needed.
+
+    Takes a few seconds, so it runs during startup (see main.py) rather
+    than inside a request. Returns None when SUGGESTIONS_FRONTIER_INDEX is off.
+    """
+    if not SUGGESTIONS_FRONTIER_INDEX:
+        return None
+    version = get_store().version()
+    with _frontiers_lock:
+        if version not in _frontiers:
+            _install_frontiers(version, compute_suggestion_frontiers())
+        return _frontiers[version]
+
+
+def suggestion_frontiers():
+    """
+    Frontier indexes for the current market data, or None if they are not built for it (or disabled).
+    """
+    if not SUGGESTIONS_FRONTIER_INDEX:
+        return None
+    return _frontiers.get(get_store().version())
+
+
+async def _rebuild_frontiers():
+    version = get_store().version()
+    try:
+        frontiers = await run_in_executor(compute_suggestion_frontiers)
+    except Exception as e:
+        print(f"❌ Could not rebuild the suggestion frontiers: {e}")
+        return
+    with _frontiers_lock:
+        _install_frontiers(version, frontiers)
+
+
+def refresh_suggestion_frontiers():
+    """
+    Rebuilds the frontier indexes on the compute executor, unless a rebuild is already running.
+    Must be called from the event loop; returns without waiting for the rebuild.
+    """
+    global _refresh_task
+    if not SUGGESTIONS_FRONTIER_INDEX:
+        return
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.get_running_loop().create_task(_rebuild_frontiers())
+
+
+def frontier_stats():
+    frontiers = suggestion_frontiers()
+    if frontiers is None:
+        return None
+    return {"allocation": frontiers[0].stats(), "stocks": frontiers[1].stats()}
+
+
+def get_optimized_portfolio(investment, duration, user_allocation, risk_tolerance, refine=False, frontiers=None):
     
     """
     Loads historical data and runs portfolio optimization based on user inputs.
     Also optimizes stock allocation within the 'Stocks' category.
+
+    When the frontier indexes are built for the current data, both optimizations
+    are answered by interpolating them (refine=True polishes the result into the
+    exact optimum); otherwise they are solved for this request. frontiers passes
+    the indexes to an executor worker, which does not build its own.
     """
     try:
        
-        stock_data = load_data("stocks")
-        bond_data = load_data("bonds")
-        real_estate_data = load_data("real_estate")
-        commodity_data = load_data("commodities")
-
-        data = pd.concat([
-            stock_data['Close'],
-            bond_data['Close'],
-            real_estate_data['Close'],
-            commodity_data['Close']
-        ], axis=1)
-
-        data.columns = ['Stocks', 'Bonds', 'Real_Estate', 'Commodities']
-
-        optimized_weights = optimize_portfolio(data, user_allocation, risk_tolerance)
-        allocation = {asset: round(weight, 2) for asset, weight in zip(data.columns, optimized_weights)}
+        asset_names = ASSET_NAMES
+        portfolio_stats = covariance_stats(ASSET_TYPES)
+        stock_stats = covariance_stats(STOCK_LIST)
+        frontiers = frontiers or suggestion_frontiers()
+        risk_aversion = (1 - risk_tolerance) * (1 / duration)
+        use_index = (frontiers is not None and frontiers[0].covers(risk_tolerance)
+                     and frontiers[1].covers(risk_aversion))
+
+        if use_index:
+            start_time = time.perf_counter()
+            with stage("frontier_lookup"):
+                optimized_weights = frontiers[0].lookup(risk_tolerance, refine=refine) * 100
+                stock_weights = frontiers[1].lookup(risk_aversion, refine=refine)
+            optimized_stock_allocation = {stock: round(weight * 100, 2) for stock, weight in zip(STOCK_LIST, stock_weights)}
+            stock_search = {"starts": 0, "wall_time_s": round(time.perf_counter() - start_time, 4),
+                            "stop_reason": "frontier_index", "backend": "index", "refined": refine}
+        else:
+            optimized_weights = optimize_portfolio(
+                None, user_allocation, risk_tolerance,
+                mean_returns=portfolio_stats.mean_returns, cov_matrix=portfolio_stats.cov_matrix
+            )
+        allocation = {asset: round(weight, 2) for asset, weight in zip(asset_names, optimized_weights)}
 
     
         investment_breakdown = {asset: weight * investment for asset, weight in allocation.items()}
          
-      
-        stock_list = ["AAPL", "GOOGL", "MSFT", "TSLA", "NVDA"]
-        stock_data = {ticker: load_data(ticker) for ticker in stock_list}
      
         stock_investment = investment_breakdown.get("Stocks", 0)
 
         
-       
-        
-        returns = data.pct_change().dropna()
-
-        if returns.max().max() > 1:
-            returns = returns / 100  
+        mean_returns = portfolio_stats.mean_returns
+        cov_matrix = portfolio_stats.cov_matrix
+        if portfolio_stats.returns.max() > 1:
+            mean_returns = mean_returns / 100
+            cov_matrix = cov_matrix / 100 ** 2
         risk_free_rate = 5  
-        expected_return = np.dot(returns.mean(), optimized_weights) *252*  100  # Convert to %
-        cov_matrix = returns.cov()
+        expected_return = np.dot(mean_returns, optimized_weights) *252*  100  # Convert to %
         volatility = np.sqrt(np.dot(optimized_weights.T, np.dot(cov_matrix, optimized_weights))) * np.sqrt(252) * 100
 
         sharpe_ratio = (expected_return - risk_free_rate / 100) / volatility if volatility > 0 else 0
         diversification_score = 1 / np.sum(np.square(optimized_weights)) if np.sum(np.square(optimized_weights)) != 0 else 0
 
         
-        optimized_stock_allocation = optimize_stock_allocation(stock_data, risk_tolerance,duration)
+        if not use_index:
+            stock_data = {ticker: load_data(ticker) for ticker in STOCK_LIST}
+            optimized_stock_allocation, stock_search = optimize_stock_allocation(
+                stock_data, risk_tolerance, duration,
+                mean_returns=stock_stats.mean_returns, cov_matrix=stock_stats.cov_matrix,
+                return_info=True
+            )
 
        
         if "error" in optimized_stock_allocation:
@@ -103,7 +214,8 @@ def get_optimized_portfolio(investment, duration, user_allocation, risk_toleranc
                 "Sharpe Ratio": round(sharpe_ratio, 2),
                 # "Diversification Score": round(diversification_score, 2)
             },
-            "insights": suggestions
+            "insights": suggestions,
+            "optimizer": {"stock_allocation": stock_search}
         }
 
     
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+from utils.data_loader import load_data
+from utils.asset_stats import asset_stats, covariance_stats
+
+
+def test_asset_stats_match_pandas():
+    close = load_data("bonds")["Close"]
+    returns = close.pct_change().dropna()
+    stats = asset_stats("bonds")
+
+    assert np.isclose(stats.mean_return, returns.mean())
+    assert np.isclose(stats.volatility, returns.std())
+    assert np.isclose(stats.max_drawdown, (close / close.cummax() - 1).min())
+    assert np.isclose(stats.returns_drawdown, (returns.cummin() - returns).min())
+    assert asset_stats("bonds") is stats
+
+
+def test_covariance_stats_match_concatenated_frame():
+    tickers = ["AAPL", "MSFT", "NVDA"]
+    prices = pd.DataFrame({t: load_data(t)["Close"] for t in tickers})
+    returns = prices.pct_change().dropna()
+    stats = covariance_stats(tickers)
+
+    assert np.allclose(stats.mean_returns, returns.mean())
+    assert np.allclose(stats.cov_matrix, returns.cov())
+    assert np.allclose(stats.corr_matrix, returns.corr())
+    assert len(covariance_stats(tickers, lookback=252).returns) == 252
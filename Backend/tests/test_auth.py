@@ -0,0 +1,47 @@
+import time
+import jwt
+from fastapi.testclient import TestClient
+import auth
+from main import app
+
+client = TestClient(app)
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_routers_require_a_token():
+    assert client.post("/simulate/", json={}).status_code == 401
+    assert client.post("/suggestions/portfolio_suggestions", json={}).status_code == 401
+    assert client.post("/risk-assessment/risk-assessment", json={}).status_code == 401
+
+
+def test_invalid_inputs_are_rejected_before_simulating():
+    auth.valid_tokens.set("input-token", {"id": 1, "name": "Ada", "email": "ada@example.com"}, time.time() + 60)
+    body = {"investment_amount": 1000, "duration": 10**6, "risk_appetite": 0.5, "market_condition": "bull",
+            "stocks": 50, "bonds": 50, "real_estate": 0, "commodities": 0}
+    for path in ("/simulate/", "/risk-assessment/risk-assessment"):
+        assert client.post(path, json=body, headers=bearer("input-token")).status_code == 400
+        assert client.post(path, json={**body, "duration": 0}, headers=bearer("input-token")).status_code == 400
+        assert client.post(path, json={**body, "duration": 5, "bonds": 40},
+                           headers=bearer("input-token")).status_code == 400
+
+
+def test_cached_token_skips_the_database():
+    auth.valid_tokens.set("cached-token", {"id": 1, "name": "Ada", "email": "ada@example.com"}, time.time() + 60)
+    response = client.get("/auth/protected", headers=bearer("cached-token"))
+    assert response.status_code == 200 and response.json()["name"] == "Ada"
+
+    auth.valid_tokens.set("stale-token", {"id": 1, "name": "Ada", "email": "ada@example.com"}, time.time() - 1)
+    expired = jwt.encode({"sub": "ada@example.com", "exp": time.time() - 10}, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+    for token in ("stale-token", expired):
+        assert client.get("/auth/protected", headers=bearer(token)).status_code == 401
+
+
+def test_invalid_tokens_are_negatively_cached():
+    auth.rejected_tokens.clear()
+    for _ in range(3):
+        assert client.get("/auth/protected", headers=bearer("not-a-jwt")).status_code == 401
+    stats = auth.rejected_tokens.stats()
+    assert stats["entries"] == 1 and stats["hits"] == 2
@@ -0,0 +1,28 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+from utils.db_telemetry import LatencyHistogram, PoolTelemetry
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = LatencyHistogram(buckets_ms=(1, 10))
+    for seconds in (0.0005, 0.005, 0.007, 0.5):
+        histogram.observe(seconds)
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"1": 1, "10": 3, "+Inf": 4}
+    assert snapshot["count"] == 4 and snapshot["max_ms"] == 500
+
+
+def test_pool_telemetry_counts_checkouts_and_queries():
+    telemetry = PoolTelemetry()
+    engine = create_engine("sqlite://", poolclass=telemetry.pool_class(QueuePool), pool_size=2, max_overflow=1)
+    telemetry.instrument(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text("select 1"))
+        conn.execute(text("select 2"))
+        assert telemetry.stats()["pool"]["checked_out"] == 1
+
+    stats = telemetry.stats()
+    assert stats["pool"] == {"size": 2, "checked_out": 0, "idle": 1, "overflow": -1, "max_overflow": 1}
+    assert stats["checkouts"] == stats["checkins"] == stats["connects"] == 1
+    assert stats["query_latency"]["count"] == 2 and stats["connection_wait"]["count"] == 1
@@ -0,0 +1,27 @@
+import asyncio
+import time
+import pytest
+from utils import executor
+
+
+def slow_add(a, b, delay=0.0):
+    time.sleep(delay)
+    return a + b
+
+
+@pytest.fixture
+def thread_executor(monkeypatch):
+    monkeypatch.setattr(executor, "EXECUTOR_KIND", "thread")
+    monkeypatch.setattr(executor, "EXECUTOR_WORKERS", 2)
+    executor.shutdown_executor()
+    yield executor
+    executor.shutdown_executor()
+
+
+def test_run_in_executor_returns_result(thread_executor):
+    assert asyncio.run(thread_executor.run_in_executor(slow_add, 2, b=3)) == 5
+
+
+def test_run_in_executor_times_out(thread_executor):
+    with pytest.raises(executor.TaskTimeoutError):
+        asyncio.run(thread_executor.run_in_executor(slow_add, 1, 1, delay=0.5, timeout=0.05))
@@ -0,0 +1,39 @@
+import numpy as np
+from models.gbm_model import geometric_brownian_motion, simulate_gbm_paths
+
+
+def loop_gbm(initial_value, mean_return, volatility, time_horizon, steps_per_year=252):
+    dt = 1 / steps_per_year
+    time_steps = int(time_horizon * steps_per_year)
+    np.random.seed(42)
+    shocks = np.random.normal(0, np.sqrt(dt), size=time_steps)
+    price_path = np.zeros(time_steps + 1)
+    price_path[0] = initial_value
+    for t in range(1, time_steps + 1):
+        price_path[t] = price_path[t - 1] * np.exp((mean_return - 0.5 * volatility**2) * dt + volatility * shocks[t - 1])
+    return price_path[-1], price_path[[min(year * steps_per_year, time_steps) for year in range(time_horizon)]]
+
+
+def test_single_path_matches_loop():
+    expected_final, expected_yearly = loop_gbm(1000, 0.08, 0.2, 5)
+    final, yearly = geometric_brownian_motion(1000, 0.08, 0.2, 5)
+    assert np.isclose(final, expected_final, rtol=1e-12)
+    assert np.allclose(yearly, expected_yearly, rtol=1e-12)
+
+
+def test_batched_paths_shapes_and_summary():
+    result = simulate_gbm_paths(1000, 0.08, 0.2, 5, n_paths=64)
+    assert result.final_values.shape == (64,)
+    assert result.yearly_values.shape == (64, 5)
+    assert np.all(result.yearly_values[:, 0] == 1000)
+    summary = result.summary()
+    assert summary["paths"] == 64
+    assert summary["p5"] <= summary["p50"] <= summary["p95"]
+
+
+def test_global_rng_state_is_untouched():
+    np.random.seed(0)
+    expected = np.random.random()
+    np.random.seed(0)
+    simulate_gbm_paths(100, 0.05, 0.2, 2, n_paths=10)
+    assert np.random.random() == expected
@@ -0,0 +1,97 @@
+import asyncio
+from services.history import WriteBehindQueue, result_row
+
+
+def test_write_behind_queue_batches_rows():
+    batches = []
+
+    async def write_batch(rows):
+        batches.append(list(rows))
+
+    async def main():
+        queue = WriteBehindQueue(write_batch, batch_size=3, flush_interval=0.05, max_size=10)
+        assert not queue.put({"n": -1})  # not started yet
+        queue.start()
+        for n in range(7):
+            assert queue.put({"n": n})
+        await asyncio.sleep(0.2)
+        queue.put({"n": 7})
+        await queue.stop()
+        return queue.stats()
+
+    stats = asyncio.run(main())
+    assert [len(batch) for batch in batches] == [3, 3, 1, 1]
+    assert [row["n"] for batch in batches for row in batch] == list(range(8))
+    assert stats["written"] == 8 and stats["dropped"] == 1 and stats["pending"] == 0
+
+
+def test_failed_batches_are_retried_then_dropped():
+    attempts = []
+
+    async def write_batch(rows):
+        attempts.append(len(rows))
+        raise ConnectionError("database unavailable")
+
+    async def main():
+        queue = WriteBehindQueue(write_batch, batch_size=10, flush_interval=0.01, max_attempts=2)
+        queue.start()
+        queue.put({"n": 1})
+        await asyncio.sleep(0.1)
+        await queue.stop()
+        return queue.stats()
+
+    stats = asyncio.run(main())
+    assert attempts == [1, 1]
+    assert stats["dropped"] == 1 and stats["failed_writes"] == 2
+
+
+def test_stop_waits_for_the_batch_being_written():
+    written = []
+
+    async def write_batch(rows):
+        # The rows are committed before the write returns, so cancelling it and writing again duplicates them
+        written.extend(row["n"] for row in rows)
+        await asyncio.sleep(0.1)
+
+    async def main():
+        queue = WriteBehindQueue(write_batch, batch_size=2, flush_interval=0.01, max_size=10)
+        queue.start()
+        for n in range(3):
+            queue.put({"n": n})
+        await asyncio.sleep(0.05)  # the first batch is being written
+        await queue.stop()
+        assert not queue.put({"n": 3})
+        return queue.stats()
+
+    stats = asyncio.run(main())
+    assert written == [0, 1, 2]
+    assert stats["written"] == 3 and stats["batches"] == 2 and stats["dropped"] == 1
+
+
+def test_a_bad_row_does_not_drop_the_rest_of_its_batch():
+    written = []
+
+    async def write_batch(rows):
+        if any(row["n"] == 1 for row in rows):
+            raise ValueError("integer out of range")
+        written.extend(row["n"] for row in rows)
+
+    async def main():
+        queue = WriteBehindQueue(write_batch, batch_size=10, flush_interval=0.01, max_attempts=1)
+        queue.start()
+        for n in range(3):
+            queue.put({"n": n})
+        await asyncio.sleep(0.1)
+        await queue.stop()
+        return queue.stats()
+
+    stats = asyncio.run(main())
+    assert written == [0, 2]
+    assert stats["written"] == 2 and stats["dropped"] == 1
+
+
+def test_result_row_splits_summary_and_yearly_values():
+    row = result_row(5, "simulation", {"seed": None}, {"Sharpe Ratio": 0.3, "Yearly Portfolio Values": [1.0, 2.0], "Seed": 7})
+    assert row["summary"] == {"Sharpe Ratio": 0.3, "Seed": 7}
+    assert row["yearly_values"] == {"Yearly Portfolio Values": [1.0, 2.0]}
+    assert row["seed"] == 7 and row["user_id"] == 5
@@ -0,0 +1,76 @@
+import os
+import numpy as np
+import pandas as pd
+from utils.data_loader import load_data, load_close
+from utils.market_data import DATASET_FILES, MarketDataStore
+from utils.data_cache import compile_dataset, load_cached_dataset
+
+
+def test_ticker_rows_match_csv():
+    raw = pd.read_csv(DATASET_FILES["stocks"])
+    expected = raw[raw["Ticker"] == "AAPL"]["Close"].to_numpy()
+    assert np.array_equal(load_data("AAPL")["Close"].to_numpy(), expected)
+
+
+def test_views_share_store_memory():
+    assert np.shares_memory(load_close("stocks"), load_data("stocks")["Close"].to_numpy())
+    assert not load_close("bonds").flags.writeable
+
+
+def test_dataset_reloads_only_when_file_changes(tmp_path):
+    path = tmp_path / "prices.csv"
+    path.write_text("Date,Close,Ticker\n2020-03-09 00:00:00-04:00,1.0,AAA\n")
+    store = MarketDataStore({"stocks": str(path)}, mode="csv")
+
+    first = store.dataset("stocks")
+    assert store.dataset("stocks") is first
+
+    path.write_text("Date,Close,Ticker\n2020-03-09 00:00:00-04:00,2.0,AAA\n")
+    os.utime(path, ns=(first.mtime + 10**9, first.mtime + 10**9))
+    assert store.close("AAA")[0] == 2.0
+
+
+def test_binary_cache_is_memory_mapped_and_invalidated(tmp_path):
+    path = tmp_path / "prices.csv"
+    path.write_text("Date,Close,Ticker\n2020-03-09 00:00:00-04:00,1.0,AAA\n2020-03-10 00:00:00-04:00,1.5,BBB\n")
+    cache_dir = str(tmp_path / "cache")
+
+    assert load_cached_dataset("stocks", str(path), cache_dir) is None
+    compile_dataset("stocks", str(path), cache_dir)
+
+    cached = load_cached_dataset("stocks", str(path), cache_dir)
+    assert isinstance(cached.columns["Close"], np.memmap)
+    assert cached.column("Close", "BBB").tolist() == [1.5]
+
+    path.write_text("Date,Close,Ticker\n2020-03-09 00:00:00-04:00,1.0,AAA\n2020-03-10 00:00:00-04:00,2.55,BBB\n")
+    assert load_cached_dataset("stocks", str(path), cache_dir) is None
+
+
+def test_binary_caches_of_different_sources_do_not_collide(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    paths = []
+    for price in ("1.0", "9.0"):
+        path = tmp_path / f"prices_{price}.csv"
+        path.write_text(f"Date,Close,Ticker\n2020-03-09 00:00:00-04:00,{price},AAA\n")
+        compile_dataset("stocks", str(path), cache_dir)
+        paths.append(str(path))
+
+    assert load_cached_dataset("stocks", paths[0], cache_dir).column("Close", "AAA").tolist() == [1.0]
+    assert load_cached_dataset("stocks", paths[1], cache_dir).column("Close", "AAA").tolist() == [9.0]
+
+
+def test_touched_source_is_hashed_only_once(tmp_path, monkeypatch):
+    from utils import data_cache
+    path = tmp_path / "prices.csv"
+    path.write_text("Date,Close,Ticker\n2020-03-09 00:00:00-04:00,1.0,AAA\n")
+    cache_dir = str(tmp_path / "cache")
+    compile_dataset("stocks", str(path), cache_dir)
+    mtime = os.stat(path).st_mtime_ns + 10**9
+    os.utime(path, ns=(mtime, mtime))
+
+    hashed = []
+    digest = data_cache.file_digest
+    monkeypatch.setattr(data_cache, "file_digest", lambda p: hashed.append(p) or digest(p))
+    for _ in range(2):
+        assert load_cached_dataset("stocks", str(path), cache_dir).column("Close", "AAA").tolist() == [1.0]
+    assert len(hashed) == 1
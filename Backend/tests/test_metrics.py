@@ -0,0 +1,70 @@
+import asyncio
+from utils import metrics
+
+
+def test_histogram_renders_prometheus_buckets(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    # A copy of the registry, so the test histogram is gone from /metrics after the test
+    monkeypatch.setattr(metrics, "_registry", dict(metrics._registry))
+    histogram = metrics.Histogram("test_latency_seconds", "Test latency.", ("stage",), buckets=(0.01, 0.1))
+    for seconds in (0.005, 0.05, 0.5):
+        histogram.observe(seconds, stage="solve")
+
+    text = metrics.render()
+    assert "# TYPE test_latency_seconds histogram" in text
+    assert 'test_latency_seconds_bucket{stage="solve",le="0.01"} 1' in text
+    assert 'test_latency_seconds_bucket{stage="solve",le="0.1"} 2' in text
+    assert 'test_latency_seconds_bucket{stage="solve",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{stage="solve"} 3' in text
+    assert "process_resident_memory_bytes" in text
+
+
+def test_stages_record_nothing_when_disabled(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    metrics.drain()
+    with metrics.stage("load_data"):
+        pass
+    metrics.staged("optimize")(lambda: None)()
+    metrics.OPTIMIZER_STARTS.inc(5, optimizer="stock_allocation")
+    assert not any(metrics.drain().values())
+
+
+def test_worker_metrics_merge_into_this_process(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    metrics.drain()
+
+    @metrics.staged("model")
+    def model(x):
+        metrics.OPTIMIZER_ITERATIONS.inc(3, solver="slsqp")
+        return x * 2
+
+    # run_collected is what a process executor worker runs; merge is the parent's side
+    result, recorded = metrics.run_collected(model, 21)
+    assert result == 42
+    assert not any(metrics.drain().values())
+    metrics.merge(recorded)
+    metrics.merge(recorded)
+
+    text = metrics.render()
+    assert 'app_stage_duration_seconds_count{stage="model"} 2' in text
+    assert 'app_optimizer_iterations_total{solver="slsqp"} 6' in text
+    metrics.drain()
+
+
+def test_middleware_labels_requests_by_route(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    metrics.drain()
+
+    async def app(scope, receive, send):
+        scope["route"] = object()
+        scope["path_params"] = {"user_id": "7"}
+        await send({"type": "http.response.start", "status": 201})
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/users/7/history"}
+    asyncio.run(metrics.RequestMetricsMiddleware(app)(scope, None, send))
+    assert ('http_request_duration_seconds_count{method="GET",route="/users/{user_id}/history",status="201"} 1'
+            in metrics.render())
+    metrics.drain()
@@ -0,0 +1,31 @@
+import numpy as np
+from models.monte_carlo import monte_carlo_simulation
+
+
+def dense_monte_carlo(initial_value, mean_return, volatility, time_horizon, iterations=10000):
+    np.random.seed(42)
+    daily_returns = np.random.normal(mean_return / 252, volatility / np.sqrt(252), (time_horizon * 252, iterations))
+    portfolio_values = initial_value * np.exp(daily_returns.cumsum(axis=0))
+    return portfolio_values[-1, :].mean(), portfolio_values[::252, :].mean(axis=1)[:time_horizon]
+
+
+def test_streaming_matches_dense_simulation():
+    expected_final, expected_yearly = dense_monte_carlo(1000, 0.0005, 0.02, 4, iterations=2000)
+    for budget in (None, 1 << 20, 2000 * 16 * 3):
+        final, yearly = monte_carlo_simulation(1000, 0.0005, 0.02, 4, iterations=2000, memory_budget=budget)
+        assert final == expected_final
+        assert np.array_equal(yearly, expected_yearly)
+
+
+def test_path_chunks_stay_close_to_dense_simulation():
+    expected_final, expected_yearly = dense_monte_carlo(1000, 0.0005, 0.02, 4, iterations=2000)
+    final, yearly = monte_carlo_simulation(1000, 0.0005, 0.02, 4, iterations=2000, memory_budget=500 * 16)
+    assert np.isclose(final, expected_final, rtol=1e-2)
+    assert np.allclose(yearly, expected_yearly, rtol=1e-2)
+
+
+def test_float32_matches_float64_within_rounding():
+    final64, yearly64 = monte_carlo_simulation(1000, 0.0005, 0.02, 4, iterations=2000)
+    final32, yearly32 = monte_carlo_simulation(1000, 0.0005, 0.02, 4, iterations=2000, precision="float32")
+    assert np.isclose(final32, final64, rtol=1e-5)
+    assert np.allclose(yearly32, yearly64, rtol=1e-5)
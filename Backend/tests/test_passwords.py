@@ -0,0 +1,19 @@
+import asyncio
+from utils.passwords import hash_password, verify_password, needs_rehash, hash_rounds, verify_password_sync
+
+
+def test_hash_and_verify_off_the_event_loop():
+    async def main():
+        hashed = await hash_password("secret", rounds=4)
+        return hashed, await verify_password("secret", hashed), await verify_password("wrong", hashed)
+
+    hashed, correct, wrong = asyncio.run(main())
+    assert correct and not wrong
+    assert hash_rounds(hashed) == 4
+
+
+def test_needs_rehash_when_cost_changes():
+    hashed = asyncio.run(hash_password("secret", rounds=4))
+    assert not needs_rehash(hashed, rounds=4)
+    assert needs_rehash(hashed, rounds=5)
+    assert not verify_password_sync("secret", "not a bcrypt hash")
@@ -0,0 +1,77 @@
+import numpy as np
+from models.portfolio_optimizer import (
+    multi_start_minimize, optimize_stock_allocation, optimize_portfolio, portfolio_frontier_index, stock_frontier_index
+)
+from models.optimizer_backends import solve_box_budget_qp, mean_volatility_objective, sharpe_objective
+from scipy.optimize import check_grad, minimize
+
+MEAN_RETURNS = np.array([0.0010, 0.0008, 0.0012])
+COV_MATRIX = np.array([[4e-4, 1e-4, 5e-5], [1e-4, 3e-4, 2e-5], [5e-5, 2e-5, 6e-4]])
+STOCKS = {"AAA": None, "BBB": None, "CCC": None}
+
+
+def test_stock_allocation_is_seeded_and_reports_search():
+    first, info = optimize_stock_allocation(STOCKS, 0.5, 10, MEAN_RETURNS, COV_MATRIX, return_info=True,
+                                            backend="analytic", seed=7)
+    second = optimize_stock_allocation(STOCKS, 0.5, 10, MEAN_RETURNS, COV_MATRIX, backend="analytic", seed=7)
+
+    assert first == second
+    assert abs(sum(first.values()) - 100) < 0.05
+    assert info["starts"] >= 1 and info["wall_time_s"] >= 0
+
+
+def test_multi_start_stops_early_without_improvement():
+    objective = lambda w: float(np.sum((w - 1 / 3) ** 2))
+    constraints = {'type': 'eq', 'fun': lambda x: np.sum(x) - 1}
+    result, info = multi_start_minimize(objective, 3, ((0, 1),) * 3, constraints,
+                                        max_starts=500, patience=5, time_budget=0, workers=2)
+
+    assert np.allclose(result.x, 1 / 3, atol=1e-4)
+    assert info["stop_reason"] == "no_improvement"
+    assert info["starts"] < 500
+
+
+def test_box_budget_qp_matches_slsqp():
+    c = -0.5 * MEAN_RETURNS / 1e-3
+    lower, upper = np.full(3, 0.05), np.full(3, 0.6)
+    weights = solve_box_budget_qp(COV_MATRIX, c, lower, upper)
+    reference = minimize(lambda w: 0.5 * w @ COV_MATRIX @ w + c @ w, np.full(3, 1 / 3), method="SLSQP",
+                         bounds=list(zip(lower, upper)), constraints={'type': 'eq', 'fun': lambda x: np.sum(x) - 1},
+                         options={"ftol": 1e-14})
+    assert np.allclose(weights, reference.x, atol=1e-5)
+    assert np.isclose(weights.sum(), 1) and np.all(weights >= lower - 1e-12) and np.all(weights <= upper + 1e-12)
+
+
+def test_analytic_gradients():
+    w = np.array([0.2, 0.5, 0.3])
+    for objective in (mean_volatility_objective(MEAN_RETURNS, COV_MATRIX, 0.05),
+                      sharpe_objective(MEAN_RETURNS, COV_MATRIX, 0.7)):
+        assert check_grad(lambda x: objective(x)[0], lambda x: objective(x)[1], w) < 1e-6
+
+
+def test_backends_agree():
+    results = [optimize_portfolio(None, [0.3, 0.3, 0.4], 0.8, MEAN_RETURNS, COV_MATRIX, backend=backend)
+               for backend in ("legacy", "analytic", "qp")]
+    for weights in results[1:]:
+        assert np.allclose(weights, results[0], atol=0.5)
+
+
+def test_frontier_index_matches_direct_solves():
+    index = stock_frontier_index(MEAN_RETURNS, COV_MATRIX)
+    for risk_tolerance, duration in ((0.3, 1), (0.65, 4), (0.9, 20)):
+        exact = optimize_stock_allocation(STOCKS, risk_tolerance, duration, MEAN_RETURNS, COV_MATRIX, backend="qp")
+        weights = index.lookup((1 - risk_tolerance) / duration)
+        assert np.allclose(weights * 100, list(exact.values()), atol=0.02)
+        assert np.isclose(weights.sum(), 1)
+
+    index = portfolio_frontier_index(MEAN_RETURNS, COV_MATRIX)
+    exact = optimize_portfolio(None, [0.3, 0.3, 0.4], 0.42, MEAN_RETURNS, COV_MATRIX, backend="qp")
+    assert np.allclose(index.lookup(0.42) * 100, exact, atol=0.02)
+    assert np.allclose(index.lookup(0.42, refine=True) * 100, exact, atol=0.02)
+
+
+def test_frontier_index_pickles_for_the_executor():
+    import pickle
+    index = portfolio_frontier_index(MEAN_RETURNS, COV_MATRIX)
+    copy = pickle.loads(pickle.dumps(index))
+    assert np.allclose(copy.lookup(0.42, refine=True), index.lookup(0.42, refine=True))
@@ -0,0 +1,130 @@
+import numpy as np
+from models.portfolio_simulator import simulate_portfolio, simulate_portfolio_scenarios, simulate_to_tolerance
+
+
+def test_portfolio_paths_and_metrics():
+    cov = np.array([[0.04, 0.01], [0.01, 0.09]])
+    result = simulate_portfolio(1000, [0.6, 0.4], [0.05, 0.08], cov, 5, iterations=2000)
+
+    assert result.yearly_values.shape == (2000, 5)
+    assert np.array_equal(result.yearly_values[:, -1], result.final_values)
+    assert np.all(result.max_drawdowns <= 0)
+    assert np.isclose(result.volatility, np.sqrt(np.array([0.6, 0.4]) @ cov @ np.array([0.6, 0.4])))
+    # E[V_T] = V0 * sum(w * exp(mu * T)) for GBM dynamics
+    expected = 1000 * (0.6 * np.exp(0.05 * 5) + 0.4 * np.exp(0.08 * 5))
+    assert np.isclose(result.mean_final_value, expected, rtol=0.05)
+
+
+def test_unallocated_share_is_not_invested():
+    half = simulate_portfolio(1000, [0.3, 0.2], [0.05, 0.08], np.diag([0.04, 0.09]), 3, iterations=500)
+    scaled = simulate_portfolio(500, [0.6, 0.4], [0.05, 0.08], np.diag([0.04, 0.09]), 3, iterations=500)
+    assert np.allclose(half.final_values, scaled.final_values)
+    assert np.allclose(half.max_drawdowns, scaled.max_drawdowns)
+
+
+def test_correlation_widens_portfolio_dispersion():
+    uncorrelated = simulate_portfolio(1000, [0.5, 0.5], [0.05, 0.05], np.diag([0.04, 0.04]), 3, iterations=4000)
+    correlated = simulate_portfolio(1000, [0.5, 0.5], [0.05, 0.05], np.full((2, 2), 0.04), 3, iterations=4000)
+    assert correlated.final_values.std() > uncorrelated.final_values.std()
+
+
+def test_memory_budget_does_not_change_shapes():
+    result = simulate_portfolio(1000, [1.0], [0.05], [[0.04]], 2, iterations=300, memory_budget=300 * 40)
+    assert result.final_values.shape == (300,)
+    assert np.all(np.isfinite(result.yearly_values))
+
+
+def test_scenarios_match_individual_runs():
+    cov = np.array([[0.04, 0.01], [0.01, 0.09]])
+    weights = [[0.6, 0.4], [0.2, 0.8]]
+    means = [[0.05, 0.08], [0.02, 0.1]]
+    covs = [cov, cov * 2]
+    batch = simulate_portfolio_scenarios([1000, 5000], weights, means, covs, 3, iterations=500,
+                                         memory_budget=500 * 40 * 10)
+
+    for result, w, mu, c, value in zip(batch, weights, means, covs, [1000, 5000]):
+        single = simulate_portfolio(value, w, mu, c, 3, iterations=500, memory_budget=500 * 40 * 10)
+        assert np.allclose(result.yearly_values, single.yearly_values)
+        assert np.allclose(result.max_drawdowns, single.max_drawdowns)
+
+
+def test_truncate_matches_shorter_horizon():
+    cov = np.array([[0.04, 0.01], [0.01, 0.09]])
+    long = simulate_portfolio(1000, [0.6, 0.4], [0.05, 0.08], cov, 4, iterations=300)
+    short = simulate_portfolio(1000, [0.6, 0.4], [0.05, 0.08], cov, 2, iterations=300)
+
+    truncated = long.truncate(2)
+    assert np.allclose(truncated.yearly_values, short.yearly_values)
+    assert np.allclose(truncated.max_drawdowns, short.max_drawdowns)
+    assert np.array_equal(long.yearly_drawdowns[:, -1], long.max_drawdowns)
+
+
+def test_sampling_methods_estimate_the_analytic_mean():
+    cov = np.array([[0.04, 0.01], [0.01, 0.09]])
+    expected = 1000 * (0.6 * np.exp(0.05 * 3) + 0.4 * np.exp(0.08 * 3))
+    for sampling in ("antithetic", "control", "sobol"):
+        result = simulate_portfolio(1000, [0.6, 0.4], [0.05, 0.08], cov, 3, iterations=1001, sampling=sampling)
+        assert np.isclose(result.mean_final_value, expected, rtol=0.03)
+        assert result.std_error < 0.1 * expected
+
+    antithetic = simulate_portfolio(1000, [0.6, 0.4], [0.05, 0.08], cov, 3, iterations=1001, sampling="antithetic")
+    assert antithetic.n_paths == 1002
+    control = simulate_portfolio(1000, [0.6, 0.4], [0.05, 0.08], cov, 3, iterations=500, sampling="control")
+    # The portfolio value is a sum of the control variates, so its mean is exact
+    assert np.isclose(control.mean_final_value, expected)
+
+
+def test_tolerance_stops_sampling_early():
+    cov = np.array([[0.04, 0.01], [0.01, 0.09]])
+    result = simulate_to_tolerance(1000, [0.6, 0.4], [0.05, 0.08], cov, 2, tolerance=5, batch_paths=256,
+                                   max_paths=20000)
+    assert result.std_error <= 5
+    assert result.n_paths < 20000 and result.n_paths % 256 == 0
+
+    capped = simulate_to_tolerance(1000, [0.6, 0.4], [0.05, 0.08], cov, 2, tolerance=1e-9, batch_paths=256,
+                                   max_paths=600)
+    assert capped.n_paths == 600
+
+
+def test_float32_precision_keeps_float64_outputs():
+    cov = np.array([[0.04, 0.01], [0.01, 0.09]])
+    single = simulate_portfolio(1000, [0.6, 0.4], [0.05, 0.08], cov, 3, iterations=4000, precision="float32")
+    double = simulate_portfolio(1000, [0.6, 0.4], [0.05, 0.08], cov, 3, iterations=4000)
+
+    assert single.final_values.dtype == np.float64 and single.yearly_values.dtype == np.float64
+    assert abs(single.mean_final_value - double.mean_final_value) < 4 * np.hypot(single.std_error, double.std_error)
+
+
+def test_threaded_paths_are_reproducible():
+    cov = np.array([[0.04, 0.01], [0.01, 0.09]])
+    first = simulate_portfolio(1000, [0.6, 0.4], [0.05, 0.08], cov, 2, iterations=999, seed=7, threads=3)
+    again = simulate_portfolio(1000, [0.6, 0.4], [0.05, 0.08], cov, 2, iterations=999, seed=7, threads=3)
+    generator = simulate_portfolio(1000, [0.6, 0.4], [0.05, 0.08], cov, 2, iterations=999,
+                                   seed=np.random.default_rng(7), threads=3)
+
+    assert np.array_equal(first.yearly_values, again.yearly_values)
+    assert np.array_equal(first.yearly_values, generator.yearly_values)
+    assert np.all(np.isfinite(first.max_drawdowns))
+
+
+def test_scenario_chunks_fit_the_memory_budget():
+    from models.portfolio_simulator import scenario_chunk_size
+    # 10 000 paths over 30 years keep about 5 MB of outputs per scenario
+    assert scenario_chunk_size(10000, 30, 4, memory_budget=64 * 1024 * 1024) == 13
+    assert scenario_chunk_size(10000, 30, 4, sampling="control", memory_budget=64 * 1024 * 1024) == 4
+    assert scenario_chunk_size(10000, 30, 4, memory_budget=1) == 1
+
+
+def test_pool_matches_combined_batches():
+    from models.portfolio_simulator import SimulationPool, combine_simulations
+    cov = np.array([[0.04, 0.01], [0.01, 0.09]])
+    batches = [simulate_portfolio(1000, [0.6, 0.4], [0.05, 0.08], cov, 2, iterations=n, seed=[7, i],
+                                  sampling="control") for i, n in enumerate([10, 30, 5, 100])]
+    pool = SimulationPool()
+    for batch in batches:
+        pool.add(batch)
+
+    pooled, combined = pool.simulation(), combine_simulations(batches)
+    assert pooled.n_paths == 145 and pooled.replicate_sizes == combined.replicate_sizes
+    assert np.array_equal(pooled.yearly_asset_values, combined.yearly_asset_values)
+    assert pooled.summary() == combined.summary()
@@ -0,0 +1,17 @@
+from services.portfolio_views import run_simulation_and_risk
+from services.risk_assessment import run_risk_assessment
+from services.simulation_ import run_simulation
+
+PARAMS = dict(investment_amount=10000, duration=2, risk_appetite=0.5, market_condition="bull",
+              stocks=40, bonds=30, real_estate=20, commodities=10)
+
+
+def test_combined_views_match_separate_services():
+    views = run_simulation_and_risk(**PARAMS)
+    assert views["simulation"] == run_simulation(**PARAMS)
+    assert views["risk"] == run_risk_assessment(**PARAMS)
+
+
+def test_nothing_allocated_is_an_error():
+    views = run_simulation_and_risk(**{**PARAMS, "stocks": 0, "bonds": 0, "real_estate": 0, "commodities": 0})
+    assert "error" in views
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import pstats
+from utils import profiling
+
+
+def busy_model(n):
+    return sum(i * i for i in range(n))
+
+
+def run_request(app, headers=(), body=b'{"duration": 5}', token="secret", path="/simulate/"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path, "query_string": b"",
+             "headers": [(key.encode(), value.encode()) for key, value in headers]}
+    asyncio.run(profiling.ProfilingMiddleware(app, token=token)(scope, receive, send))
+    return sent
+
+
+async def model_app(scope, receive, send):
+    await receive()
+    # What run_in_executor does for a task started by a profiled request
+    assert profiling.profile_requested()
+    result, stats = profiling.run_profiled(busy_model, 1000)
+    profiling.add_worker_stats(stats)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": str(result).encode()})
+
+
+def test_header_triggered_profile_is_written_with_inputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_DIR", str(tmp_path))
+
+    run_request(model_app, headers=[("x-profile", "secret")])
+
+    captures = profiling.list_captures()
+    assert len(captures) == 1
+    info = captures[0]
+    assert info["trigger"] == "header" and info["status"] == 200 and info["worker_tasks"] == 1
+    assert info["body"] == {"duration": 5} and info["seconds"] > 0
+
+    stats = pstats.Stats(profiling.capture_path(info["name"], ".prof"))
+    assert any(func[2] == "busy_model" for func in stats.stats)
+    with open(profiling.capture_path(info["name"], ".json")) as f:
+        assert json.load(f)["top_functions"]
+
+
+def test_requests_without_a_valid_trigger_are_not_profiled(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILING_SAMPLE_RATE", 0)
+
+    async def plain_app(scope, receive, send):
+        assert not profiling.profile_requested()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    run_request(plain_app)
+    run_request(plain_app, headers=[("x-profile", "wrong")])
+    assert profiling.list_captures() == []
+
+
+def test_oldest_captures_are_rotated_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILING_MAX_CAPTURES", 2)
+    monkeypatch.setattr(profiling, "PROFILING_SAMPLE_RATE", 1)
+
+    for _ in range(3):
+        run_request(model_app)
+
+    captures = profiling.list_captures()
+    assert len(captures) == 2 and all(capture["trigger"] == "sample" for capture in captures)
+    assert len(list(tmp_path.iterdir())) == 4
+    assert profiling.capture_path("../main", ".json") is None
+
+
+def test_credentials_are_never_stored(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILING_SAMPLE_RATE", 1)
+
+    async def login_app(scope, receive, send):
+        assert not profiling.profile_requested()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    run_request(login_app, path="/auth/login", body=b'{"username": "ana", "password": "hunter2"}')
+    assert profiling.list_captures() == []
+
+    run_request(model_app, body=b'{"user": {"name": "ana", "new_password": "hunter2"}, "duration": 5}')
+    captures = profiling.list_captures()
+    assert captures[0]["body"] == {"user": {"name": "ana", "new_password": "***"}, "duration": 5}
+    assert not any("hunter2" in path.read_text() for path in tmp_path.glob("*.json"))
@@ -0,0 +1,66 @@
+import asyncio
+from utils.result_cache import ResultCache, canonical_params
+
+
+def test_canonical_params_ignore_float_noise_and_order():
+    assert canonical_params({"b": 40.0000000000001, "a": -0.0}) == canonical_params({"a": 0, "b": 40})
+
+
+def test_lru_bounded_by_entries_and_bytes():
+    cache = ResultCache("test_lru", max_entries=2, max_bytes=10_000, ttl=0, disk_dir="")
+    keys = [cache.make_key("f", {"x": i}) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.set(key, {"value": i})
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) == {"value": 2}
+
+    cache.set(cache.make_key("f", {"x": "big"}), {"value": "x" * 9_985})
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["evictions"] >= 2
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    first = ResultCache("test_disk", ttl=60, disk_dir=str(tmp_path))
+    key = first.make_key("f", {"x": 1})
+    first.set(key, {"value": 1})
+
+    second = ResultCache("test_disk", ttl=60, disk_dir=str(tmp_path))
+    assert second.get(key) == {"value": 1}
+    assert second.stats()["disk_hits"] == 1
+
+
+def test_get_or_compute_shares_concurrent_calls():
+    cache = ResultCache("test_inflight", ttl=0, disk_dir="")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": len(calls)}
+
+    async def main():
+        return await asyncio.gather(*[cache.get_or_compute("f", {"x": 1}, compute) for _ in range(5)])
+
+    assert asyncio.run(main()) == [{"value": 1}] * 5
+    assert len(calls) == 1
+
+
+def test_waiters_take_over_when_the_owner_is_cancelled():
+    cache = ResultCache("test_inflight_cancel", ttl=0, disk_dir="")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": len(calls)}
+
+    async def main():
+        owner = asyncio.create_task(cache.get_or_compute("f", {"x": 1}, compute))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.create_task(cache.get_or_compute("f", {"x": 1}, compute)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        owner.cancel()  # e.g. its client disconnected
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(main()) == [{"value": 2}] * 2
+    assert len(calls) == 2
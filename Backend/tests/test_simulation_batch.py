@@ -0,0 +1,19 @@
+from services import simulation_
+
+
+def test_batches_give_the_same_results_in_chunks(monkeypatch):
+    requests = [dict(investment_amount=amount, duration=2, risk_appetite=0.5, market_condition="neutral",
+                     stocks=50, bonds=50, real_estate=0, commodities=0) for amount in (1000, 2000, 3000)]
+    together = simulation_.run_simulation_batch(requests)
+
+    monkeypatch.setattr(simulation_, "scenario_chunk_size", lambda *args, **kwargs: 1)
+    assert simulation_.run_simulation_batch(requests) == together
+
+
+def test_sweep_gives_the_same_cube_in_chunks(monkeypatch):
+    params = dict(investment_amount=1000, stocks=60, bonds=40, real_estate=0, commodities=0,
+                  market_conditions=["bull", "bear"], risk_appetites=[0.0, 1.0], durations=[1, 3])
+    together = simulation_.run_sweep(**params)
+
+    monkeypatch.setattr(simulation_, "scenario_chunk_size", lambda *args, **kwargs: 3)
+    assert simulation_.run_sweep(**params) == together
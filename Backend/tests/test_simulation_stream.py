@@ -0,0 +1,27 @@
+import numpy as np
+from models.portfolio_simulator import simulate_portfolio
+from services.simulation_ import stream_batch_sizes, RunningSimulation
+
+
+def test_batch_sizes_grow_and_cover_all_paths():
+    sizes = stream_batch_sizes(1000, first=50, cap=300)
+    assert sizes == [50, 100, 200, 300, 300, 50]
+
+
+def test_running_totals_match_one_combined_run():
+    cov = np.array([[0.04, 0.01], [0.01, 0.09]])
+    gbm = simulate_portfolio(1000, [0.6, 0.4], [0.05, 0.08], cov, 3, iterations=50, seed=1)
+    batches = [simulate_portfolio(1000, [0.6, 0.4], [0.05, 0.08], cov, 3, iterations=n, seed=[42, i])
+               for i, n in enumerate([100, 200])]
+
+    running = RunningSimulation(1000, 3, gbm, total_paths=300)
+    for batch in batches:
+        running.add(batch)
+    snapshot = running.snapshot()
+
+    yearly = np.concatenate([batch.yearly_values for batch in batches]).mean(axis=0)
+    expected = (yearly + gbm.mean_yearly_values) / 2
+    assert snapshot["done"] and snapshot["paths"] == 300
+    assert np.allclose(snapshot["Yearly Portfolio Values"], expected, atol=0.01)
+    low, high = snapshot["Confidence Interval (95%)"]
+    assert low < snapshot["Final Total Portfolio Value"] < high
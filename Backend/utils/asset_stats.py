@@ -0,0 +1,98 @@
+from functools import lru_cache
+import numpy as np
+from utils.market_data import get_store
+from utils.metrics import staged
+
+
+class AssetStats:
+    """
+    Daily return statistics for one asset class or ticker.
+    """
+
+    def __init__(self, asset, lookback, prices):
+        self.asset = asset
+        self.lookback = lookback
+        self.prices = prices
+        self.returns = _readonly(prices[1:] / prices[:-1] - 1)
+        self.mean_return = float(self.returns.mean())
+        self.volatility = float(self.returns.std(ddof=1))
+
+        # Worst drop of the price from its running peak (negative fraction)
+        self.max_drawdown = float((prices / np.maximum.accumulate(prices) - 1).min())
+        # Worst gap between a daily return and its running minimum, as used by /simulate
+        self.returns_drawdown = float((np.minimum.accumulate(self.returns) - self.returns).min())
+
+
+class CovarianceStats:
+    """
+    Mean vector, covariance and correlation of daily returns for several assets.
+
+    Price series are aligned by position and cut to the shortest one, which is
+    what concatenating the loaded DataFrames and calling dropna() produced.
+    """
+
+    def __init__(self, assets, lookback, prices):
+        self.assets = assets
+        self.lookback = lookback
+        self.prices = prices
+        self.returns = _readonly(prices[1:] / prices[:-1] - 1)
+        self.mean_returns = _readonly(self.returns.mean(axis=0))
+        self.volatility = _readonly(self.returns.std(axis=0, ddof=1))
+        self.cov_matrix = _readonly(np.cov(self.returns, rowvar=False, ddof=1))
+        self.corr_matrix = _readonly(np.corrcoef(self.returns, rowvar=False))
+
+
+def _readonly(array):
+    array = np.asarray(array)
+    array.setflags(write=False)
+    return array
+
+
+def _window(prices, lookback):
+    if lookback is None:
+        return prices
+    return prices[-(int(lookback) + 1):]
+
+
+@lru_cache(maxsize=256)
+@staged("return_stats")
+def _asset_stats(asset, lookback, version):
+    prices = _window(get_store().close(asset), lookback)
+    return AssetStats(asset, lookback, prices)
+
+
+@lru_cache(maxsize=64)
+@staged("return_stats")
+def _covariance_stats(assets, lookback, version):
+    closes = [get_store().close(asset) for asset in assets]
+    length = min(len(close) for close in closes)
+    prices = np.column_stack([close[:length] for close in closes])
+    return CovarianceStats(assets, lookback, _window(prices, lookback))
+
+
+def asset_stats(asset, lookback=None):
+    """
+    Cached return statistics for an asset, recomputed only when the data changes.
+
+    :param lookback: Number of most recent daily returns to use (None = full history).
+    """
+    return _asset_stats(asset, lookback, get_store().version())
+
+
+def covariance_stats(assets, lookback=None):
+    """
+    Cached mean/covariance/correlation of daily returns for a list of assets.
+    """
+    return _covariance_stats(tuple(assets), lookback, get_store().version())
+
+
+def stats_cache_info():
+    """
+    functools cache_info() of the per-asset and covariance statistics caches.
+    """
+    return {"asset_stats": _asset_stats.cache_info(), "covariance_stats": _covariance_stats.cache_info()}
+
+
+def clear_stats_cache():
+    _asset_stats.cache_clear()
+    _covariance_stats.cache_clear()
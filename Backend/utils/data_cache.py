@@ -0,0 +1,142 @@
+import os
+import json
+import hashlib
+import numpy as np
+from utils.market_data import DATA_DIR, DATASET_FILES, Dataset, read_csv_dataset
+
+
+CACHE_DIR = os.getenv("MARKET_DATA_CACHE_DIR", os.path.join(DATA_DIR, ".cache"))
+CACHE_FORMAT_VERSION = 1
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _dataset_dir(name, path, cache_dir):
+    # Keyed by the source path too, so stores over different files never share a cache directory
+    source = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{name}-{source}")
+
+
+def _save_array(path, array):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def _write_meta(target, meta):
+    meta_path = os.path.join(target, "meta.json")
+    tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def compile_dataset(name, path, cache_dir=CACHE_DIR, dataset=None):
+    """
+    Writes one dataset as a directory of .npy column files plus a meta.json.
+
+    meta.json is written last, so a reader never sees a half-written cache.
+    """
+    if dataset is None:
+        dataset = read_csv_dataset(name, path)
+
+    target = _dataset_dir(name, path, cache_dir)
+    os.makedirs(target, exist_ok=True)
+
+    files = {}
+    for index, column in enumerate(dataset.columns):
+        filename = f"col{index}.npy"
+        _save_array(os.path.join(target, filename), dataset.columns[column])
+        files[column] = filename
+    _save_array(os.path.join(target, "ticker_codes.npy"), dataset.ticker_codes)
+
+    stat = os.stat(path)
+    meta = {
+        "format": CACHE_FORMAT_VERSION,
+        "source": os.path.basename(path),
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_size": stat.st_size,
+        "source_sha256": file_digest(path),
+        "column_order": dataset.column_order,
+        "column_files": files,
+        "ticker_names": dataset.ticker_names,
+    }
+    _write_meta(target, meta)
+    return dataset
+
+
+def load_cached_dataset(name, path, cache_dir=CACHE_DIR):
+    """
+    Memory-maps a compiled dataset. Returns None when the cache is missing or stale.
+
+    The cache is fresh if the source file's mtime and size match. If only the
+    mtime moved (e.g. the file was touched or re-checked out), the SHA-256 of
+    the source decides, and a matching hash records the new mtime so later
+    loads skip hashing again.
+    """
+    target = _dataset_dir(name, path, cache_dir)
+    try:
+        with open(os.path.join(target, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get("format") != CACHE_FORMAT_VERSION:
+        return None
+
+    stat = os.stat(path)
+    if stat.st_size != meta["source_size"]:
+        return None
+    if stat.st_mtime_ns != meta["source_mtime_ns"]:
+        if file_digest(path) != meta["source_sha256"]:
+            return None
+        try:
+            _write_meta(target, {**meta, "source_mtime_ns": stat.st_mtime_ns})
+        except OSError:
+            pass  # read-only cache: still valid, the next load just hashes again
+
+    try:
+        columns = {
+            column: np.load(os.path.join(target, filename), mmap_mode="r", allow_pickle=False)
+            for column, filename in meta["column_files"].items()
+        }
+        ticker_codes = np.load(os.path.join(target, "ticker_codes.npy"), mmap_mode="r", allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+
+    return Dataset(name, path, stat.st_mtime_ns, columns, meta["column_order"], ticker_codes, meta["ticker_names"])
+
+
+def load_or_compile(name, path, cache_dir=CACHE_DIR):
+    """
+    Returns the memory-mapped dataset, compiling it from the CSV first if needed.
+    """
+    dataset = load_cached_dataset(name, path, cache_dir)
+    if dataset is not None:
+        return dataset
+
+    print(f"🛠️ Compiling binary cache for: {path}")
+    try:
+        compile_dataset(name, path, cache_dir)
+    except OSError as e:
+        # Read-only deployments can still serve from the parsed CSV
+        print(f"❌ Could not write data cache ({e}), using CSV directly.")
+        return read_csv_dataset(name, path)
+    return load_cached_dataset(name, path, cache_dir) or read_csv_dataset(name, path)
+
+
+def compile_all(files=None, cache_dir=CACHE_DIR):
+    for name, path in (files or DATASET_FILES).items():
+        compile_dataset(name, path, cache_dir)
+        print(f"✅ Compiled {name} -> {_dataset_dir(name, path, cache_dir)}")
+
+
+if __name__ == "__main__":
+    compile_all()
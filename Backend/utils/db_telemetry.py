@@ -0,0 +1,157 @@
+import time
+import threading
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """
+    Counts of observed durations per bucket, plus total, sum and max.
+    """
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._counts = [0] * (len(self.buckets_ms) + 1)  # the last slot is "slower than every bucket"
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        elapsed_ms = seconds * 1000
+        slot = next((i for i, bound in enumerate(self.buckets_ms) if elapsed_ms <= bound), len(self.buckets_ms))
+        with self._lock:
+            self._counts[slot] += 1
+            self._sum += elapsed_ms
+            self._max = max(self._max, elapsed_ms)
+
+    def snapshot(self):
+        """
+        Cumulative counts like a Prometheus histogram: buckets["25"] is the number of observations <= 25 ms.
+        """
+        with self._lock:
+            counts, total_ms, max_ms = list(self._counts), self._sum, self._max
+        buckets, running = {}, 0
+        for bound, count in zip(self.buckets_ms + ("+Inf",), counts):
+            running += count
+            buckets[str(bound)] = running
+        return {
+            "count": running,
+            "sum_ms": round(total_ms, 3),
+            "mean_ms": round(total_ms / running, 3) if running else 0.0,
+            "max_ms": round(max_ms, 3),
+            "buckets": buckets,
+        }
+
+    def prometheus_samples(self, name, labels=None):
+        """
+        (sample name, labels, value) triples of a Prometheus histogram in seconds, for utils.metrics collectors.
+        """
+        labels = labels or {}
+        snapshot = self.snapshot()
+        samples = [(f"{name}_bucket", {**labels, "le": bound if bound == "+Inf" else str(float(bound) / 1000)}, count)
+                   for bound, count in snapshot["buckets"].items()]
+        samples.append((f"{name}_sum", labels, snapshot["sum_ms"] / 1000))
+        samples.append((f"{name}_count", labels, snapshot["count"]))
+        return samples
+
+
+class PoolTelemetry:
+    """
+    Connection pool and query statistics for one engine.
+
+    pool_class() wraps the engine's pool class to time how long each checkout
+    waits for a connection; instrument() hooks the engine events that count
+    connections and time every statement.
+    """
+
+    def __init__(self):
+        self.connection_wait = LatencyHistogram()
+        self.query_latency = LatencyHistogram()
+        self.counters = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0, "timeouts": 0}
+        self._lock = threading.Lock()
+        self._engine = None
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def pool_class(self, base):
+        telemetry = self
+
+        class TimedPool(base):
+            def _do_get(self):
+                start = time.perf_counter()
+                try:
+                    return super()._do_get()
+                except PoolTimeoutError:
+                    telemetry._count("timeouts")
+                    raise
+                finally:
+                    telemetry.connection_wait.observe(time.perf_counter() - start)
+
+        TimedPool.__name__ = f"Timed{base.__name__}"
+        return TimedPool
+
+    def instrument(self, engine):
+        """
+        Attaches the listeners to a (sync) Engine; pass engine.sync_engine for an AsyncEngine.
+        """
+        self._engine = engine
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            self.query_latency.observe(time.perf_counter() - conn.info["query_start"].pop())
+
+        @event.listens_for(engine, "handle_error")
+        def handle_error(context):
+            starts = context.connection.info.get("query_start") if context.connection is not None else None
+            if starts:
+                self.query_latency.observe(time.perf_counter() - starts.pop())
+
+        @event.listens_for(engine, "connect")
+        def connect(dbapi_connection, connection_record):
+            self._count("connects")
+
+        @event.listens_for(engine, "checkout")
+        def checkout(dbapi_connection, connection_record, connection_proxy):
+            self._count("checkouts")
+
+        @event.listens_for(engine, "checkin")
+        def checkin(dbapi_connection, connection_record):
+            self._count("checkins")
+
+        @event.listens_for(engine, "invalidate")
+        def invalidate(dbapi_connection, connection_record, exception):
+            self._count("invalidations")
+
+        return engine
+
+    def pool_status(self):
+        pool = self._engine.pool if self._engine is not None else None
+        if pool is None or not hasattr(pool, "checkedout"):
+            return {}
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            # Connections beyond pool_size; negative while the pool has not filled up yet
+            "overflow": pool.overflow(),
+            "max_overflow": getattr(pool, "_max_overflow", None),
+        }
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "pool": self.pool_status(),
+            **counters,
+            "connection_wait": self.connection_wait.snapshot(),
+            "query_latency": self.query_latency.snapshot(),
+        }
@@ -0,0 +1,95 @@
+import os
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from utils import metrics, profiling
+
+
+# "process" runs CPU-bound work on a pool of worker processes, "thread" on a thread pool
+EXECUTOR_KIND = os.getenv("EXECUTOR_KIND", "process")
+EXECUTOR_WORKERS = int(os.getenv("EXECUTOR_WORKERS", "0")) or (os.cpu_count() or 1)
+# Seconds a request waits for its task before giving up (0 disables the timeout)
+EXECUTOR_TIMEOUT = float(os.getenv("EXECUTOR_TIMEOUT", "120"))
+EXECUTOR_START_METHOD = os.getenv("EXECUTOR_START_METHOD", "")
+
+_executor = None
+_lock = threading.Lock()
+
+
+class TaskTimeoutError(TimeoutError):
+    pass
+
+
+def _init_worker():
+    # Map the market data once per worker instead of on its first task
+    from utils.market_data import get_store
+    get_store().preload()
+
+
+def _create_executor(kind, workers):
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="compute")
+    if kind == "process":
+        context = multiprocessing.get_context(EXECUTOR_START_METHOD or None)
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker)
+    raise ValueError(f"❌ Invalid EXECUTOR_KIND: {kind}")
+
+
+def get_executor():
+    """
+    Returns the shared executor, creating it on first use.
+    """
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = _create_executor(EXECUTOR_KIND, EXECUTOR_WORKERS)
+                print(f"⚙️ Started {EXECUTOR_KIND} executor with {EXECUTOR_WORKERS} workers")
+    return _executor
+
+
+def shutdown_executor(wait=True):
+    """
+    Stops the executor. Queued tasks are cancelled, running ones finish when wait is True.
+    """
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+
+async def run_in_executor(func, *args, timeout=None, **kwargs):
+    """
+    Runs func(*args, **kwargs) on the shared executor without blocking the event loop.
+
+    func and its arguments must be picklable when the process executor is used.
+    Raises TaskTimeoutError if the result is not ready within timeout seconds
+    (EXECUTOR_TIMEOUT by default). A task that already started in a worker
+    process cannot be interrupted; only the request stops waiting for it.
+    Stage timings recorded in a worker process are merged into this process's metrics,
+    and while the calling request is profiled the task is profiled in its worker too.
+    """
+    loop = asyncio.get_running_loop()
+    collect = metrics.METRICS_ENABLED and EXECUTOR_KIND == "process"
+    profile = profiling.profile_requested()
+    task = functools.partial(func, *args, **kwargs)
+    if profile:
+        task = functools.partial(profiling.run_profiled, task)
+    if collect:
+        task = functools.partial(metrics.run_collected, task)
+    future = loop.run_in_executor(get_executor(), task)
+    timeout = EXECUTOR_TIMEOUT if timeout is None else timeout
+    try:
+        result = await asyncio.wait_for(future, timeout=timeout or None)
+    except asyncio.TimeoutError:
+        raise TaskTimeoutError(f"Task {getattr(func, '__name__', func)} timed out after {timeout}s")
+    if collect:
+        result, recorded = result
+        metrics.merge(recorded)
+    if profile:
+        result, stats = result
+        profiling.add_worker_stats(stats)
+    return result
@@ -0,0 +1,214 @@
+import os
+import threading
+import numpy as np
+from utils.metrics import stage
+
+
+# Get the absolute path of the Backend directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+DATASET_FILES = {
+    "stocks": os.path.join(DATA_DIR, "stock_data_5y.csv"),
+    "bonds": os.path.join(DATA_DIR, "bond_data_5y - Copy.csv"),
+    "real_estate": os.path.join(DATA_DIR, "real_estate_data_5y - Copy.csv"),
+    "commodities": os.path.join(DATA_DIR, "commodity_data_5y - Copy.csv")
+}
+
+# "mmap" serves memory-mapped binary columns compiled from the CSVs (see utils/data_cache.py),
+# "csv" parses the CSV files directly
+LOADER_MODE = os.getenv("MARKET_DATA_LOADER", "mmap")
+
+# Tickers that can be requested on their own (historically the only ones load_data accepted)
+STOCK_TICKERS = ["AAPL", "GOOGL", "MSFT", "TSLA", "NVDA"]
+
+
+class Dataset:
+    """
+    Columnar, read-only copy of one CSV file.
+
+    Every column is a NumPy array; rows for a ticker are contiguous so a
+    ticker lookup is a plain slice (a view, never a copy).
+    """
+
+    def __init__(self, name, path, mtime, columns, column_order, ticker_codes, ticker_names):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+        self.columns = columns
+        self.column_order = column_order
+        self.ticker_codes = ticker_codes
+        self.ticker_names = ticker_names
+        self.ticker_slices = _ticker_slices(ticker_codes, ticker_names)
+
+        for array in list(columns.values()) + [ticker_codes]:
+            array.setflags(write=False)
+
+    @property
+    def version(self):
+        return (self.name, self.mtime)
+
+    def __len__(self):
+        return len(self.ticker_codes)
+
+    def rows(self, ticker=None):
+        if ticker is None:
+            return slice(0, len(self))
+        return self.ticker_slices[ticker]
+
+    def column(self, name, ticker=None):
+        return self.columns[name][self.rows(ticker)]
+
+    def frame(self, ticker=None):
+        """
+        Builds a DataFrame over the stored arrays without copying the numeric columns.
+        """
+        # pandas is only needed for DataFrame callers and CSV parsing, not for the mmap store
+        import pandas as pd
+        rows = self.rows(ticker)
+        data = {}
+        for name in self.column_order:
+            if name == "Ticker":
+                data[name] = pd.Categorical.from_codes(self.ticker_codes[rows], self.ticker_names)
+            else:
+                data[name] = self.columns[name][rows]
+        return pd.DataFrame(data, copy=False)
+
+
+def _ticker_slices(ticker_codes, ticker_names):
+    slices = {}
+    if len(ticker_codes) == 0:
+        return slices
+
+    boundaries = np.flatnonzero(np.diff(ticker_codes)) + 1
+    starts = np.concatenate(([0], boundaries))
+    stops = np.concatenate((boundaries, [len(ticker_codes)]))
+    for start, stop in zip(starts, stops):
+        ticker = ticker_names[ticker_codes[start]]
+        if ticker in slices:
+            raise ValueError(f"❌ Rows for ticker {ticker} are not contiguous.")
+        slices[ticker] = slice(int(start), int(stop))
+    return slices
+
+
+def read_csv_dataset(name, path):
+    """
+    Parses a CSV file into a Dataset. Dates are stored as UTC datetime64.
+    """
+    import pandas as pd
+    mtime = os.stat(path).st_mtime_ns
+    df = pd.read_csv(path)
+
+    if "Ticker" not in df.columns:
+        raise ValueError(f"❌ Missing 'Ticker' column in {path}.")
+
+    columns = {}
+    for column in df.columns:
+        if column == "Ticker":
+            continue
+        if column == "Date":
+            dates = pd.to_datetime(df["Date"], utc=True).dt.tz_localize(None)
+            columns[column] = dates.to_numpy(dtype="datetime64[ns]")
+        else:
+            columns[column] = df[column].to_numpy()
+
+    # Keep tickers in order of first appearance so codes increase down the file
+    ticker_names = list(dict.fromkeys(df["Ticker"].astype(str)))
+    lookup = {ticker: code for code, ticker in enumerate(ticker_names)}
+    ticker_codes = np.array([lookup[t] for t in df["Ticker"].astype(str)], dtype=np.int16)
+
+    return Dataset(name, path, mtime, columns, list(df.columns), ticker_codes, ticker_names)
+
+
+class MarketDataStore:
+    """
+    Process-wide cache of the historical datasets.
+
+    Each file is parsed once and kept as NumPy arrays. A dataset is only
+    re-read when the modification time of its source file changes.
+    """
+
+    def __init__(self, files=None, mode=None):
+        self.files = dict(files or DATASET_FILES)
+        self.mode = mode or LOADER_MODE
+        self._datasets = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name, path):
+        if self.mode == "mmap":
+            from utils.data_cache import load_or_compile
+            return load_or_compile(name, path)
+        return read_csv_dataset(name, path)
+
+    def dataset(self, name):
+        if name not in self.files:
+            raise ValueError(f"❌ Invalid asset type: {name}")
+
+        path = self.files[name]
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ Data file not found: {path}")
+
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._datasets.get(name)
+        if cached is not None and cached.mtime == mtime:
+            return cached
+
+        with self._lock:
+            cached = self._datasets.get(name)
+            if cached is None or cached.mtime != mtime:
+                print(f"📂 Loading data from: {path}")
+                with stage("parse_dataset"):
+                    cached = self._load(name, path)
+                self._datasets[name] = cached
+        return cached
+
+    def preload(self):
+        """
+        Loads every dataset up front so the first request does not pay for parsing.
+        """
+        for name in self.files:
+            self.dataset(name)
+
+    def resolve(self, asset_type):
+        """
+        Returns (dataset, ticker) for an asset class name or an individual ticker.
+        """
+        if asset_type in self.files:
+            return self.dataset(asset_type), None
+
+        for name in self.files:
+            dataset = self.dataset(name)
+            if asset_type in dataset.ticker_slices:
+                return dataset, asset_type
+
+        if asset_type in STOCK_TICKERS:
+            raise ValueError(f"❌ No data found for stock: {asset_type}")
+        raise ValueError(f"❌ Invalid asset type: {asset_type}")
+
+    def frame(self, asset_type):
+        dataset, ticker = self.resolve(asset_type)
+        return dataset.frame(ticker)
+
+    def close(self, asset_type):
+        """
+        Zero-copy view of the closing prices for an asset class or ticker.
+        """
+        dataset, ticker = self.resolve(asset_type)
+        return dataset.column("Close", ticker)
+
+    def version(self):
+        """
+        Identifies the currently loaded data; changes whenever any source file changes.
+        """
+        return tuple(self.dataset(name).version for name in self.files)
+
+    def clear(self):
+        with self._lock:
+            self._datasets.clear()
+
+
+_store = MarketDataStore()
+
+
+def get_store():
+    return _store
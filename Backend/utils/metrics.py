@@ -0,0 +1,299 @@
+import os
+import sys
+import time
+import threading
+import functools
+from contextlib import contextmanager
+
+# Record request, stage and optimizer metrics and serve them at /metrics (off: both are no-ops)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+# Upper bounds of the latency histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry = {}
+_collectors = []
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values tuple -> state
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_text(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def drain(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def merge(self, values):
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{self._label_text(key)} {_number(value)}" for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        slot = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][slot] += 1
+            state[1] += value
+
+    def merge(self, values):
+        with self._lock:
+            for key, (counts, total) in values.items():
+                state = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+                state[0] = [a + b for a, b in zip(state[0], counts)]
+                state[1] += total
+
+    def render(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            running = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                running += count
+                lines.append(f"{self.name}_bucket{self._label_text(key, [('le', _number(bound))])} {running}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {running}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    if isinstance(value, str):
+        return value
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REQUEST_DURATION = Histogram("http_request_duration_seconds", "Time to produce a response, per route.",
+                             ("method", "route", "status"))
+STAGE_DURATION = Histogram("app_stage_duration_seconds",
+                           "Time spent in instrumented stages (data loading, models, optimizers, serialization).",
+                           ("stage",))
+OPTIMIZER_STARTS = Counter("app_optimizer_starts_total", "Optimizer starting points solved.", ("optimizer",))
+OPTIMIZER_ITERATIONS = Counter("app_optimizer_iterations_total", "SLSQP iterations run.", ("solver",))
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+@contextmanager
+def _timed_stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=name)
+
+
+def stage(name):
+    """
+    Context manager timing a block into app_stage_duration_seconds{stage=name}.
+    """
+    if not METRICS_ENABLED:
+        return _NULL_STAGE
+    return _timed_stage(name)
+
+
+def staged(name):
+    """
+    Decorator form of stage(): times every call of the function.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return func(*args, **kwargs)
+            with _timed_stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording http_request_duration_seconds per route template and status.
+
+    main.py only adds it when METRICS_ENABLED. Streamed responses are timed until their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_DURATION.observe(time.perf_counter() - start, method=scope["method"], route=_route_label(scope),
+                                     status=status[0])
+
+
+def _route_label(scope):
+    # The router stores the matched route in the scope. Path parameters are put back as {name},
+    # and unknown paths share one label, so the label set stays small.
+    if scope.get("route") is None:
+        return "unmatched"
+    path = scope["path"]
+    for name, value in scope.get("path_params", {}).items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+
+def register_collector(collect):
+    """
+    Adds collect() -> [(name, kind, help, [(sample name, labels dict, value), ...]), ...], called on every scrape.
+
+    Collectors report state other modules already keep (cache counters, pool
+    sizes), so recording it costs nothing between scrapes.
+    """
+    _collectors.append(collect)
+
+
+def drain():
+    """
+    Returns and clears everything recorded in this process (used by executor worker processes).
+    """
+    return {name: metric.drain() for name, metric in _registry.items()}
+
+
+def merge(recorded):
+    for name, values in recorded.items():
+        if values:
+            _registry[name].merge(values)
+
+
+def run_collected(func, *args, **kwargs):
+    """
+    Runs func in an executor worker process and returns (result, metrics recorded meanwhile).
+    """
+    drain()
+    result = func(*args, **kwargs)
+    return result, drain()
+
+
+def process_memory():
+    """
+    (resident bytes, peak resident bytes) of this process.
+    """
+    resident = None
+    try:
+        with open("/proc/self/statm") as f:
+            resident = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak if sys.platform == "darwin" else peak * 1024  # kilobytes on Linux
+    except ImportError:
+        peak = None
+    return resident, peak
+
+
+def _process_metrics():
+    resident, peak = process_memory()
+    times = os.times()
+    families = [("process_cpu_seconds_total", "counter", "User and system CPU time of this process.",
+                 [("process_cpu_seconds_total", {}, times.user + times.system)])]
+    if resident is not None:
+        families.append(("process_resident_memory_bytes", "gauge", "Resident memory size.",
+                         [("process_resident_memory_bytes", {}, resident)]))
+    if peak is not None:
+        families.append(("process_peak_resident_memory_bytes", "gauge", "Peak resident memory size.",
+                         [("process_peak_resident_memory_bytes", {}, peak)]))
+    return families
+
+
+register_collector(_process_metrics)
+
+
+def render():
+    """
+    Every metric in the Prometheus text exposition format (version 0.0.4).
+    """
+    lines = []
+    for metric in _registry.values():
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+
+    for collect in _collectors:
+        try:
+            families = collect()
+        except Exception as e:
+            print(f"❌ Metrics collector failed: {e}")
+            continue
+        for name, kind, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+                label_text = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{sample_name}{label_text} {_number(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,85 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+
+# bcrypt work factor for new hashes; stored hashes with another cost are rehashed on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Threads hashing passwords. bcrypt releases the GIL, so these run next to the event loop
+# instead of on it; keep this below the core count so a login storm cannot starve the API.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or max(1, min(4, (os.cpu_count() or 1) // 2))
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_password_executor():
+    """
+    Returns the thread pool reserved for bcrypt, creating it on first use.
+
+    It is separate from utils.executor so password checks never queue behind
+    simulations (or the other way round).
+    """
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+
+def shutdown_password_executor(wait=True):
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def hash_password_sync(password, rounds=None):
+    rounds = rounds or BCRYPT_ROUNDS
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+
+
+def verify_password_sync(password, hashed):
+    try:
+        return bcrypt.checkpw(password.encode(), hashed.encode())
+    except ValueError:
+        # Not a bcrypt hash (e.g. a corrupted row): treat it as a wrong password
+        return False
+
+
+def hash_rounds(hashed):
+    """
+    Work factor of a stored "$2b$12$..." hash, or None if it cannot be read.
+    """
+    parts = hashed.split("$")
+    try:
+        return int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed, rounds=None):
+    return hash_rounds(hashed) != (rounds or BCRYPT_ROUNDS)
+
+
+async def _run(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_password_executor(), func, *args)
+
+
+async def hash_password(password, rounds=None):
+    """
+    bcrypt-hashes password on the password executor without blocking the event loop.
+    """
+    return await _run(hash_password_sync, password, rounds)
+
+
+async def verify_password(password, hashed):
+    """
+    Checks password against a stored bcrypt hash on the password executor.
+    """
+    return await _run(verify_password_sync, password, hashed)
@@ -0,0 +1,233 @@
+import os
+import re
+import json
+import time
+import random
+import secrets
+import pstats
+import asyncio
+import cProfile
+import contextvars
+from datetime import datetime, timezone
+from utils.market_data import BASE_DIR
+
+# Profile requests with cProfile and keep the results on disk (off by default)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+# A request carrying this header with the admin token (auth.ADMIN_TOKEN) as its value is profiled
+PROFILING_HEADER = os.getenv("PROFILING_HEADER", "X-Profile").lower()
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))  # share of other requests profiled at random
+PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(BASE_DIR, "profiles"))
+PROFILING_MAX_CAPTURES = int(os.getenv("PROFILING_MAX_CAPTURES", "50"))  # oldest captures are deleted beyond this
+PROFILING_MAX_BODY = int(os.getenv("PROFILING_MAX_BODY", "65536"))  # request body bytes stored with a capture
+PROFILING_TOP_FUNCTIONS = 30  # functions listed in each capture's summary
+
+# Never sampled: profiling them says nothing about the models, and /auth bodies hold credentials
+SKIPPED_PREFIXES = ("/admin", "/auth", "/metrics", "/health", "/docs", "/openapi.json", "/redoc")
+CAPTURE_NAME = re.compile(r"^\d{8}T\d{6}_\d{6}_[A-Za-z0-9_]+$")
+
+# Worker profiles of the request being profiled in this context (see run_in_executor)
+_current_capture = contextvars.ContextVar("profiling_capture", default=None)
+_profiling_loop = False
+
+
+class _CollectedStats:
+    # What pstats.Stats accepts in place of a Profile: stats a worker already collected
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def profile_requested():
+    """
+    True while the current request is being profiled, so executor tasks should be profiled too.
+    """
+    return _current_capture.get() is not None
+
+
+def run_profiled(func, *args, **kwargs):
+    """
+    Runs func under cProfile in an executor worker and returns (result, raw pstats data).
+    """
+    profile = cProfile.Profile()
+    result = profile.runcall(func, *args, **kwargs)
+    profile.create_stats()
+    return result, profile.stats
+
+
+def add_worker_stats(stats):
+    capture = _current_capture.get()
+    if capture is not None:
+        capture.append(stats)
+
+
+def _capture_name(method, path):
+    now = datetime.now(timezone.utc)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_")[:60] or "root"
+    return f"{now.strftime('%Y%m%dT%H%M%S_%f')}_{method}_{slug}"
+
+
+def _redact(value):
+    # Captures are readable by every admin, so no password is written to disk
+    if isinstance(value, dict):
+        return {key: "***" if "password" in str(key).lower() else _redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_redact(item) for item in value]
+    return value
+
+
+def _request_body(body):
+    try:
+        return _redact(json.loads(body))
+    except ValueError:
+        return body.decode("utf-8", errors="replace")
+
+
+def _top_functions(stats, limit=PROFILING_TOP_FUNCTIONS):
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {"function": pstats.func_std_string(func), "calls": calls, "tottime": round(tottime, 6),
+         "cumtime": round(cumtime, 6)}
+        for func, (_, calls, tottime, cumtime, _) in rows
+    ]
+
+
+def write_capture(profile, worker_stats, info, directory=None, max_captures=None):
+    """
+    Writes <name>.prof (pstats, readable with pstats or snakeviz) and <name>.json
+    (request, timing and top functions), then deletes the oldest captures.
+    """
+    directory = directory or PROFILING_DIR
+    max_captures = max_captures or PROFILING_MAX_CAPTURES
+    os.makedirs(directory, exist_ok=True)
+
+    stats = pstats.Stats(profile)
+    for collected in worker_stats:
+        stats.add(_CollectedStats(collected))
+    name = info["name"]
+    stats.dump_stats(os.path.join(directory, f"{name}.prof"))
+    with open(os.path.join(directory, f"{name}.json"), "w") as f:
+        json.dump({**info, "worker_tasks": len(worker_stats), "top_functions": _top_functions(stats)}, f, indent=2)
+
+    for old in list_captures(directory)[max_captures:]:
+        for extension in (".prof", ".json"):
+            try:
+                os.remove(os.path.join(directory, old["name"] + extension))
+            except FileNotFoundError:
+                pass
+
+
+def list_captures(directory=None):
+    """
+    Metadata of the stored captures, newest first (without the top function lists).
+    """
+    directory = directory or PROFILING_DIR
+    if not os.path.isdir(directory):
+        return []
+    captures = []
+    for filename in sorted(os.listdir(directory), reverse=True):
+        name, extension = os.path.splitext(filename)
+        if extension != ".json" or not CAPTURE_NAME.match(name):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            continue
+        info.pop("top_functions", None)
+        captures.append(info)
+    return captures
+
+
+def capture_path(name, extension, directory=None):
+    """
+    Path of a stored capture file, or None if name is not a capture (or the file is gone).
+    """
+    if not CAPTURE_NAME.match(name) or extension not in (".prof", ".json"):
+        return None
+    path = os.path.join(directory or PROFILING_DIR, name + extension)
+    return path if os.path.isfile(path) else None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that runs selected requests under cProfile and stores the profile on disk.
+
+    A request is profiled when it sends PROFILING_HEADER with the admin token
+    (passed in as token; without one the header is ignored), or at random with
+    probability PROFILING_SAMPLE_RATE. The event loop thread is profiled for
+    the whole request, and every executor task the request starts is profiled
+    in its worker and merged into the same capture. Only one request is
+    profiled at a time; the event loop profile also sees whatever other
+    requests run meanwhile.
+    """
+
+    def __init__(self, app, token=""):
+        self.app = app
+        self.token = token
+
+    def _trigger(self, scope):
+        if scope["path"].startswith(SKIPPED_PREFIXES):
+            return None
+        if self.token:
+            for key, value in scope.get("headers", ()):
+                if key.decode("latin-1") == PROFILING_HEADER:
+                    return "header" if secrets.compare_digest(value.decode("latin-1"), self.token) else None
+        if PROFILING_SAMPLE_RATE and random.random() < PROFILING_SAMPLE_RATE:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        global _profiling_loop
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None or _profiling_loop:
+            await self.app(scope, receive, send)
+            return
+
+        body = bytearray()
+        status = [500]
+
+        async def receive_with_body():
+            message = await receive()
+            if message["type"] == "http.request" and len(body) < PROFILING_MAX_BODY:
+                body.extend(message.get("body", b"")[:PROFILING_MAX_BODY - len(body)])
+            return message
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        worker_stats = []
+        token = _current_capture.set(worker_stats)
+        _profiling_loop = True
+        profile = cProfile.Profile()
+        started_at = datetime.now(timezone.utc).isoformat()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            await self.app(scope, receive_with_body, send_with_status)
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - start
+            _profiling_loop = False
+            _current_capture.reset(token)
+
+            info = {
+                "name": _capture_name(scope["method"], scope["path"]),
+                "started_at": started_at,
+                "seconds": round(elapsed, 4),
+                "trigger": trigger,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "body": _request_body(bytes(body)) if body else None,
+                "status": status[0],
+            }
+            try:
+                # Dumping and rotating touches the disk, so keep it off the event loop
+                await asyncio.to_thread(write_capture, profile, worker_stats, info)
+                print(f"🔬 Profiled {scope['method']} {scope['path']} in {elapsed:.3f}s -> {info['name']}")
+            except Exception as e:
+                print(f"❌ Could not write profile {info['name']}: {e}")
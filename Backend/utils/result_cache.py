@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from utils.market_data import get_store
+
+
+RESULT_CACHE_ENTRIES = int(os.getenv("RESULT_CACHE_ENTRIES", "1024"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))  # seconds, 0 = never expire
+# Directory for the on-disk tier; empty disables it
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "")
+
+_caches = {}
+
+
+def canonical_params(params):
+    """
+    Normalizes request parameters so equivalent requests share a cache key.
+
+    Floats are rounded to 10 significant digits (so 40 and 40.0000000001 match),
+    -0.0 becomes 0.0 and whole floats become ints; keys are sorted.
+    """
+    def normalize(value):
+        if isinstance(value, bool) or value is None or isinstance(value, str):
+            return value
+        if isinstance(value, (int, float)):
+            value = float(f"{float(value):.10g}") + 0.0
+            return int(value) if value.is_integer() else value
+        if isinstance(value, dict):
+            return {str(k): normalize(v) for k, v in sorted(value.items())}
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        return str(value)
+
+    return normalize(params)
+
+
+class ResultCache:
+    """
+    LRU cache of JSON-serializable results, bounded by entry count and bytes.
+
+    Keys include the market data version, so results computed on old data are
+    never served. Entries expire after ttl seconds. With disk_dir set, entries
+    are also written as JSON files there and survive restarts.
+    """
+
+    def __init__(self, name, max_entries=None, max_bytes=None, ttl=None, disk_dir=None):
+        self.name = name
+        self.max_entries = max_entries or RESULT_CACHE_ENTRIES
+        self.max_bytes = max_bytes or RESULT_CACHE_MAX_BYTES
+        self.ttl = RESULT_CACHE_TTL if ttl is None else ttl
+        self.disk_dir = RESULT_CACHE_DIR if disk_dir is None else disk_dir
+        self._entries = OrderedDict()  # key -> (created, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._data_version = None
+        self.counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+        _caches[name] = self
+
+    def make_key(self, namespace, params):
+        version = get_store().version()
+        with self._lock:
+            if version != self._data_version:
+                # The data changed: nothing in memory can be served any more
+                self._entries.clear()
+                self._bytes = 0
+                self._data_version = version
+        payload = json.dumps([namespace, canonical_params(params), version], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _expired(self, created):
+        return self.ttl and time.time() - created > self.ttl
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._expired(entry[0]):
+                    self._remove(key)
+                    self.counters["expired"] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return entry[2]
+
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["disk_hits"] += 1
+        self._store(key, value[1], value[0], write_disk=False)
+        return value[1]
+
+    def set(self, key, value):
+        self._store(key, value, time.time(), write_disk=True)
+
+    def _store(self, key, value, created, write_disk):
+        encoded = json.dumps(value)
+        size = len(encoded)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (created, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.counters["evictions"] += 1
+
+        if write_disk:
+            self._disk_set(key, created, encoded)
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, self.name, f"{key}.json")
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._expired(entry["created"]):
+            return None
+        return entry["created"], entry["value"]
+
+    def _disk_set(self, key, created, encoded):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(f'{{"created": {created}, "value": {encoded}}}')
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"❌ Could not write result cache entry: {e}")
+
+    async def get_or_compute(self, namespace, params, compute):
+        """
+        Returns the cached result for (namespace, params) or awaits compute() and caches it.
+
+        Concurrent requests for the same key share one computation. If the
+        request computing it is cancelled, a waiting request takes over.
+        Results containing an "error" key are not cached.
+        """
+        key = self.make_key(namespace, params)
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The owner's client went away, not ours: compute it again (the first waiter here owns it)
+                if not pending.cancelled():
+                    raise
+                return await self.get_or_compute(namespace, params, compute)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+            if not (isinstance(value, dict) and "error" in value):
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self.counters,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "disk": bool(self.disk_dir),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+def cache_stats():
+    return {name: cache.stats() for name, cache in _caches.items()}